@@ -1,22 +1,75 @@
 # Import necessary libraries
-from flask import Flask, request, render_template
-import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
+import os
+import time
+from flask import Flask, Response, g, request, render_template, jsonify
 
 # Import your custom prediction pipeline and data schema
 from src.pipeline.predict_pipeline import CustomData, PredictPipeline
+from src.pipeline.batching import MicroBatcher, MicroBatcherConfig
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+from src.pipeline.prediction_table import PredictionTableStore
+from src.pipeline.input_schema import describe_errors
+from src.logger import logging
+from src.metrics import METRICS, PROMETHEUS_CONTENT_TYPE
 
 # Initialize Flask app
 application = Flask(__name__)
 app = application
 
+REQUEST_SECONDS = METRICS.histogram("http_request_seconds", "End-to-end request handling time", ("endpoint", "status"))
+RENDER_SECONDS = METRICS.histogram("template_render_seconds", "Time to render an HTML template", ("template",))
+
+# Repeated inputs are answered from a cache keyed on the model version (PREDICT_CACHE_SIZE=0 disables it)
+prediction_cache = None
+if int(os.environ.get("PREDICT_CACHE_SIZE", 10_000)) > 0:
+    prediction_cache = PredictionCache(PredictionCacheConfig(
+        max_entries=int(os.environ.get("PREDICT_CACHE_SIZE", 10_000)),
+        ttl_s=float(os.environ["PREDICT_CACHE_TTL_S"]) if os.environ.get("PREDICT_CACHE_TTL_S") else None,
+        shared_path=os.environ.get("PREDICT_CACHE_PATH") or None,
+        stale_version_grace_s=float(os.environ.get("PREDICT_CACHE_GRACE_S", 600)),
+    ))
+
+# Full-domain prediction table, used when one was materialized for the served model (PREDICT_TABLE=0 disables it)
+prediction_table = PredictionTableStore() if os.environ.get("PREDICT_TABLE", "1") != "0" else None
+
+# Prediction pipeline shared by all requests; artifacts are loaded once per worker
+predict_pipeline = PredictPipeline(cache=prediction_cache, table=prediction_table)
+
+# Concurrent single-row JSON requests are merged into one preprocess + predict call
+micro_batcher = MicroBatcher(
+    predict_fn=predict_pipeline.predict_records,
+    config=MicroBatcherConfig(
+        max_batch_size=int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 64)),
+        max_wait_ms=float(os.environ.get("PREDICT_MAX_WAIT_MS", 2.0)),
+    ),
+)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    start = g.get("request_start")
+    if start is not None:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start, endpoint=request.endpoint or "unknown", status=response.status_code
+        )
+    return response
+
+
+def render(template, **context):
+    with RENDER_SECONDS.time(template=template):
+        return render_template(template, **context)
+
+
 # -------------------------------------
 # Route for landing page (index.html)
 # -------------------------------------
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render('index.html')
 
 
 # -------------------------------------------------
@@ -25,40 +78,117 @@ def index():
 @app.route('/predictdata', methods=['GET', 'POST'])
 def predict_datapoint():
     if request.method == 'GET':
-        return render_template('home.html')
+        return render('home.html')
     else:
         try:
-            # 1. Get form data and create CustomData instance
+            # 1. Get form data and create CustomData instance (numbers are coerced by the schema)
             data = CustomData(
                 gender=request.form.get('gender'),
                 race_ethnicity=request.form.get('ethnicity'),
                 parental_level_of_education=request.form.get('parental_level_of_education'),
                 lunch=request.form.get('lunch'),
                 test_preparation_course=request.form.get('test_preparation_course'),
-                reading_score=float(request.form.get('reading_score')),
-                writing_score=float(request.form.get('writing_score'))
+                reading_score=request.form.get('reading_score'),
+                writing_score=request.form.get('writing_score')
             )
 
-            # 2. Convert to DataFrame
-            pred_df = data.get_data_as_data_frame()
-            print("✅ Input DataFrame:\n", pred_df)
+            # 2. Validate and coerce the single input record before any model work
+            records, errors = predict_pipeline.validate_records([data.get_data_as_dict()])
+            if errors:
+                logging.info("Invalid form input: %s", errors)
+                return render('home.html', results="⚠️ Error: " + describe_errors(errors))
+            record = records[0]
+            logging.debug("Input record: %s", record)
 
-            # 3. Predict using pipeline
-            predict_pipeline = PredictPipeline()
-            results = predict_pipeline.predict(pred_df)
-            print("✅ Prediction Result:", results)
+            # 3. Predict using the shared pipeline
+            results = predict_pipeline.predict_records([record])
+            logging.debug("Prediction result: %s", results)
 
             # 4. Return result to page
-            return render_template('home.html', results=results[0])
+            return render('home.html', results=results[0])
 
         except Exception as e:
-            # 5. Catch and print any errors
-            print("❌ ERROR during prediction:", str(e))
-            return render_template('home.html', results="⚠️ Error: " + str(e))
+            # 5. Catch and log any errors
+            logging.error("Error during prediction: %s", e)
+            return render('home.html', results="⚠️ Error: " + str(e))
+
+
+# -------------------------------------------------
+# JSON prediction API: one record or an array of records
+# -------------------------------------------------
+PAYLOAD_ERROR = "Expected a JSON record, an array of records or {\"records\": [...]}"
+VALIDATION_ERROR = "Invalid input records"
+
+
+def records_from_payload(payload):
+    '''
+    Returns the list of records in a /predict JSON body, or None if it is malformed.
+    '''
+    if isinstance(payload, dict) and "records" in payload:
+        payload = payload["records"]
+    if isinstance(payload, dict):
+        return [payload]
+    if isinstance(payload, list) and payload and all(isinstance(r, dict) for r in payload):
+        return payload
+    return None
+
+
+@app.route('/predict', methods=['POST'])
+def predict_json():
+    records = records_from_payload(request.get_json(silent=True))
+    if records is None:
+        return jsonify(error=PAYLOAD_ERROR), 400
+
+    try:
+        # Structured per-field errors, without reaching the model
+        records, errors = predict_pipeline.validate_records(records)
+        if errors:
+            return jsonify(error=VALIDATION_ERROR, errors=errors), 400
+
+        if len(records) == 1:
+            # Cache hits answer immediately; misses wait briefly to be batched with concurrent requests
+            prediction = predict_pipeline.lookup(records[0])
+            if prediction is None:
+                prediction = micro_batcher.submit(records[0])
+            predictions = [float(prediction)]
+        else:
+            predictions = [float(p) for p in predict_pipeline.predict_records(records)]
+
+        return jsonify(predictions=predictions)
+
+    except Exception as e:
+        return jsonify(error=str(e)), 400
+
+
+# -------------------------------------
+# Prediction cache hit/miss counters
+# -------------------------------------
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if prediction_cache is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **prediction_cache.stats())
+
+
+# -------------------------------------
+# Timing histograms in Prometheus text format (per worker process)
+# -------------------------------------
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(METRICS.render_prometheus(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+# -------------------------------------
+# Liveness probe for the production server and load balancers
+# -------------------------------------
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify(status="ok", version=predict_pipeline.registry.current_version)
 
 
 # -------------------------------------
-# Main entry point
+# Main entry point (development server only; production runs under gunicorn,
+# see gunicorn.conf.py)
 # -------------------------------------
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host="0.0.0.0", port=5000, debug=os.environ.get("FLASK_DEBUG", "0") == "1")
@@ -0,0 +1,129 @@
+# Async variant of the JSON prediction API, for an ASGI server:
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+# Requests are read and answered on the event loop, so slow clients do not hold a
+# worker; everything that touches the registry (which may reload artifacts), the caches
+# or the model runs on the micro-batcher thread or the default executor.
+import asyncio
+import json
+import time
+
+from app import (
+    PAYLOAD_ERROR, REQUEST_SECONDS, VALIDATION_ERROR, micro_batcher, predict_pipeline, prediction_cache,
+    records_from_payload,
+)
+from src.metrics import METRICS, PROMETHEUS_CONTENT_TYPE
+
+MAX_BODY_BYTES = 1 << 20
+
+# Same endpoint labels as the Flask views, so both servers report one set of metrics
+ENDPOINTS = {"/healthz": "healthz", "/cache/stats": "cache_stats", "/metrics": "metrics", "/predict": "predict_json"}
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+async def _send(send, status, body, content_type):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+
+async def _send_json(send, status, payload):
+    return await _send(send, status, json.dumps(payload).encode(), "application/json")
+
+
+def _validate_and_lookup(records):
+    # Blocking: registry.get() may stat, hash and load new artifacts, and the shared cache
+    # tier reads SQLite. Returns (records, errors, cached prediction of a single record)
+    records, errors = predict_pipeline.validate_records(records)
+    if errors or len(records) != 1:
+        return records, errors, None
+    return records, errors, predict_pipeline.lookup(records[0])
+
+
+async def _predict(records, cached=None):
+    if len(records) == 1:
+        # Cache/table misses are awaited without blocking the loop
+        prediction = cached
+        if prediction is None:
+            prediction = await asyncio.wrap_future(micro_batcher.submit_future(records[0]))
+        return [float(prediction)]
+    loop = asyncio.get_running_loop()
+    predictions = await loop.run_in_executor(None, predict_pipeline.predict_records, records)
+    return [float(p) for p in predictions]
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Loads the artifacts unless the master already preloaded them
+            await asyncio.get_running_loop().run_in_executor(None, predict_pipeline.registry.refresh)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    start = time.perf_counter()
+    status = await _handle(scope, receive, send)
+    if status is not None:
+        endpoint = ENDPOINTS.get(scope["path"], "unknown")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status=status)
+
+
+async def _handle(scope, receive, send):
+    route = (scope["method"], scope["path"])
+    if route == ("GET", "/healthz"):
+        return await _send_json(send, 200, {"status": "ok", "version": predict_pipeline.registry.current_version})
+    if route == ("GET", "/cache/stats"):
+        stats = {"enabled": False} if prediction_cache is None else {"enabled": True, **prediction_cache.stats()}
+        return await _send_json(send, 200, stats)
+    if route == ("GET", "/metrics"):
+        return await _send(send, 200, METRICS.render_prometheus().encode(), PROMETHEUS_CONTENT_TYPE)
+    if route != ("POST", "/predict"):
+        return await _send_json(send, 404, {"error": "Not found"})
+
+    try:
+        body = await _read_body(receive)
+    except ValueError as e:
+        return await _send_json(send, 413, {"error": str(e)})
+    if body is None:
+        return
+
+    try:
+        records = records_from_payload(json.loads(body))
+    except ValueError:
+        records = None
+    if records is None:
+        return await _send_json(send, 400, {"error": PAYLOAD_ERROR})
+
+    try:
+        loop = asyncio.get_running_loop()
+        records, errors, cached = await loop.run_in_executor(None, _validate_and_lookup, records)
+        if errors:
+            return await _send_json(send, 400, {"error": VALIDATION_ERROR, "errors": errors})
+        predictions = await _predict(records, cached)
+    except Exception as e:
+        return await _send_json(send, 400, {"error": str(e)})
+    return await _send_json(send, 200, {"predictions": predictions})
@@ -0,0 +1,74 @@
+import warnings
+
+import pandas as pd
+
+from benchmarks.common import time_calls
+
+
+def _sample_frame(data_path, n_rows):
+    df = pd.read_csv(data_path).drop(columns=["math_score"])
+    return df.sample(n=n_rows, replace=len(df) < n_rows, random_state=0).reset_index(drop=True)
+
+
+def _fresh_pipeline():
+    from src.pipeline.model_registry import ModelRegistry
+    from src.pipeline.predict_pipeline import PredictPipeline
+
+    return PredictPipeline(registry=ModelRegistry())
+
+
+def run(results, data_path, repeat=200, batch_sizes=(1, 32, 1024), cold_repeat=5):
+    '''
+    PredictPipeline latency (cold = fresh artifact load + first call, warm =
+    steady state) for DataFrame and record inputs, plus /predictdata end to end.
+    '''
+    warnings.filterwarnings("ignore")
+
+    def cold_call():
+        pipeline = _fresh_pipeline()
+        pipeline.predict(_sample_frame(data_path, 1))
+
+    results.add_latency("inference.predict.cold", time_calls(cold_call, cold_repeat))
+
+    pipeline = _fresh_pipeline()
+    for batch_size in batch_sizes:
+        frame = _sample_frame(data_path, batch_size)
+        records = frame.to_dict("records")
+        n_calls = max(5, repeat // max(1, batch_size // 32))
+
+        samples = time_calls(lambda: pipeline.predict(frame), n_calls, warmup=3)
+        results.add_latency(f"inference.predict.frame.batch{batch_size}.warm", samples)
+        samples = time_calls(lambda: pipeline.predict_records(records), n_calls, warmup=3)
+        results.add_latency(f"inference.predict_records.batch{batch_size}.warm", samples)
+        results.add(
+            f"inference.predict_records.batch{batch_size}.rows_per_s",
+            batch_size * len(samples) / sum(samples), "rows/s", better="higher",
+        )
+
+    # Full HTTP path: form parsing, prediction and template rendering
+    import app as flask_app
+
+    flask_app.predict_pipeline.registry = pipeline.registry
+    client = flask_app.app.test_client()
+    row = _sample_frame(data_path, 1).iloc[0]
+    form = {
+        "gender": row["gender"],
+        "ethnicity": row["race_ethnicity"],
+        "parental_level_of_education": row["parental_level_of_education"],
+        "lunch": row["lunch"],
+        "test_preparation_course": row["test_preparation_course"],
+        "reading_score": str(row["reading_score"]),
+        "writing_score": str(row["writing_score"]),
+    }
+
+    def post():
+        response = client.post("/predictdata", data=form)
+        assert response.status_code == 200
+
+    results.add_latency("inference.http.predictdata", time_calls(post, repeat, warmup=5))
+    if flask_app.prediction_cache is not None:
+        # Repeated identical form posts are cache hits; also time the uncached path
+        cache, flask_app.predict_pipeline.cache = flask_app.predict_pipeline.cache, None
+        table, flask_app.predict_pipeline.table = flask_app.predict_pipeline.table, None
+        results.add_latency("inference.http.predictdata.uncached", time_calls(post, repeat, warmup=5))
+        flask_app.predict_pipeline.cache, flask_app.predict_pipeline.table = cache, table
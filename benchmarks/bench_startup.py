@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Libraries a serving process must not import just by importing the app
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "joblib", "catboost", "xgboost", "matplotlib", "seaborn")
+
+# Runs in a fresh interpreter: import the app, then load the artifacts and answer one request
+_CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+first_prediction = None
+record = json.loads(sys.argv[1])
+if record is not None:
+    app.predict_pipeline.predict_records([record])
+    first_prediction = time.perf_counter() - start
+print(json.dumps({{"import_s": imported - start, "heavy": heavy, "first_prediction_s": first_prediction}}))
+'''
+
+
+def _sample_record(data_path):
+    if not os.path.exists(data_path):
+        return None
+    with open(data_path) as file_obj:
+        header = file_obj.readline().strip().split(",")
+        values = file_obj.readline().strip().split(",")
+    record = dict(zip(header, values))
+    record.pop("math_score", None)
+    for column in ("reading_score", "writing_score"):
+        record[column] = float(record[column])
+    return record
+
+
+def _cold_start(record):
+    code = _CHILD.format(heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code, json.dumps(record)],
+        capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONWARNINGS="ignore"),
+    ).stdout
+    wall_s = time.perf_counter() - start
+    return wall_s, json.loads(output.strip().splitlines()[-1])
+
+
+def run(results, data_path, repeat=5):
+    '''
+    Cold start of the serving app in fresh interpreters: time to import it,
+    time until the first prediction (artifact load included, when artifacts
+    exist) and how many heavy libraries the bare import pulled in. The module
+    count has a baseline of 0, so any new eager import shows up as a regression.
+    '''
+    record = _sample_record(data_path)
+    if record is not None and not os.path.exists(os.path.join("artifacts", "model.pkl")):
+        record = None
+
+    wall, imports, first_predictions, heavy = [], [], [], set()
+    for _ in range(repeat):
+        wall_s, child = _cold_start(record)
+        wall.append(wall_s)
+        imports.append(child["import_s"])
+        heavy.update(child["heavy"])
+        if child["first_prediction_s"] is not None:
+            first_predictions.append(child["first_prediction_s"])
+
+    results.add_latency("startup.import_app", imports)
+    results.add_latency("startup.process", wall)
+    if first_predictions:
+        results.add_latency("startup.first_prediction", first_predictions)
+    results.add("startup.import_app.heavy_modules", len(heavy), "modules")
+    if heavy:
+        print(f"Importing app loaded: {', '.join(sorted(heavy))}")
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+SCORE_COLUMNS = ["math_score", "reading_score", "writing_score"]
+
+
+def write_synthetic_source(data_path, n_rows, file_path, chunk_rows=1_000_000, seed=0):
+    '''
+    Writes `n_rows` rows resampled from `data_path`, with +-3 points of noise on
+    the scores so large sizes are not just repeated rows. Written in chunks so
+    10M+ rows never have to be held in memory.
+    '''
+    df = pd.read_csv(data_path)
+    rng = np.random.RandomState(seed)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    written = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        chunk = df.iloc[rng.randint(0, len(df), size)].reset_index(drop=True)
+        for column in SCORE_COLUMNS:
+            chunk[column] = np.clip(chunk[column] + rng.randint(-3, 4, size), 0, 100)
+        chunk.to_csv(file_path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        written += size
+
+
+def _timed(results, name, fn):
+    start = time.perf_counter()
+    value = fn()
+    results.add(name, time.perf_counter() - start, "s")
+    return value
+
+
+def run(results, data_path, sizes=(1_000, 100_000), streaming_from=1_000_000, search_config=None):
+    '''
+    Times each training stage on synthetic sources of the given sizes. Sizes from
+    `streaming_from` rows on use the out-of-core ingestion/transformation path.
+    Runs in a scratch directory so the real artifacts are left alone.
+    '''
+    from src.components.data_ingestion import DataIngestion
+    from src.components.data_transformation import DataTransformation
+    from src.components.model_search import ModelSearchConfig
+    from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+
+    warnings.filterwarnings("ignore")
+    data_path = os.path.abspath(data_path)
+    # A small fixed search so the timings measure the stages, not the grid size; no trial cache
+    search_config = search_config or ModelSearchConfig(strategy="random", n_iter=2, cv=3, cache=None)
+    cwd = os.getcwd()
+
+    for n_rows in sizes:
+        prefix = f"training.rows{n_rows}"
+        workdir = tempfile.mkdtemp(prefix="bench_training_")
+        try:
+            os.chdir(workdir)
+            source_path = os.path.join("notebook", "data", "stud.csv")
+            _timed(results, f"{prefix}.generate_s", lambda: write_synthetic_source(data_path, n_rows, source_path))
+
+            streaming = n_rows >= streaming_from
+            ingestion = DataIngestion()
+            transformation = DataTransformation()
+            if streaming:
+                train_path, test_path = _timed(results, f"{prefix}.ingestion_s", ingestion.initiate_streaming_ingestion)
+                _timed(results, f"{prefix}.transformation_s",
+                       lambda: transformation.initiate_streaming_transformation(train_path, test_path))
+                from src.artifact_store import ArtifactStore
+
+                store, config = ArtifactStore(), transformation.data_transformation_config
+                train_set = (store.load_matrix(config.train_features_file_path), store.load_array(config.train_target_file_path))
+                test_set = (store.load_matrix(config.test_features_file_path), store.load_array(config.test_target_file_path))
+            else:
+                train_path, test_path = _timed(results, f"{prefix}.ingestion_s", ingestion.initiate_data_ingestion)
+                train_set, test_set, _ = _timed(results, f"{prefix}.transformation_s",
+                                                lambda: transformation.initiate_data_transformation(train_path, test_path))
+
+            trainer = ModelTrainer(ModelTrainerConfig(search_config=search_config))
+            _timed(results, f"{prefix}.model_trainer_s", lambda: trainer.initiate_model_trainer(train_set, test_set))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
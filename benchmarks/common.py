@@ -0,0 +1,95 @@
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def percentiles_ms(samples_s):
+    '''
+    Summarises a list of durations in seconds as p50/p99/mean in milliseconds.
+    '''
+    samples_ms = np.asarray(samples_s) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "mean_ms": float(samples_ms.mean()),
+    }
+
+
+def time_calls(fn, repeat, warmup=0):
+    # Per-call wall-clock durations in seconds
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+class Results:
+    '''
+    Flat collection of named metrics. Each metric records whether lower or higher
+    values are better so runs can be compared against a baseline automatically.
+    '''
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.metrics[name] = {"value": float(value), "unit": unit, "better": better}
+
+    def add_latency(self, name, samples_s):
+        for key, value in percentiles_ms(samples_s).items():
+            self.add(f"{name}.{key}", value, "ms")
+
+    def as_dict(self):
+        return {"meta": environment(), "metrics": self.metrics}
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w") as file_obj:
+            json.dump(self.as_dict(), file_obj, indent=2, sort_keys=True)
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    '''
+    Returns a list of (name, baseline, current, relative change) for every metric
+    that got worse than `tolerance` (e.g. 0.2 = 20%) relative to the baseline.
+    '''
+    regressions = []
+    for name, base in baseline["metrics"].items():
+        metric = current["metrics"].get(name)
+        if metric is None:
+            continue
+        if base["value"] == 0:
+            # No relative change from zero: any move away from it counts as infinitely large
+            change = 0.0 if metric["value"] == 0 else math.copysign(math.inf, metric["value"])
+        else:
+            change = (metric["value"] - base["value"]) / abs(base["value"])
+        worse = change > tolerance if base["better"] == "lower" else change < -tolerance
+        if worse:
+            regressions.append((name, base["value"], metric["value"], change))
+    return regressions
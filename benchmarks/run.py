@@ -0,0 +1,79 @@
+'''
+Latency and throughput benchmarks for inference and training.
+
+Run from the repository root:
+
+    python -m benchmarks.run                                  # inference + training at 1k/100k rows
+    python -m benchmarks.run --suite training --sizes 1000 100000 10000000
+    python -m benchmarks.run --suite startup                  # cold start of the serving app
+    python -m benchmarks.run --save-baseline                  # record the current numbers as the baseline
+
+Results are written as JSON (benchmarks/results/latest.json by default) and
+compared against benchmarks/baseline.json when it exists; the exit status is 1
+if any metric regressed by more than --tolerance.
+'''
+import argparse
+import json
+import os
+import shutil
+import sys
+
+from benchmarks.common import Results, compare
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=["all", "inference", "training", "startup"], default="all")
+    parser.add_argument("--data", default=os.path.join("artifacts", "data.csv"), help="Seed dataset")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000], help="Training rows")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per warm latency measurement")
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_DIR, "results", "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARK_DIR, "baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = Results()
+
+    if args.suite in ("all", "startup"):
+        # First, before this process imports anything the child processes should not need
+        from benchmarks import bench_startup
+        bench_startup.run(results, args.data)
+    if args.suite in ("all", "inference"):
+        from benchmarks import bench_inference
+        bench_inference.run(results, args.data, repeat=args.repeat)
+    if args.suite in ("all", "training"):
+        from benchmarks import bench_training
+        bench_training.run(results, args.data, sizes=args.sizes)
+
+    results.save(args.output)
+    width = max(len(name) for name in results.metrics)
+    for name, metric in sorted(results.metrics.items()):
+        print(f"{name:<{width}}  {metric['value']:>12.3f} {metric['unit']}")
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (use --save-baseline)")
+        return 0
+    with open(args.baseline) as file_obj:
+        baseline = json.load(file_obj)
+    regressions = compare(results.as_dict(), baseline, args.tolerance)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.0%})")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
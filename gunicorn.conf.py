@@ -0,0 +1,67 @@
+# Production server settings
+#   WSGI (Flask):  gunicorn -c gunicorn.conf.py app:app
+#   ASGI (async):  gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+import gc
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Threads per worker let concurrent requests meet in the micro-batcher (ignored by async workers)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+# Load the app, model and preprocessor once in the master; workers share them copy-on-write
+preload_app = True
+
+# How often the master checks model.pkl/preprocessor.pkl for a new version
+ARTIFACT_CHECK_INTERVAL_S = float(os.environ.get("ARTIFACT_CHECK_INTERVAL_S", 5))
+
+
+def _load_artifacts():
+    # Imported lazily: the config is also read by processes that never load the app
+    from src.pipeline.model_registry import get_default_registry
+    import app
+
+    version = get_default_registry().refresh(force=True).version
+    if app.prediction_table is not None:
+        app.prediction_table.get(version)
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers do not touch (and thereby copy) the shared pages
+    gc.freeze()
+    return version
+
+
+def _watch_artifacts(server, version):
+    '''
+    Runs in the master. When the artifacts change, loads the new version in the
+    master and sends itself SIGHUP: gunicorn forks fresh workers (which inherit
+    the new model) and retires the old ones once their in-flight requests finish.
+    '''
+    from src.pipeline.model_registry import get_default_registry
+
+    registry = get_default_registry()
+    while True:
+        time.sleep(ARTIFACT_CHECK_INTERVAL_S)
+        try:
+            if registry.refresh().version == version:
+                continue
+            version = _load_artifacts()
+        except Exception as e:
+            server.log.warning(f"Artifact check failed, keeping version {version}: {e}")
+            continue
+        server.log.info(f"Artifacts changed to version {version}, reloading workers")
+        os.kill(os.getpid(), signal.SIGHUP)
+
+
+def when_ready(server):
+    version = _load_artifacts()
+    server.log.info(f"Preloaded artifacts version {version}")
+    threading.Thread(target=_watch_artifacts, args=(server, version), name="artifact-watcher", daemon=True).start()
@@ -12,16 +12,32 @@ def get_requirements(file_path:str)->List[str]:
     with open(file_path) as file_obj:
         requirements=file_obj.readlines()
         requirements=[req.replace("\n","") for req in requirements]
+        # Blank and commented-out lines are not requirements
+        requirements=[req for req in requirements if req.strip() and not req.startswith("#")]
 
         if HYPEN_E_DOT in requirements:
             requirements.remove(HYPEN_E_DOT)
     return requirements
 
+# Install profiles: `pip install .[serving]` for a prediction server, `pip install .[train]`
+# for the training pipeline, `pip install .[all]` (= requirements.txt) for development
+CORE_REQUIREMENTS=['numpy','scikit-learn']
+EXTRAS_REQUIRE={
+    # Web servers and the sklearn fallback path; no training or plotting libraries
+    'serving':['Flask','gunicorn','uvicorn','pandas'],
+    # Only needed to load CatBoost/XGBoost models that are not served through the compiled export
+    'boosting':['catboost','xgboost'],
+    'train':['pandas','catboost','xgboost','seaborn','matplotlib'],
+    'all':get_requirements('requirements.txt'),
+}
+
 setup(
 name='ML_PEOJECT_END_TO_END',
 version='0.0.1',
 author='Harshith',
 author_email='aharshith23@gmail.com',
-packages=find_packages(),
-install_requires=get_requirements('requirements.txt')
+# benchmarks/ and tests/ are run from a checkout, never installed
+packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
+install_requires=CORE_REQUIREMENTS,
+extras_require=EXTRAS_REQUIRE
 )
\ No newline at end of file
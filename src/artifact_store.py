@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Suffix used by each on-disk frame format
+FRAME_SUFFIXES = {
+    "npy": ".npyd",        # Directory with one memory-mappable .npy file per column
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "csv": ".csv",
+}
+
+SCHEMA_FILE = "_schema.json"
+SPARSE_SUFFIX = ".csr"     # Directory with the data/indices/indptr arrays of a CSR matrix
+
+
+# Configuration class for the artifact store
+@dataclass
+class ArtifactStoreConfig:
+    format: str = "npy"    # "npy", "parquet", "feather" or "csv"
+    mmap: bool = True      # Memory-map .npy files on load instead of reading them
+
+
+def _strip_suffix(file_path):
+    for suffix in FRAME_SUFFIXES.values():
+        if file_path.endswith(suffix):
+            return file_path[: -len(suffix)]
+    return file_path
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class ArtifactStore:
+    '''
+    Reads and writes the data passed between training stages.
+
+    DataFrames (train/test splits) are stored in a typed columnar format chosen by
+    `format`; numeric columns keep their dtype and string columns are stored as
+    categorical codes plus a vocabulary. Matrices are stored as .npy and loaded
+    memory-mapped, so downstream stages read them without parsing or copying.
+    Loading detects the format from the path, so old CSV artifacts still load.
+    '''
+
+    def __init__(self, config: ArtifactStoreConfig = None):
+        self.store_config = config or ArtifactStoreConfig()
+        if self.store_config.format not in FRAME_SUFFIXES:
+            raise ValueError(f"Unknown artifact format {self.store_config.format}")
+
+    def frame_path(self, file_path):
+        '''
+        Maps a configured path such as artifacts/train.csv to the path used by
+        the configured format, e.g. artifacts/train.npyd.
+        '''
+        return _strip_suffix(file_path) + FRAME_SUFFIXES[self.store_config.format]
+
+    # ---------------------------------------------------------------------
+    # DataFrames
+    # ---------------------------------------------------------------------
+    def save_frame(self, df, file_path):
+        try:
+            path = self.frame_path(file_path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _remove(path)
+            fmt = self.store_config.format
+
+            if fmt == "csv":
+                df.to_csv(path, index=False, header=True)
+            elif fmt == "parquet":
+                df.to_parquet(path, index=False)
+            elif fmt == "feather":
+                df.reset_index(drop=True).to_feather(path)
+            else:
+                self._save_npy_frame(df, path)
+
+            logging.info(f"Saved frame {df.shape} to {path}")
+            return path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _save_npy_frame(self, df, path):
+        os.makedirs(path)
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            entry = {"name": name, "file": f"{i}.npy"}
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                np.save(os.path.join(path, entry["file"]), series.to_numpy())
+                entry["kind"] = "numeric"
+            else:
+                # Strings are stored as int32 codes (-1 = missing) plus their vocabulary
+                codes, categories = pd.factorize(series, sort=True)
+                np.save(os.path.join(path, entry["file"]), codes.astype(np.int32))
+                entry["kind"] = "categorical"
+                entry["categories"] = [str(c) for c in categories]
+            columns.append(entry)
+        with open(os.path.join(path, SCHEMA_FILE), "w") as file_obj:
+            json.dump({"n_rows": len(df), "columns": columns}, file_obj)
+
+    def load_frame(self, file_path):
+        try:
+            if os.path.isdir(file_path):
+                return self._load_npy_frame(file_path)
+            if file_path.endswith(".parquet"):
+                return pd.read_parquet(file_path)
+            if file_path.endswith(".feather"):
+                return pd.read_feather(file_path)
+            return pd.read_csv(file_path)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def list_frames(self, directory):
+        '''
+        Returns the frame shards stored in `directory`, in name order.
+        '''
+        return [
+            os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if any(name.endswith(suffix) for suffix in FRAME_SUFFIXES.values())
+        ]
+
+    def frame_length(self, file_path):
+        # Columnar frames record their length; other formats have to be read
+        if os.path.isdir(file_path):
+            with open(os.path.join(file_path, SCHEMA_FILE)) as file_obj:
+                return json.load(file_obj)["n_rows"]
+        return len(self.load_frame(file_path))
+
+    def _load_npy_frame(self, path):
+        with open(os.path.join(path, SCHEMA_FILE)) as file_obj:
+            schema = json.load(file_obj)
+        mmap_mode = "r" if self.store_config.mmap else None
+        data = {}
+        for entry in schema["columns"]:
+            values = np.load(os.path.join(path, entry["file"]), mmap_mode=mmap_mode)
+            if entry["kind"] == "categorical":
+                # Decoded to plain object strings so downstream dtypes match the CSV path
+                categories = np.asarray(entry["categories"], dtype=object)
+                decoded = np.empty(len(values), dtype=object)
+                present = values >= 0
+                decoded[present] = categories[values[present]]
+                decoded[~present] = np.nan
+                values = decoded
+            data[entry["name"]] = values
+        return pd.DataFrame(data, copy=False)
+
+    # ---------------------------------------------------------------------
+    # Matrices
+    # ---------------------------------------------------------------------
+    def save_array(self, array, file_path):
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            np.save(file_path, array)
+            return file_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load_array(self, file_path):
+        try:
+            return np.load(file_path, mmap_mode="r" if self.store_config.mmap else None)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def matrix_path(self, file_path):
+        '''
+        Returns where a feature matrix configured at `file_path` (.npy) lives:
+        the .npy itself when dense, or the sibling .csr directory when sparse.
+        '''
+        sparse_path = os.path.splitext(file_path)[0] + SPARSE_SUFFIX
+        return sparse_path if os.path.isdir(sparse_path) else file_path
+
+    def remove_matrix(self, file_path):
+        # Drops both the dense and the sparse variant so a stale one is never loaded
+        _remove(os.path.splitext(file_path)[0] + SPARSE_SUFFIX)
+        _remove(file_path)
+
+    def save_matrix(self, matrix, file_path):
+        '''
+        Saves a dense array as .npy, or a scipy sparse matrix as a .csr directory
+        of data/indices/indptr arrays so it can be memory-mapped like a dense one.
+        '''
+        try:
+            sparse_path = os.path.splitext(file_path)[0] + SPARSE_SUFFIX
+            self.remove_matrix(file_path)
+            if not hasattr(matrix, "tocsr"):
+                return self.save_array(matrix, file_path)
+
+            matrix = matrix.tocsr()
+            os.makedirs(sparse_path)
+            for part in ("data", "indices", "indptr"):
+                np.save(os.path.join(sparse_path, f"{part}.npy"), getattr(matrix, part))
+            with open(os.path.join(sparse_path, SCHEMA_FILE), "w") as file_obj:
+                json.dump({"shape": list(matrix.shape), "nnz": int(matrix.nnz)}, file_obj)
+            return sparse_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load_matrix(self, file_path):
+        try:
+            path = self.matrix_path(file_path)
+            if not os.path.isdir(path):
+                return self.load_array(path)
+
+            from scipy import sparse
+
+            with open(os.path.join(path, SCHEMA_FILE)) as file_obj:
+                shape = tuple(json.load(file_obj)["shape"])
+            # Copy-on-write maps: still zero-copy, but writeable, which some estimators
+            # (CatBoost) require of sparse buffers
+            mmap_mode = "c" if self.store_config.mmap else None
+            parts = [
+                np.load(os.path.join(path, f"{part}.npy"), mmap_mode=mmap_mode)
+                for part in ("data", "indices", "indptr")
+            ]
+            return sparse.csr_matrix(tuple(parts), shape=shape, copy=False)
+
+        except Exception as e:
+            raise CustomException(e, sys)
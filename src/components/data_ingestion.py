@@ -1,6 +1,9 @@
 # Standard library imports
 import os
 import sys
+import shutil
+import glob
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 from sklearn.model_selection import train_test_split
@@ -8,10 +11,8 @@ from sklearn.model_selection import train_test_split
 # Custom exception and logging (from your own project structure)
 from src.exception import CustomException
 from src.logger import logging
-
-# Importing data transformation and model trainer components
-from src.components.data_transformation import DataTransformation, DataTransformationConfig
-from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+from src.utils import file_digest
 
 # Configuration class to store paths for data files using @dataclass
 @dataclass
@@ -19,56 +20,180 @@ class DataIngestionConfig:
     train_data_path: str = os.path.join('artifacts', "train.csv")  # Path to save training data
     test_data_path: str = os.path.join('artifacts', "test.csv")    # Path to save testing data
     raw_data_path: str = os.path.join('artifacts', "data.csv")     # Path to save raw data
+    source_data_path: str = os.path.join('notebook', 'data', 'stud.csv')  # Input dataset
+    test_size: float = 0.2
+    random_state: int = 42
+    artifact_format: str = "npy"    # How splits are written: "npy", "parquet", "feather" or "csv"
+    # Streaming mode: the source is read in chunks and each chunk is written as a shard
+    chunksize: int = 100_000
+    train_shard_dir: str = os.path.join('artifacts', 'shards', 'train')
+    test_shard_dir: str = os.path.join('artifacts', 'shards', 'test')
+    # Incremental refresh: every accepted delta file is kept here once, keyed by its digest, and
+    # full runs read the source plus these deltas
+    delta_log_dir: str = os.path.join('artifacts', 'deltas')
+    # Also append accepted deltas to the source dataset itself (off: the source is left untouched)
+    append_to_source: bool = False
 
 # Main class that handles data ingestion process
 class DataIngestion:
-    def __init__(self):
+    def __init__(self, config: DataIngestionConfig = None):
         # Initialize with configuration for paths
-        self.ingestion_config = DataIngestionConfig()
+        self.ingestion_config = config or DataIngestionConfig()
+        self.artifact_store = ArtifactStore(ArtifactStoreConfig(format=self.ingestion_config.artifact_format))
+
+    def output_paths(self):
+        '''
+        Returns the (raw, train, test) paths as written in the configured format.
+        '''
+        return (
+            self.artifact_store.frame_path(self.ingestion_config.raw_data_path),
+            self.artifact_store.frame_path(self.ingestion_config.train_data_path),
+            self.artifact_store.frame_path(self.ingestion_config.test_data_path),
+        )
+
+    def accepted_deltas(self):
+        '''
+        Paths of the delta files accepted by incremental refreshes, in the order they were applied.
+        '''
+        return sorted(glob.glob(os.path.join(self.ingestion_config.delta_log_dir, "*.csv")))
+
+    def is_accepted(self, delta_path):
+        '''
+        Whether a delta file with the same content was already applied.
+        '''
+        digest = file_digest(delta_path)
+        return any(os.path.basename(path).endswith(f"-{digest}.csv") for path in self.accepted_deltas())
+
+    def _log_delta(self, delta_path):
+        # <sequence>-<sha256>.csv: sorts in acceptance order, deduplicates by content
+        os.makedirs(self.ingestion_config.delta_log_dir, exist_ok=True)
+        name = f"{len(self.accepted_deltas()):05d}-{file_digest(delta_path)}.csv"
+        shutil.copyfile(delta_path, os.path.join(self.ingestion_config.delta_log_dir, name))
 
     def initiate_data_ingestion(self):
         logging.info("Entered the data ingestion method or component")
         try:
-            # Read the input dataset
-            df = pd.read_csv('notebook\data\stud.csv')
+            # Read the input dataset, plus the rows accepted by incremental refreshes
+            df = pd.read_csv(self.ingestion_config.source_data_path)
+            deltas = [pd.read_csv(path)[df.columns] for path in self.accepted_deltas()]
+            if deltas:
+                df = pd.concat([df] + deltas, ignore_index=True)
             logging.info('Read the dataset as dataframe')
 
             # Create the artifacts directory if it doesn't exist
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
 
             # Save the raw data to file
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            self.artifact_store.save_frame(df, self.ingestion_config.raw_data_path)
 
             # Perform train-test split
             logging.info("Train test split initiated")
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
+            train_set, test_set = train_test_split(
+                df,
+                test_size=self.ingestion_config.test_size,
+                random_state=self.ingestion_config.random_state
+            )
 
-            # Save the train and test datasets to file
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            # Save the train and test datasets in the configured columnar format
+            train_path = self.artifact_store.save_frame(train_set, self.ingestion_config.train_data_path)
+            test_path = self.artifact_store.save_frame(test_set, self.ingestion_config.test_data_path)
 
             logging.info("Ingestion of the data is completed")
 
             # Return paths of the generated train and test files
             return (
-                self.ingestion_config.train_data_path,
-                self.ingestion_config.test_data_path
+                train_path,
+                test_path
             )
 
         except Exception as e:
             # Raise a custom exception if any error occurs
             raise CustomException(e, sys)
 
+    def hash_split(self, df):
+        '''
+        Deterministic per-row train/test assignment from a hash of the row content,
+        so the split does not depend on chunk boundaries or row order.
+        Returns a boolean mask that is True for test rows.
+        '''
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        buckets = (hashes + np.uint64(self.ingestion_config.random_state)) % np.uint64(1_000_000)
+        return buckets < np.uint64(int(self.ingestion_config.test_size * 1_000_000))
+
+    def initiate_streaming_ingestion(self):
+        '''
+        Out-of-core variant of initiate_data_ingestion for sources larger than RAM.
+        Reads the source in chunks, splits every row by hash and writes each chunk's
+        train and test rows as shards. Returns the (train, test) shard directories.
+        '''
+        logging.info("Entered the streaming data ingestion method or component")
+        try:
+            shard_dirs = (self.ingestion_config.train_shard_dir, self.ingestion_config.test_shard_dir)
+            for shard_dir in shard_dirs:
+                shutil.rmtree(shard_dir, ignore_errors=True)
+                os.makedirs(shard_dir, exist_ok=True)
+
+            n_train = n_test = 0
+            chunksize = self.ingestion_config.chunksize
+            sources = [self.ingestion_config.source_data_path] + self.accepted_deltas()
+            chunks = (chunk for path in sources for chunk in pd.read_csv(path, chunksize=chunksize))
+            for index, chunk in enumerate(chunks):
+                is_test = self.hash_split(chunk)
+                shard_name = f"part-{index:05d}.csv"
+                self.artifact_store.save_frame(chunk[~is_test], os.path.join(shard_dirs[0], shard_name))
+                self.artifact_store.save_frame(chunk[is_test], os.path.join(shard_dirs[1], shard_name))
+                n_train += int((~is_test).sum())
+                n_test += int(is_test.sum())
+
+            logging.info(f"Streaming ingestion completed: {n_train} train rows, {n_test} test rows")
+            return shard_dirs
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_incremental_ingestion(self, delta_path, streaming=False):
+        '''
+        Appends the rows of `delta_path` (same columns as the source) to the
+        existing splits instead of re-splitting everything. New rows are
+        assigned with the deterministic hash split; in streaming mode they are
+        written as one more shard. The file is recorded in the delta log, and a
+        file that was already applied is rejected. Returns (train path, test
+        path, new train rows, new test rows).
+        '''
+        logging.info(f"Entered the incremental data ingestion method with {delta_path}")
+        try:
+            config = self.ingestion_config
+            if self.is_accepted(delta_path):
+                raise ValueError(f"{delta_path} was already applied (see {config.delta_log_dir})")
+            delta = pd.read_csv(delta_path)
+            is_test = self.hash_split(delta)
+            train_delta, test_delta = delta[~is_test], delta[is_test]
+
+            if streaming:
+                train_path, test_path = config.train_shard_dir, config.test_shard_dir
+                shard_name = f"part-{len(self.artifact_store.list_frames(train_path)):05d}.csv"
+                self.artifact_store.save_frame(train_delta, os.path.join(train_path, shard_name))
+                self.artifact_store.save_frame(test_delta, os.path.join(test_path, shard_name))
+            else:
+                raw_path, train_path, test_path = self.output_paths()
+                for path, rows in ((raw_path, delta), (train_path, train_delta), (test_path, test_delta)):
+                    existing = self.artifact_store.load_frame(path)
+                    self.artifact_store.save_frame(pd.concat([existing, rows], ignore_index=True), path)
+
+            self._log_delta(delta_path)
+            if config.append_to_source:
+                source_columns = pd.read_csv(config.source_data_path, nrows=0).columns
+                delta[source_columns].to_csv(config.source_data_path, mode="a", header=False, index=False)
+
+            logging.info(f"Incremental ingestion completed: {len(train_delta)} train rows, {len(test_delta)} test rows")
+            return train_path, test_path, train_delta, test_delta
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
 # Main script execution block
 if __name__ == "__main__":
-    # STEP 1: Data Ingestion
-    obj = DataIngestion()
-    train_data, test_data = obj.initiate_data_ingestion()
-
-    # STEP 2: Data Transformation (scaling, encoding, etc.)
-    data_transformation = DataTransformation()
-    train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data, test_data)
+    # Ingestion -> transformation -> training, skipping stages whose inputs are unchanged
+    from src.pipeline.train_pipeline import TrainPipeline
 
-    # STEP 3: Model Training and Evaluation
-    modeltrainer = ModelTrainer()
-    print(modeltrainer.initiate_model_trainer(train_arr, test_arr))
+    print(TrainPipeline().run())
@@ -1,11 +1,13 @@
 # Standard imports
+import copy
 import sys
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 # Data manipulation and preprocessing
 import numpy as np 
 import pandas as pd
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
@@ -15,35 +17,69 @@ from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from src.exception import CustomException
 from src.logger import logging
 
-# Utility to save objects as pickle files
-from src.utils import save_object
+# Utility to save objects as pickle files, and the store for data passed between stages
+from src.utils import file_digest, load_object, save_object
+from src.pipeline.compiled_preprocessor import try_compile_preprocessor
+from src.components.warm_start import value_pairs
+from src.artifact_store import ArtifactStore
 
 # Configuration class to store file path for the preprocessor object
 @dataclass
 class DataTransformationConfig:
     # Corrected filename: 'preprocessor.pkl'
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")
+    # NumPy export of the preprocessor; lets serving skip importing sklearn
+    compiled_preprocessor_file_path = os.path.join('artifacts', "preprocessor_compiled.pkl")
+    # Transformed features and targets, persisted separately so sparse features stay sparse.
+    # Sparse feature matrices are written next to the .npy path as a .csr directory.
+    train_features_file_path: str = os.path.join('artifacts', "train_features.npy")
+    train_target_file_path: str = os.path.join('artifacts', "train_target.npy")
+    test_features_file_path: str = os.path.join('artifacts', "test_features.npy")
+    test_target_file_path: str = os.path.join('artifacts', "test_target.npy")
+    # Output is sparse when the one-hot block is sparse and overall density is below this
+    sparse_threshold: float = 0.3
+    numerical_columns: list = field(default_factory=lambda: ["writing_score", "reading_score"])
+    categorical_columns: list = field(default_factory=lambda: [
+        "gender",
+        "race_ethnicity",
+        "parental_level_of_education",
+        "lunch",
+        "test_preparation_course",
+    ])
+    target_column_name: str = "math_score"
 
 
 # Main class for handling data transformation
 class DataTransformation:
-    def __init__(self):
-        self.data_transformation_config = DataTransformationConfig()
+    def __init__(self, config: DataTransformationConfig = None):
+        self.data_transformation_config = config or DataTransformationConfig()
+        self.artifact_store = ArtifactStore()
 
-    def get_data_transformer_object(self):
+    def export_compiled_preprocessor(self, preprocessing_obj):
+        '''
+        Saves the verified NumPy export of the fitted preprocessor, tagged with
+        the digest of the saved preprocessor file, or removes a stale export
+        when it cannot be compiled exactly.
+        '''
+        config = self.data_transformation_config
+        compiled = try_compile_preprocessor(preprocessing_obj)
+        if compiled is None:
+            if os.path.exists(config.compiled_preprocessor_file_path):
+                os.remove(config.compiled_preprocessor_file_path)
+            return False
+        compiled.source_digest = file_digest(config.preprocessor_obj_file_path)
+        save_object(file_path=config.compiled_preprocessor_file_path, obj=compiled)
+        return True
+
+    def get_data_transformer_object(self, categories="auto"):
         '''
         Creates and returns a ColumnTransformer with preprocessing pipelines
-        for numerical and categorical features.
+        for numerical and categorical features. `categories` is passed to the
+        OneHotEncoder; the streaming mode sets it from one-pass counts.
         '''
         try:
-            numerical_columns = ["writing_score", "reading_score"]
-            categorical_columns = [
-                "gender",
-                "race_ethnicity",
-                "parental_level_of_education",
-                "lunch",
-                "test_preparation_course",
-            ]
+            numerical_columns = self.data_transformation_config.numerical_columns
+            categorical_columns = self.data_transformation_config.categorical_columns
 
             # Pipeline for numerical features: median imputation + standard scaling
             num_pipeline = Pipeline(steps=[
@@ -54,7 +90,7 @@ class DataTransformation:
             # Pipeline for categorical features: frequent imputation + OneHot + scale
             cat_pipeline = Pipeline(steps=[
                 ("imputer", SimpleImputer(strategy="most_frequent")),
-                ("one_hot_encoder", OneHotEncoder()),
+                ("one_hot_encoder", OneHotEncoder(categories=categories)),
                 ("scaler", StandardScaler(with_mean=False))
             ])
 
@@ -65,7 +101,7 @@ class DataTransformation:
             preprocessor = ColumnTransformer(transformers=[
                 ("num_pipeline", num_pipeline, numerical_columns),
                 ("cat_pipeline", cat_pipeline, categorical_columns)
-            ])
+            ], sparse_threshold=self.data_transformation_config.sparse_threshold)
 
             return preprocessor
 
@@ -79,15 +115,16 @@ class DataTransformation:
         and saves the preprocessor object.
         '''
         try:
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
+            # Format is detected from the path: columnar .npyd/.parquet/.feather or legacy CSV
+            train_df = self.artifact_store.load_frame(train_path)
+            test_df = self.artifact_store.load_frame(test_path)
 
             logging.info("Read train and test data completed")
             logging.info("Obtaining preprocessing object")
 
             preprocessing_obj = self.get_data_transformer_object()
 
-            target_column_name = "math_score"
+            target_column_name = self.data_transformation_config.target_column_name
 
             input_feature_train_df = train_df.drop(columns=[target_column_name], axis=1)
             target_feature_train_df = train_df[target_column_name]
@@ -101,9 +138,9 @@ class DataTransformation:
             input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
             input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
 
-            # Combine input and target arrays
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
+            # Keep features and target apart: no dense np.c_ copy, sparse features stay sparse
+            target_feature_train_arr = target_feature_train_df.to_numpy()
+            target_feature_test_arr = target_feature_test_df.to_numpy()
 
             logging.info("Saving preprocessing object as a pickle file")
 
@@ -111,12 +148,258 @@ class DataTransformation:
                 file_path=self.data_transformation_config.preprocessor_obj_file_path,
                 obj=preprocessing_obj
             )
+            self.export_compiled_preprocessor(preprocessing_obj)
+
+            config = self.data_transformation_config
+            self.artifact_store.save_matrix(input_feature_train_arr, config.train_features_file_path)
+            self.artifact_store.save_array(target_feature_train_arr, config.train_target_file_path)
+            self.artifact_store.save_matrix(input_feature_test_arr, config.test_features_file_path)
+            self.artifact_store.save_array(target_feature_test_arr, config.test_target_file_path)
 
             return (
-                train_arr,
-                test_arr,
+                (input_feature_train_arr, target_feature_train_arr),
+                (input_feature_test_arr, target_feature_test_arr),
                 self.data_transformation_config.preprocessor_obj_file_path
             )
 
         except Exception as e:
             raise CustomException(e, sys)
+
+
+    def _streaming_statistics(self, train_shards):
+        '''
+        Pass 1: exact value counts per column, which give the medians, the most
+        frequent categories and the category vocabularies in one pass.
+        '''
+        config = self.data_transformation_config
+        counts = {name: pd.Series(dtype="int64") for name in config.numerical_columns + config.categorical_columns}
+        for shard_path in train_shards:
+            shard = self.artifact_store.load_frame(shard_path)
+            for name in counts:
+                counts[name] = counts[name].add(shard[name].value_counts(dropna=True), fill_value=0)
+        return counts
+
+    def _fit_streaming_preprocessor(self, train_shards):
+        config = self.data_transformation_config
+        counts = self._streaming_statistics(train_shards)
+
+        # One summary row holding each column's median / most frequent value fits the
+        # imputers exactly; the encoder gets the full vocabulary explicitly
+        summary = {}
+        for name in config.numerical_columns:
+            values = counts[name].sort_index()
+            cumulative = values.cumsum().to_numpy()
+            total = cumulative[-1]
+            lower = values.index[np.searchsorted(cumulative, (total - 1) // 2, side="right")]
+            upper = values.index[np.searchsorted(cumulative, total // 2, side="right")]
+            summary[name] = [(lower + upper) / 2]
+        for name in config.categorical_columns:
+            summary[name] = [counts[name].sort_index().idxmax()]
+        categories = [sorted(counts[name].index) for name in config.categorical_columns]
+
+        preprocessor = self.get_data_transformer_object(categories=categories)
+        preprocessor.fit(pd.DataFrame(summary))
+
+        # Pass 2: the scalers are re-fitted with partial_fit over all training shards
+        scalers = {}
+        for name, pipeline, _ in preprocessor.transformers_:
+            if name != "remainder":
+                scalers[name] = clone(pipeline.named_steps["scaler"])
+        for shard_path in train_shards:
+            shard = self.artifact_store.load_frame(shard_path)
+            for name, pipeline, columns in preprocessor.transformers_:
+                if name in scalers:
+                    scalers[name].partial_fit(pipeline[:-1].transform(shard[columns]))
+        for name, pipeline, _ in preprocessor.transformers_:
+            if name in scalers:
+                pipeline.steps[-1] = ("scaler", scalers[name])
+        return preprocessor
+
+    def _write_transformed(self, preprocessor, shards, features_file_path, target_file_path):
+        '''
+        Pass 3: transforms shard by shard. Dense features go straight into a
+        pre-sized memory-mapped .npy, so peak memory is one shard; sparse features
+        are stacked as CSR, so memory tracks the number of non-zeros.
+        '''
+        from scipy import sparse
+
+        config = self.data_transformation_config
+        n_rows = sum(self.artifact_store.frame_length(shard_path) for shard_path in shards)
+        os.makedirs(os.path.dirname(target_file_path) or ".", exist_ok=True)
+        self.artifact_store.remove_matrix(features_file_path)
+        target = np.lib.format.open_memmap(target_file_path, mode="w+", dtype=np.float64, shape=(n_rows,))
+        dense_out, sparse_parts = None, []
+        start = 0
+        for shard_path in shards:
+            shard = self.artifact_store.load_frame(shard_path)
+            if len(shard) == 0:
+                continue
+            features = preprocessor.transform(shard.drop(columns=[config.target_column_name]))
+            if sparse.issparse(features):
+                sparse_parts.append(features.tocsr())
+            else:
+                if dense_out is None:
+                    dense_out = np.lib.format.open_memmap(
+                        features_file_path, mode="w+", dtype=np.float64, shape=(n_rows, features.shape[1])
+                    )
+                dense_out[start:start + len(shard)] = features
+            target[start:start + len(shard)] = shard[config.target_column_name].to_numpy()
+            start += len(shard)
+
+        target.flush()
+        if dense_out is not None:
+            dense_out.flush()
+        if sparse_parts:
+            self.artifact_store.save_matrix(sparse.vstack(sparse_parts, format="csr"), features_file_path)
+        return features_file_path, target_file_path
+
+    def initiate_streaming_transformation(self, train_shard_dir, test_shard_dir):
+        '''
+        Out-of-core variant of initiate_data_transformation. Fits the preprocessor
+        with one-pass statistics over the training shards and writes the
+        transformed train/test features and targets incrementally. Produces the
+        same artifacts as the in-memory path, and returns their paths.
+        '''
+        try:
+            train_shards = self.artifact_store.list_frames(train_shard_dir)
+            test_shards = self.artifact_store.list_frames(test_shard_dir)
+            logging.info(f"Streaming transformation over {len(train_shards)} train and {len(test_shards)} test shards")
+
+            preprocessing_obj = self._fit_streaming_preprocessor(train_shards)
+
+            config = self.data_transformation_config
+            self._write_transformed(
+                preprocessing_obj, train_shards, config.train_features_file_path, config.train_target_file_path
+            )
+            self._write_transformed(
+                preprocessing_obj, test_shards, config.test_features_file_path, config.test_target_file_path
+            )
+
+            save_object(
+                file_path=self.data_transformation_config.preprocessor_obj_file_path,
+                obj=preprocessing_obj
+            )
+            self.export_compiled_preprocessor(preprocessing_obj)
+
+            return (
+                (config.train_features_file_path, config.train_target_file_path),
+                (config.test_features_file_path, config.test_target_file_path),
+                config.preprocessor_obj_file_path
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+    @staticmethod
+    def _scaler_state(preprocessor):
+        # (mean, scale) of every scaler in output column order; None where a scaler does not center/scale
+        state = []
+        for name, pipeline, _ in preprocessor.transformers_:
+            if name == "remainder":
+                continue
+            scaler = pipeline.named_steps["scaler"]
+            mean, scale = getattr(scaler, "mean_", None), getattr(scaler, "scale_", None)
+            width = scaler.n_features_in_
+            state.append((
+                np.zeros(width) if mean is None or not scaler.with_mean else np.array(mean),
+                np.ones(width) if scale is None else np.array(scale),
+            ))
+        return state
+
+    def update_preprocessor(self, preprocessor, new_rows):
+        '''
+        Folds `new_rows` into the fitted scalers with partial_fit, which combines
+        the running mean/variance exactly instead of refitting on all rows.
+        Imputer fill values and category vocabularies are kept; new categories
+        need a full run, since they change the feature columns.
+
+        Returns (scale, shift) mapping every old output column to the new one,
+        `new = scale * old + shift`, for re-expressing a model in the new units.
+        '''
+        for name, pipeline, columns in preprocessor.transformers_:
+            if name == "remainder" or "one_hot_encoder" not in pipeline.named_steps:
+                continue
+            encoder = pipeline.named_steps["one_hot_encoder"]
+            for column, known in zip(columns, encoder.categories_):
+                unseen = set(new_rows[column].dropna()) - set(known)
+                if unseen:
+                    raise ValueError(
+                        f"New categories {sorted(unseen)} in column {column}: run the full pipeline instead"
+                    )
+
+        before = self._scaler_state(preprocessor)
+        for name, pipeline, columns in preprocessor.transformers_:
+            if name != "remainder":
+                pipeline.named_steps["scaler"].partial_fit(pipeline[:-1].transform(new_rows[columns]))
+        after = self._scaler_state(preprocessor)
+
+        # old = (x - m) / s and new = (x - m') / s'  =>  new = old * s / s' + (m - m') / s'
+        scale = np.concatenate([s_old / s_new for (_, s_old), (_, s_new) in zip(before, after)])
+        shift = np.concatenate([(m_old - m_new) / s_new for (m_old, _), (m_new, s_new) in zip(before, after)])
+        logging.info(f"Updated the preprocessor scalers with {len(new_rows)} rows "
+                     f"(largest scale change {np.abs(scale - 1).max():.2e})")
+        return scale, shift
+
+    def initiate_incremental_transformation(self, train_path, test_path, new_train_rows, streaming=False):
+        '''
+        Incremental refresh: updates the saved preprocessor with the new training
+        rows (see update_preprocessor) instead of refitting it, then rewrites the
+        transformed train/test artifacts, which only costs a transform. Returns
+        the same tuple as initiate_data_transformation plus the feature map
+        (scale, shift, values) from the old to the new feature units, where
+        `values` pairs the old and new value of every feature on the data
+        (see warm_start.value_pairs).
+        '''
+        try:
+            config = self.data_transformation_config
+            preprocessing_obj = load_object(config.preprocessor_obj_file_path)
+            previous_obj = copy.deepcopy(preprocessing_obj)
+            target_column_name = config.target_column_name
+            scale, shift = self.update_preprocessor(
+                preprocessing_obj, new_train_rows.drop(columns=[target_column_name])
+            )
+
+            if streaming:
+                frames = self.artifact_store.list_frames(train_path) + self.artifact_store.list_frames(test_path)
+            else:
+                frames = [train_path, test_path]
+            values = None
+            for frame_path in frames:
+                features = self.artifact_store.load_frame(frame_path).drop(columns=[target_column_name])
+                values = value_pairs(previous_obj.transform(features), preprocessing_obj.transform(features), values)
+
+            if streaming:
+                self._write_transformed(
+                    preprocessing_obj, self.artifact_store.list_frames(train_path),
+                    config.train_features_file_path, config.train_target_file_path
+                )
+                self._write_transformed(
+                    preprocessing_obj, self.artifact_store.list_frames(test_path),
+                    config.test_features_file_path, config.test_target_file_path
+                )
+                train_set = (config.train_features_file_path, config.train_target_file_path)
+                test_set = (config.test_features_file_path, config.test_target_file_path)
+            else:
+                train_df = self.artifact_store.load_frame(train_path)
+                test_df = self.artifact_store.load_frame(test_path)
+                train_set = (
+                    preprocessing_obj.transform(train_df.drop(columns=[target_column_name])),
+                    train_df[target_column_name].to_numpy(),
+                )
+                test_set = (
+                    preprocessing_obj.transform(test_df.drop(columns=[target_column_name])),
+                    test_df[target_column_name].to_numpy(),
+                )
+                self.artifact_store.save_matrix(train_set[0], config.train_features_file_path)
+                self.artifact_store.save_array(train_set[1], config.train_target_file_path)
+                self.artifact_store.save_matrix(test_set[0], config.test_features_file_path)
+                self.artifact_store.save_array(test_set[1], config.test_target_file_path)
+
+            save_object(file_path=config.preprocessor_obj_file_path, obj=preprocessing_obj)
+            self.export_compiled_preprocessor(preprocessing_obj)
+
+            return train_set, test_set, config.preprocessor_obj_file_path, (scale, shift, values)
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,495 @@
+# Standard library imports
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+
+# Custom exception handling and logging
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import METRICS
+from src.components.profiling import ResourceProbe
+from src.components.trial_cache import TrialCache, TrialCacheConfig, data_fingerprint, estimator_spec
+
+
+# Configuration class for the cheap screening pass that runs before the full search
+@dataclass
+class ScreeningConfig:
+    top_k: int = 3                   # Families that go on to the full search
+    margin: float = 0.1              # Families more than this many R2 points behind the leader are cut
+    max_rows: int = 2000             # Training rows per fold in the screening pass
+    fraction: float = 0.25           # ... or this share of each fold, whichever is smaller
+
+
+# Configuration class for the hyperparameter search engine
+@dataclass
+class ModelSearchConfig:
+    strategy: str = "grid"           # "grid", "random" or "halving" (successive halving)
+    n_jobs: int = -1                 # Core budget for the process pool, -1 = all cores
+    cv: int = 3                      # Number of CV folds
+    n_iter: int = 10                 # Candidates per model for the "random" strategy
+    halving_factor: int = 3          # Survivors per round = candidates / factor
+    min_resources: int = None        # Training rows in the first halving round (None = auto)
+    time_budget_s: float = None      # Wall-clock budget for the whole search (None = unlimited)
+    random_state: int = 42           # Seeds the row subsets, candidate sampling and every estimator
+    share_arrays: bool = True        # Memory-map the training data once for all pool workers
+    shared_dir: str = None           # Where to put it (None = /dev/shm when present, else the temp dir)
+    cache: TrialCacheConfig = field(default_factory=TrialCacheConfig)  # None disables the trial cache
+    screening: ScreeningConfig = None  # Tiered selection: screen families with defaults first (None = off)
+    # Record CPU, peak memory and train score for every fit (see profiling.py); trials are not
+    # answered from the cache, so every one of them is measured
+    profile: bool = False
+
+
+FIT_SECONDS = METRICS.histogram(
+    "train_fit_seconds", "Duration of one estimator fit during model search", ("model", "phase")
+)
+SCORE_SECONDS = METRICS.histogram("train_score_seconds", "Duration of scoring one CV fold", ("model",))
+
+
+@dataclass
+class SearchResult:
+    '''
+    Outcome of searching one model family.
+    '''
+    best_params: dict
+    best_score: float                # Mean CV R2 of best_params, None if nothing was cross-validated
+    best_estimator: object           # Refit on the full training data with best_params
+    cv_results: list = field(default_factory=list)
+    refit_time_s: float = None       # None when the refit estimator came from the trial cache
+    screening: dict = None           # Result of the screening pass, when one ran
+
+
+@dataclass
+class _Trial:
+    model_name: str
+    candidate: int
+    params: dict
+    fold: int
+    n_resources: int
+    estimator: object = None
+    key: str = None
+
+
+def accepts_sparse(estimator):
+    '''
+    Whether the estimator can be fit on scipy sparse input. Estimators without
+    sklearn tags (e.g. CatBoost) are assumed to accept it.
+    '''
+    try:
+        return estimator.__sklearn_tags__().input_tags.sparse
+    except AttributeError:
+        return True
+
+
+def as_model_input(estimator, X):
+    # Sparse matrices are only densified for estimators that cannot take them
+    if hasattr(X, "toarray") and not accepts_sparse(estimator):
+        return X.toarray()
+    return X
+
+
+def seed_estimator(estimator, random_state):
+    '''
+    Sets every unset seed of an unfitted estimator to `random_state`, nested
+    estimators included, so fits do not depend on global random state or on
+    which worker runs them. CatBoost only reports explicitly set parameters,
+    so its seed is set by name.
+    '''
+    params = estimator.get_params(deep=True)
+    seeds = {
+        key: random_state for key, value in params.items()
+        if (key == "random_state" or key.endswith("__random_state")) and value is None
+    }
+    if type(estimator).__module__.startswith("catboost") and params.get("random_seed") is None \
+            and params.get("random_state") is None:
+        seeds["random_seed"] = random_state
+    return estimator.set_params(**seeds) if seeds else estimator
+
+
+def _is_memmapped(array):
+    if hasattr(array, "indptr"):
+        return all(isinstance(getattr(array, part), np.memmap) for part in ("data", "indices", "indptr"))
+    return isinstance(array, np.memmap)
+
+
+def _fit_and_score(estimator, X, y, train_idx, test_idx, profile=False):
+    # Runs inside a pool worker: fit on one fold and score R2 on its held-out part.
+    # Returns (score, fit seconds, score seconds, profile), timed in the worker itself;
+    # profile is None unless requested
+    if profile:
+        return _fit_and_score_profiled(estimator, X, y, train_idx, test_idx)
+    start = time.perf_counter()
+    estimator.fit(as_model_input(estimator, X[train_idx]), y[train_idx])
+    fitted = time.perf_counter()
+    score = r2_score(y[test_idx], estimator.predict(as_model_input(estimator, X[test_idx])))
+    return score, fitted - start, time.perf_counter() - fitted, None
+
+
+def _fit_and_score_profiled(estimator, X, y, train_idx, test_idx):
+    # One probe for the trial's peak memory; fit and predict are timed inside it
+    with ResourceProbe() as trial:
+        start, start_cpu = time.perf_counter(), time.process_time()
+        X_train = as_model_input(estimator, X[train_idx])
+        estimator.fit(X_train, y[train_idx])
+        fitted, fitted_cpu = time.perf_counter(), time.process_time()
+        score = r2_score(y[test_idx], estimator.predict(as_model_input(estimator, X[test_idx])))
+        scored, scored_cpu = time.perf_counter(), time.process_time()
+    fit_s = fitted - start
+    profile = {
+        "fit_cpu_s": fitted_cpu - start_cpu,
+        "fit_cpu_utilisation": (fitted_cpu - start_cpu) / fit_s if fit_s > 0 else None,
+        "predict_cpu_s": scored_cpu - fitted_cpu,
+        "peak_memory_mb": trial.peak_memory_mb,
+        # Outside the timings: the gap to the held-out score shows overfitting
+        "train_score": r2_score(y[train_idx], estimator.predict(X_train)),
+    }
+    return score, fit_s, scored - fitted, profile
+
+
+def _refit(estimator, X, y, profile=False):
+    if not profile:
+        start = time.perf_counter()
+        estimator.fit(as_model_input(estimator, X), y)
+        return estimator, time.perf_counter() - start, None
+    with ResourceProbe() as probe:
+        estimator.fit(as_model_input(estimator, X), y)
+    details = {"fit_cpu_s": probe.cpu_s, "fit_cpu_utilisation": probe.cpu_utilisation,
+               "peak_memory_mb": probe.peak_memory_mb}
+    return estimator, probe.wall_s, details
+
+
+class ModelSearch:
+    '''
+    Hyperparameter search over several model families at once.
+
+    Every (model, candidate, fold) fit is an independent task, so all models and
+    folds fan out across one process pool of `n_jobs` workers. The workers read
+    the training data from one memory-mapped copy, and all seeds are fixed by
+    `random_state`, so results do not depend on `n_jobs`. Each model's best
+    candidate is refit once on the full training data and that refit is returned;
+    callers must not train the model a second time.
+    '''
+
+    def __init__(self, config: ModelSearchConfig = None):
+        self.search_config = config or ModelSearchConfig()
+        self.cache = None
+        # {model_name: screening result} for every family, including the ones that were cut
+        self.screening_results = {}
+        # One dict per (model, params, fold) fit and per refit when `profile` is set
+        self.profile_rows = []
+
+    def _candidates(self, grid):
+        config = self.search_config
+        candidates = list(ParameterGrid(grid))
+        if config.strategy == "random" and len(candidates) > config.n_iter:
+            candidates = list(ParameterSampler(grid, n_iter=config.n_iter, random_state=config.random_state))
+        return candidates
+
+    def _rounds(self, n_candidates, n_samples):
+        '''
+        Returns the training-set size of each round; grid/random search is a
+        single round on all rows.
+        '''
+        config = self.search_config
+        if config.strategy != "halving" or n_candidates <= 1:
+            return [n_samples]
+        n_rounds = max(1, math.ceil(math.log(n_candidates, config.halving_factor)))
+        min_resources = config.min_resources or max(
+            config.cv * 2, n_samples // config.halving_factor ** (n_rounds - 1)
+        )
+        return [min(n_samples, min_resources * config.halving_factor ** i) for i in range(n_rounds)]
+
+    def _trial_key(self, data_key, estimator, fold=None, n_resources=None):
+        config = self.search_config
+        return TrialCache.key(
+            data=data_key,
+            estimator=estimator_spec(estimator),
+            cv={"kind": "KFold", "n_splits": config.cv, "subset_seed": config.random_state},
+            fold=fold,
+            n_resources=n_resources,
+        )
+
+    def _run_trials(self, parallel, trials, X, y, folds, subsets, deadline):
+        '''
+        Runs trials in pool-sized chunks, stopping between chunks once the time
+        budget is spent. Cached trials are not run again.
+        Returns {(model_name, candidate, fold): score} and, for the trials that
+        actually ran, {(model_name, candidate, fold): (fit seconds, score seconds)}.
+        '''
+        profile = self.search_config.profile
+        scores, timings, pending = {}, {}, []
+        for trial in trials:
+            score = self.cache.get_score(trial.key) if self.cache and not profile else None
+            if score is None:
+                pending.append(trial)
+            else:
+                scores[(trial.model_name, trial.candidate, trial.fold)] = score
+
+        chunk_size = max(1, len(pending) if deadline is None else 2 * effective_n_jobs(parallel.n_jobs))
+        for start in range(0, len(pending), chunk_size):
+            if deadline is not None and time.monotonic() >= deadline:
+                logging.info(f"Search time budget exhausted after {len(scores)} of {len(trials)} trials")
+                break
+            chunk = pending[start:start + chunk_size]
+            results = parallel(
+                delayed(_fit_and_score)(
+                    trial.estimator, X, y,
+                    subsets[(trial.fold, trial.n_resources)], folds[trial.fold][1], profile,
+                )
+                for trial in chunk
+            )
+            for trial, (score, fit_s, score_s, details) in zip(chunk, results):
+                scores[(trial.model_name, trial.candidate, trial.fold)] = score
+                timings[(trial.model_name, trial.candidate, trial.fold)] = (fit_s, score_s)
+                if details is not None:
+                    self.profile_rows.append(dict(
+                        model=trial.model_name, phase="screening" if trial.candidate == -1 else "search",
+                        params=trial.params, fold=trial.fold, n_resources=trial.n_resources,
+                        fit_s=fit_s, predict_s=score_s, score=score, **details,
+                    ))
+                FIT_SECONDS.observe(fit_s, model=trial.model_name, phase="cv")
+                SCORE_SECONDS.observe(score_s, model=trial.model_name)
+                if self.cache:
+                    self.cache.put_score(trial.key, score)
+        return scores, timings
+
+    def _screen(self, parallel, models, X, y, folds, shuffled_folds, data_key, deadline):
+        '''
+        Tier one of the tiered selection: cross-validates every family with its
+        default parameters on a subsample of each training fold, then keeps the
+        `top_k` best families that are within `margin` R2 of the leader.
+        Returns the names of the families to search in full.
+        '''
+        screening = self.search_config.screening
+        n_rows = min(len(train_idx) for train_idx in shuffled_folds)
+        size = max(2, min(screening.max_rows, int(n_rows * screening.fraction)))
+        subsets = {(fold, size): np.sort(train_idx[:size]) for fold, train_idx in enumerate(shuffled_folds)}
+
+        trials = []
+        for name, model in models.items():
+            for fold in range(len(folds)):
+                estimator = clone(model)
+                trials.append(_Trial(
+                    name, -1, {}, fold, size, estimator=estimator,
+                    key=self._trial_key(data_key, estimator, fold, size) if self.cache else None,
+                ))
+        start = time.perf_counter()
+        scores, timings = self._run_trials(parallel, trials, X, y, folds, subsets, deadline)
+
+        ranked = []
+        for name in models:
+            fold_scores = [scores.get((name, -1, fold)) for fold in range(len(folds))]
+            fold_timings = [timings.get((name, -1, fold), (None, None)) for fold in range(len(folds))]
+            complete = all(score is not None for score in fold_scores)
+            self.screening_results[name] = {
+                "n_resources": size,
+                "fold_scores": fold_scores,
+                "mean_score": float(np.mean(fold_scores)) if complete else None,
+                "fit_times": [fit_s for fit_s, _ in fold_timings],      # None = cached
+            }
+            if complete:
+                ranked.append((self.screening_results[name]["mean_score"], name))
+        ranked.sort(key=lambda item: -item[0])
+
+        if not ranked:
+            # Budget ran out before anything was screened: fall back to searching everything
+            kept = list(models)
+        else:
+            leader = ranked[0][0]
+            kept = [name for score, name in ranked[:screening.top_k] if score >= leader - screening.margin]
+        for rank, (score, name) in enumerate(ranked, start=1):
+            self.screening_results[name]["rank"] = rank
+        for name, result in self.screening_results.items():
+            result["kept"] = name in kept
+
+        logging.info(
+            f"Screened {len(models)} model families on {size} rows per fold in "
+            f"{time.perf_counter() - start:.2f}s, searching {kept}"
+        )
+        return kept
+
+    def _share_arrays(self, X, y):
+        '''
+        Writes in-memory training data to a memory-mapped file once and returns
+        views on it, plus the directory to remove afterwards (None if nothing
+        was written). joblib passes memory-mapped arrays to its workers by file
+        reference, so every CV task of every model reads the same pages instead
+        of receiving its own pickled copy.
+        '''
+        config = self.search_config
+        if not config.share_arrays or effective_n_jobs(config.n_jobs) <= 1:
+            return X, y, None
+        if _is_memmapped(X) and _is_memmapped(y):
+            # Already file-backed, e.g. the matrices DataTransformation wrote to the artifact store
+            return X, y, None
+
+        from src.artifact_store import ArtifactStore
+
+        shared_dir = config.shared_dir or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+        directory = tempfile.mkdtemp(prefix="model_search_", dir=shared_dir)
+        store = ArtifactStore()
+        store.save_matrix(X, os.path.join(directory, "X.npy"))
+        store.save_array(np.asarray(y), os.path.join(directory, "y.npy"))
+        logging.info(f"Shared training data for the search workers in {directory}")
+        return store.load_matrix(os.path.join(directory, "X.npy")), store.load_array(os.path.join(directory, "y.npy")), directory
+
+    def run(self, models, params, X, y):
+        '''
+        Searches every model in `models` over its grid in `params` and returns
+        {model_name: SearchResult}. With `screening` configured, only the families
+        that survive the screening pass are searched and returned; every family's
+        screening outcome is in `screening_results`.
+        '''
+        shared_dir = None
+        try:
+            config = self.search_config
+            n_samples = X.shape[0]
+            X, y, shared_dir = self._share_arrays(X, y)
+            # Seeded once here, so every clone made below inherits the seeds
+            models = {name: seed_estimator(clone(model), config.random_state) for name, model in models.items()}
+            deadline = None if config.time_budget_s is None else time.monotonic() + config.time_budget_s
+
+            self.cache = TrialCache(config.cache) if config.cache is not None else None
+            data_key = data_fingerprint(X, y) if self.cache else None
+
+            folds = list(KFold(n_splits=config.cv).split(X))
+            rng = np.random.RandomState(config.random_state)
+            shuffled_folds = [rng.permutation(train_idx) for train_idx, _ in folds]
+
+            self.screening_results = {}
+            self.profile_rows = []
+            with Parallel(n_jobs=config.n_jobs) as parallel:
+                if config.screening is not None and len(models) > 1:
+                    kept = self._screen(parallel, models, X, y, folds, shuffled_folds, data_key, deadline)
+                    models = {name: models[name] for name in kept}
+
+                candidates = {name: self._candidates(params.get(name, {})) for name in models}
+                rounds = {name: self._rounds(len(candidates[name]), n_samples) for name in models}
+                survivors = {name: list(range(len(candidates[name]))) for name in models}
+                cv_results = {name: [] for name in models}
+                # Best candidate of each model's last completed round
+                leaders = {name: None for name in models}
+
+                for round_index in range(max(len(r) for r in rounds.values())):
+                    trials, subsets = [], {}
+                    for name in models:
+                        # A lone candidate needs no cross-validation, only the refit
+                        if len(survivors[name]) <= 1 or round_index >= len(rounds[name]):
+                            continue
+                        n_resources = rounds[name][round_index]
+                        for fold, train_idx in enumerate(shuffled_folds):
+                            size = max(2, int(len(train_idx) * n_resources / n_samples))
+                            subsets[(fold, n_resources)] = np.sort(train_idx[:size])
+                        for candidate in survivors[name]:
+                            for fold in range(len(folds)):
+                                trial_params = candidates[name][candidate]
+                                estimator = clone(models[name]).set_params(**trial_params)
+                                trials.append(_Trial(
+                                    name, candidate, trial_params, fold, n_resources,
+                                    estimator=estimator,
+                                    key=self._trial_key(data_key, estimator, fold, n_resources) if self.cache else None,
+                                ))
+                    if not trials:
+                        break
+
+                    # Interleave models so a time budget is shared fairly between them
+                    order = {name: i for i, name in enumerate(models)}
+                    trials.sort(key=lambda t: (survivors[t.model_name].index(t.candidate), order[t.model_name], t.fold))
+                    scores, timings = self._run_trials(parallel, trials, X, y, folds, subsets, deadline)
+
+                    for name in models:
+                        if len(survivors[name]) <= 1 or round_index >= len(rounds[name]):
+                            continue
+                        ranked = []
+                        for candidate in survivors[name]:
+                            fold_scores = [scores.get((name, candidate, fold)) for fold in range(len(folds))]
+                            if any(score is None for score in fold_scores):
+                                continue
+                            mean_score = float(np.mean(fold_scores))
+                            ranked.append((mean_score, candidate))
+                            fold_timings = [timings.get((name, candidate, fold), (None, None)) for fold in range(len(folds))]
+                            cv_results[name].append({
+                                "params": candidates[name][candidate],
+                                "n_resources": rounds[name][round_index],
+                                "fold_scores": fold_scores,
+                                "mean_score": mean_score,
+                                "fit_times": [fit_s for fit_s, _ in fold_timings],      # None = cached
+                                "score_times": [score_s for _, score_s in fold_timings],
+                            })
+                        ranked.sort(key=lambda item: -item[0])
+                        if not ranked:
+                            # Budget ran out before any candidate of this round finished: keep the
+                            # previous round's leader, or the defaults if no round completed
+                            leader = leaders[name]
+                            survivors[name] = [leader] if leader is not None else []
+                            continue
+                        leaders[name] = ranked[0][1]
+                        keep = max(1, math.ceil(len(ranked) / config.halving_factor))
+                        last_round = round_index == len(rounds[name]) - 1
+                        survivors[name] = [c for _, c in (ranked[:1] if last_round else ranked[:keep])]
+
+                # Refit each model's winner once on the full training data, in parallel
+                names = list(models)
+                best_params = {
+                    name: candidates[name][survivors[name][0]] if survivors[name] else {}
+                    for name in names
+                }
+                estimators = {name: clone(models[name]).set_params(**best_params[name]) for name in names}
+                refit_keys = {
+                    name: self._trial_key(data_key, estimators[name]) if self.cache else None
+                    for name in names
+                }
+                fitted, refit_times = {}, {}
+                for name in names:
+                    cached = self.cache.get_estimator(refit_keys[name]) if self.cache and not config.profile else None
+                    if cached is not None:
+                        fitted[name] = cached
+                to_fit = [name for name in names if name not in fitted]
+                for name, (estimator, fit_s, details) in zip(to_fit, parallel(
+                    delayed(_refit)(estimators[name], X, y, config.profile) for name in to_fit
+                )):
+                    fitted[name] = estimator
+                    refit_times[name] = fit_s
+                    if details is not None:
+                        self.profile_rows.append(dict(
+                            model=name, phase="refit", params=best_params[name], fold=None,
+                            n_resources=n_samples, fit_s=fit_s, **details,
+                        ))
+                    FIT_SECONDS.observe(fit_s, model=name, phase="refit")
+                    if self.cache:
+                        self.cache.put_estimator(refit_keys[name], estimator)
+
+            if self.cache:
+                self.cache.log_summary()
+
+            results = {}
+            for name in names:
+                estimator = fitted[name]
+                scored = [r for r in cv_results[name] if r["params"] == best_params[name]]
+                results[name] = SearchResult(
+                    best_params=best_params[name],
+                    best_score=scored[-1]["mean_score"] if scored else None,
+                    best_estimator=estimator,
+                    cv_results=cv_results[name],
+                    refit_time_s=refit_times.get(name),
+                    screening=self.screening_results.get(name),
+                )
+                logging.info(f"{name}: best params {best_params[name]}, CV R2 {results[name].best_score}")
+            return results
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+        finally:
+            if shared_dir is not None:
+                shutil.rmtree(shared_dir, ignore_errors=True)
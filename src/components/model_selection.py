@@ -0,0 +1,136 @@
+import os
+import tempfile
+from dataclasses import dataclass
+
+from src import serialization
+from src.logger import logging
+from src.components.profiling import measure_inference_latency
+from src.pipeline.compiled_model import try_compile_model
+
+
+# Configuration class for choosing the model that is saved to model.pkl
+@dataclass
+class SelectionConfig:
+    # "r2": best test R2; "budget": best test R2 within the serving budgets below;
+    # "pareto": among the (R2, latency, size) Pareto front within the budgets, the
+    # fastest model at most `r2_tolerance` R2 points behind the most accurate one
+    objective: str = os.environ.get("MODEL_SELECTION_OBJECTIVE", "r2")
+    min_r2: float = 0.6                  # R2 floor, for every objective
+    max_single_row_ms: float = None      # p99 latency of a one-row predict (None = no limit)
+    max_batch_ms: float = None           # Predicting the whole test set at once (None = no limit)
+    max_size_mb: float = None            # Serialized model size (None = no limit)
+    r2_tolerance: float = 0.005
+    # Measure the engine the server will run: the compiled export when PREDICT_COMPILED_MODEL=1
+    # (for models that compile), else the model's own predict
+    serve_compiled: bool = os.environ.get("PREDICT_COMPILED_MODEL", "0") == "1"
+    latency_rows: int = 200              # Single-row predicts timed per candidate
+
+
+OBJECTIVES = ("r2", "budget", "pareto")
+
+
+def serialized_size_mb(obj):
+    '''
+    Size of `obj` written in the artifact format model.pkl is saved in.
+    '''
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.pkl")
+        serialization.dump(obj, path)
+        return os.path.getsize(path) / (1024 * 1024)
+
+
+def measure_serving_cost(model, X, config: SelectionConfig = None):
+    '''
+    What serving `model` costs: single-row latency percentiles, time to
+    predict all of `X` at once, and serialized size, for the engine that
+    would answer requests (see SelectionConfig.serve_compiled).
+    '''
+    config = config or SelectionConfig()
+    engine, engine_name = model, "library"
+    if config.serve_compiled:
+        compiled = try_compile_model(model, X)
+        if compiled is not None:
+            engine, engine_name = compiled, "compiled"
+    latency = measure_inference_latency(engine, X, n_single=config.latency_rows)
+    return {
+        "engine": engine_name,
+        "single_row_ms": latency["single_row_ms"],
+        "batch_ms": latency["batch_s"] * 1000,
+        "batch_rows": latency["batch_rows"],
+        "size_mb": serialized_size_mb(engine),
+    }
+
+
+def _budget_violations(cost, config):
+    violations = []
+    if config.max_single_row_ms is not None and cost["single_row_ms"]["p99"] > config.max_single_row_ms:
+        violations.append("single_row_ms")
+    if config.max_batch_ms is not None and cost["batch_ms"] > config.max_batch_ms:
+        violations.append("batch_ms")
+    if config.max_size_mb is not None and cost["size_mb"] > config.max_size_mb:
+        violations.append("size_mb")
+    return violations
+
+
+def pareto_front(scores, costs):
+    '''
+    Names of the models no other model beats on test R2, p99 single-row
+    latency and size at once (at least as good on all three, better on one).
+    '''
+    def objectives(name):
+        return (-scores[name], costs[name]["single_row_ms"]["p99"], costs[name]["size_mb"])
+
+    front = []
+    for name in scores:
+        mine = objectives(name)
+        dominated = False
+        for other in scores:
+            theirs = objectives(other)
+            if other != name and all(t <= m for t, m in zip(theirs, mine)) and theirs != mine:
+                dominated = True
+                break
+        if not dominated:
+            front.append(name)
+    return front
+
+
+def select_model(scores, costs, config: SelectionConfig = None):
+    '''
+    Chooses the model to save from {name: test R2} and {name: serving cost}
+    (measure_serving_cost). Returns (name, details) where details records the
+    objective, the budgets each model broke and the Pareto front, for the
+    training report. Raises ValueError when no model clears the R2 floor and
+    the budgets.
+    '''
+    config = config or SelectionConfig()
+    if config.objective not in OBJECTIVES:
+        raise ValueError(f"Unknown selection objective {config.objective!r}, expected one of {OBJECTIVES}")
+
+    violations = {name: _budget_violations(costs[name], config) for name in scores}
+    eligible = [name for name in scores if scores[name] >= config.min_r2]
+    if config.objective != "r2":
+        eligible = [name for name in eligible if not violations[name]]
+    front = pareto_front(scores, costs)
+    details = {
+        "objective": config.objective,
+        "min_r2": config.min_r2,
+        "budgets": {
+            "max_single_row_ms": config.max_single_row_ms,
+            "max_batch_ms": config.max_batch_ms,
+            "max_size_mb": config.max_size_mb,
+        },
+        "pareto_front": front,
+        "over_budget": {name: violation for name, violation in violations.items() if violation},
+    }
+    if not eligible:
+        raise ValueError(f"No model reaches R2 {config.min_r2} within the serving budgets: {details}")
+
+    # max keeps the first of equal scores, in the model zoo's order
+    best = max(eligible, key=lambda name: scores[name])
+    if config.objective == "pareto":
+        near_best = [name for name in front if name in eligible and scores[name] >= scores[best] - config.r2_tolerance]
+        if near_best:
+            best = min(near_best, key=lambda name: (costs[name]["single_row_ms"]["p99"], costs[name]["size_mb"]))
+        details["r2_tolerance"] = config.r2_tolerance
+    logging.info(f"Selected {best} by objective {config.objective!r}: R2 {scores[best]}, serving cost {costs[best]}")
+    return best, details
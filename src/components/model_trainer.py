@@ -1,118 +1,227 @@
 # Standard library imports
+import json
 import os
 import sys
-from dataclasses import dataclass
-
-# Importing regression models from popular libraries
-from catboost import CatBoostRegressor
-from sklearn.ensemble import (
-    AdaBoostRegressor,
-    GradientBoostingRegressor,
-    RandomForestRegressor,
-)
-from sklearn.linear_model import LinearRegression
+import time
+from dataclasses import dataclass, field
+
 from sklearn.metrics import r2_score
-from sklearn.neighbors import KNeighborsRegressor
-from sklearn.tree import DecisionTreeRegressor
-from xgboost import XGBRegressor
 
 # Custom exception handling and logging
 from src.exception import CustomException
 from src.logger import logging
+from src.metrics import METRICS
 
 # Utility functions for saving model and evaluating performance
-from src.utils import save_object, evaluate_models
+from src.utils import save_object, load_object, evaluate_models, file_digest
+from src.components.model_search import ModelSearchConfig, as_model_input, seed_estimator
+from src.components.warm_start import WarmStartConfig, continue_training, rescale_model_inputs
+from src.components.profiling import measure_inference_latency, summarize_profile
+from src.components.model_selection import SelectionConfig, measure_serving_cost, select_model
+from src.pipeline.compiled_model import try_compile_model
 
-# Configuration class to hold model file path
+# Configuration class to hold model file path and search settings
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = os.path.join("artifacts", "model.pkl")
+    training_report_file_path = os.path.join("artifacts", "training_report.json")
+    # NumPy inference engine exported from the best model, when it can be compiled
+    compiled_model_file_path = os.path.join("artifacts", "model_compiled.pkl")
+    # Written when search_config.profile is set: per-fit costs and serving latency
+    training_profile_file_path = os.path.join("artifacts", "training_profile.json")
+    search_config: ModelSearchConfig = field(default_factory=ModelSearchConfig)
+    # Which model is saved: best R2, or best within a latency/size budget (see model_selection.py)
+    selection_config: SelectionConfig = field(default_factory=SelectionConfig)
+    # How much the selected model grows on an incremental refresh
+    warm_start_config: WarmStartConfig = field(default_factory=WarmStartConfig)
+
+
+def get_model_zoo():
+    '''
+    Returns (models, params): the candidate regressors and their hyperparameter
+    grids. The model libraries, CatBoost and XGBoost in particular, are imported
+    here rather than at module level, so only training pays for them.
+    '''
+    # Importing regression models from popular libraries
+    from catboost import CatBoostRegressor
+    from sklearn.ensemble import (
+        AdaBoostRegressor,
+        GradientBoostingRegressor,
+        RandomForestRegressor,
+    )
+    from sklearn.linear_model import LinearRegression
+    from sklearn.tree import DecisionTreeRegressor
+    from xgboost import XGBRegressor
+
+    # Define the set of models to train
+    models = {
+        "Random Forest": RandomForestRegressor(),
+        "Decision Tree": DecisionTreeRegressor(),
+        "Gradient Boosting": GradientBoostingRegressor(),
+        "Linear Regression": LinearRegression(),
+        "XGBRegressor": XGBRegressor(),
+        # No catboost_info/ training logs in the working directory
+        "CatBoosting Regressor": CatBoostRegressor(verbose=False, allow_writing_files=False),
+        "AdaBoost Regressor": AdaBoostRegressor(),
+    }
+
+    # Define hyperparameter grids for tuning
+    params = {
+        "Decision Tree": {
+            'criterion': ['squared_error', 'friedman_mse', 'absolute_error', 'poisson']
+        },
+        "Random Forest": {
+            'n_estimators': [8, 16, 32, 64, 128, 256]
+        },
+        "Gradient Boosting": {
+            'learning_rate': [0.1, 0.01, 0.05, 0.001],
+            'subsample': [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
+            'n_estimators': [8, 16, 32, 64, 128, 256]
+        },
+        "Linear Regression": {},
+        "XGBRegressor": {
+            'learning_rate': [0.1, 0.01, 0.05, 0.001],
+            'n_estimators': [8, 16, 32, 64, 128, 256]
+        },
+        "CatBoosting Regressor": {
+            'depth': [6, 8, 10],
+            'learning_rate': [0.01, 0.05, 0.1],
+            'iterations': [30, 50, 100]
+        },
+        "AdaBoost Regressor": {
+            'learning_rate': [0.1, 0.01, 0.5, 0.001],
+            'n_estimators': [8, 16, 32, 64, 128, 256]
+        }
+    }
+
+    return models, params
+
 
 # Main class responsible for training and evaluating models
 class ModelTrainer:
-    def __init__(self):
-        # Set the model storage path from config
-        self.model_trainer_config = ModelTrainerConfig()
+    def __init__(self, config: ModelTrainerConfig = None):
+        # Set the model storage path and search settings from config
+        self.model_trainer_config = config or ModelTrainerConfig()
+
+    @staticmethod
+    def _split_features_target(data):
+        # (features, target) pairs are used as-is so sparse features stay sparse;
+        # a single array with the target as last column is still accepted
+        if isinstance(data, (tuple, list)):
+            return data[0], data[1]
+        return data[:, :-1], data[:, -1]
+
+    def save_training_report(self, best_model_name, r2_square, search_time_s, model_details, selection=None,
+                             objective=None):
+        '''
+        Writes per-model search results with per-fold fit/score durations, plus
+        the training histograms, as JSON next to the model. `objective` is the
+        outcome of select_model (objective, budgets, Pareto front) when the
+        winner was chosen by it.
+        '''
+        if selection is None:
+            selection = "full" if self.model_trainer_config.search_config.screening is None else "tiered"
+        report = {
+            "selection": selection,
+            "best_model": best_model_name,
+            "r2_score": r2_square,
+            "search_time_s": search_time_s,
+            "objective": objective,
+            "models": model_details,
+            "metrics": METRICS.snapshot(prefix="train_"),
+        }
+        report_path = self.model_trainer_config.training_report_file_path
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2, default=str)
+        logging.info(f"Training report saved to {report_path}")
+
+    def export_compiled_model(self, best_model, X_test):
+        '''
+        Flattens the best model into the NumPy engine of compiled_model.py,
+        validated against it on the test set, and saves it tagged with the
+        digest of the model file. Any stale export is removed when the model
+        cannot be compiled. Returns the compiled engine, or None.
+        '''
+        compiled_path = self.model_trainer_config.compiled_model_file_path
+        compiled = try_compile_model(best_model, as_model_input(best_model, X_test))
+        if compiled is None:
+            if os.path.exists(compiled_path):
+                os.remove(compiled_path)
+            return None
+        compiled.source_digest = file_digest(self.model_trainer_config.trained_model_file_path)
+        save_object(file_path=compiled_path, obj=compiled)
+        return compiled
+
+    def save_profile_report(self, best_model_name, best_model, compiled_model, X_test, profile_rows):
+        '''
+        Writes the profiling report: every (model, params, fold) fit with its
+        wall/CPU time, CPU utilisation, peak memory and scores, the "cost vs.
+        R2 gain" summary per model (see profiling.summarize_profile), and the
+        inference latency of the chosen model, through its own predict and
+        through the compiled engine when there is one.
+        '''
+        X_test = as_model_input(best_model, X_test)
+        inference = {"library": measure_inference_latency(best_model, X_test)}
+        if compiled_model is not None:
+            inference["compiled"] = measure_inference_latency(compiled_model, X_test)
+        report = {
+            "best_model": best_model_name,
+            "summary": summarize_profile(profile_rows),
+            "inference": inference,
+            "trials": profile_rows,
+        }
+        report_path = self.model_trainer_config.training_profile_file_path
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2, default=str)
+        logging.info(f"Training profile saved to {report_path}")
 
     def initiate_model_trainer(self, train_array, test_array):
         """
         This function trains multiple regression models with hyperparameter tuning,
         evaluates them, selects the best model, and saves it for future use.
+        `train_array`/`test_array` are (features, target) pairs, or legacy arrays
+        with the target as their last column.
         """
         try:
             logging.info("Split training and test input data")
 
-            # Split features and target variables from train and test arrays
-            X_train, y_train, X_test, y_test = (
-                train_array[:, :-1],
-                train_array[:, -1],
-                test_array[:, :-1],
-                test_array[:, -1]
-            )
+            # Split features and target variables from train and test data
+            X_train, y_train = self._split_features_target(train_array)
+            X_test, y_test = self._split_features_target(test_array)
+
+            # Candidate models and their hyperparameter grids
+            models, params = get_model_zoo()
 
-            # Define the set of models to train
-            models = {
-                "Random Forest": RandomForestRegressor(),
-                "Decision Tree": DecisionTreeRegressor(),
-                "Gradient Boosting": GradientBoostingRegressor(),
-                "Linear Regression": LinearRegression(),
-                "XGBRegressor": XGBRegressor(),
-                "CatBoosting Regressor": CatBoostRegressor(verbose=False),
-                "AdaBoost Regressor": AdaBoostRegressor(),
-            }
-
-            # Define hyperparameter grids for tuning
-            params = {
-                "Decision Tree": {
-                    'criterion': ['squared_error', 'friedman_mse', 'absolute_error', 'poisson']
-                },
-                "Random Forest": {
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                },
-                "Gradient Boosting": {
-                    'learning_rate': [0.1, 0.01, 0.05, 0.001],
-                    'subsample': [0.6, 0.7, 0.75, 0.8, 0.85, 0.9],
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                },
-                "Linear Regression": {},
-                "XGBRegressor": {
-                    'learning_rate': [0.1, 0.01, 0.05, 0.001],
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                },
-                "CatBoosting Regressor": {
-                    'depth': [6, 8, 10],
-                    'learning_rate': [0.01, 0.05, 0.1],
-                    'iterations': [30, 50, 100]
-                },
-                "AdaBoost Regressor": {
-                    'learning_rate': [0.1, 0.01, 0.5, 0.001],
-                    'n_estimators': [8, 16, 32, 64, 128, 256]
-                }
-            }
-
-            # Evaluate all models using utility function
+            # Evaluate all models using utility function; `models` now holds the refit winners
+            search_started = time.perf_counter()
+            model_details = {}
+            profile_rows = [] if self.model_trainer_config.search_config.profile else None
             model_report: dict = evaluate_models(
                 X_train=X_train,
                 y_train=y_train,
                 X_test=X_test,
                 y_test=y_test,
                 models=models,
-                param=params
+                param=params,
+                search_config=self.model_trainer_config.search_config,
+                details=model_details,
+                profile_rows=profile_rows
             )
+            search_time_s = time.perf_counter() - search_started
 
-            # Identify the best score achieved among models
-            best_model_score = max(sorted(model_report.values()))
-
-            # Get the model name that achieved the best score
-            best_model_name = list(model_report.keys())[
-                list(model_report.values()).index(best_model_score)
-            ]
+            # Serving cost of every refit winner, then the objective picks among them
+            selection_config = self.model_trainer_config.selection_config
+            serving_costs = {}
+            for name in model_report:
+                serving_costs[name] = measure_serving_cost(models[name], as_model_input(models[name], X_test),
+                                                           selection_config)
+                model_details.setdefault(name, {})["serving"] = serving_costs[name]
+            best_model_name, objective = select_model(model_report, serving_costs, selection_config)
+            best_model_score = model_report[best_model_name]
             best_model = models[best_model_name]
 
-            # If model performance is not acceptable, raise an error
-            if best_model_score < 0.6:
-                raise CustomException("No best model found with score > 0.6")
-
             logging.info(f"Best model found: {best_model_name} with R2 score: {best_model_score}")
 
             # Save the best model to file
@@ -121,12 +230,85 @@ class ModelTrainer:
                 obj=best_model
             )
 
+            compiled_model = self.export_compiled_model(best_model, X_test)
+
             # Predict using best model and evaluate R² score
-            predicted = best_model.predict(X_test)
+            predicted = best_model.predict(as_model_input(best_model, X_test))
             r2_square = r2_score(y_test, predicted)
 
+            self.save_training_report(best_model_name, r2_square, search_time_s, model_details, objective=objective)
+            if profile_rows is not None:
+                self.save_profile_report(best_model_name, best_model, compiled_model, X_test, profile_rows)
+
             return r2_square
 
         except Exception as e:
             # Raise a custom exception with traceback details
             raise CustomException(e, sys)
+
+    def _selected_template(self, model):
+        '''
+        Returns (name, selected hyperparameters, unfitted estimator with them)
+        for the current model, from the last training report; falls back to the
+        model's own parameters when there is no report.
+        '''
+        report_path = self.model_trainer_config.training_report_file_path
+        if os.path.exists(report_path):
+            with open(report_path) as file_obj:
+                report = json.load(file_obj)
+            name = report["best_model"]
+            models, _ = get_model_zoo()
+            if name in models:
+                best_params = report["models"][name].get("best_params", {})
+                template = seed_estimator(models[name].set_params(**best_params),
+                                          self.model_trainer_config.search_config.random_state)
+                return name, best_params, template
+        from sklearn.base import clone
+
+        return type(model).__name__, {}, clone(model)
+
+    def initiate_incremental_training(self, train_array, test_array, feature_map=None, n_new_rows=0):
+        """
+        Incremental refresh: continues training the previously selected model on
+        the refreshed data instead of re-running the whole model search. The
+        saved model is first re-expressed in the updated preprocessor's feature
+        units (`feature_map` from initiate_incremental_transformation), then
+        grown in proportion to the `n_new_rows` new training rows (see
+        warm_start.continue_training). Saves the model, its compiled export and
+        the report like initiate_model_trainer, and returns the test R2.
+        """
+        try:
+            X_train, y_train = self._split_features_target(train_array)
+            X_test, y_test = self._split_features_target(test_array)
+
+            model = load_object(self.model_trainer_config.trained_model_file_path)
+            model_name, best_params, template = self._selected_template(model)
+            if feature_map is not None:
+                model = rescale_model_inputs(model, *feature_map)
+
+            started = time.perf_counter()
+            model, warm_start = continue_training(
+                model, template, as_model_input(model, X_train), y_train, n_new_rows,
+                self.model_trainer_config.warm_start_config
+            )
+            fit_time_s = time.perf_counter() - started
+            logging.info(f"Refreshed {model_name} on {n_new_rows} new rows in {fit_time_s:.3f}s: {warm_start}")
+
+            save_object(
+                file_path=self.model_trainer_config.trained_model_file_path,
+                obj=model
+            )
+            self.export_compiled_model(model, X_test)
+
+            predicted = model.predict(as_model_input(model, X_test))
+            r2_square = r2_score(y_test, predicted)
+
+            # best_params is carried over so the next refresh continues with the same hyperparameters
+            model_details = {model_name: dict(warm_start, best_params=best_params, new_rows=n_new_rows,
+                                              fit_time_s=fit_time_s, test_score=r2_square)}
+            self.save_training_report(model_name, r2_square, fit_time_s, model_details, selection="incremental")
+
+            return r2_square
+
+        except Exception as e:
+            raise CustomException(e, sys)
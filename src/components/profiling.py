@@ -0,0 +1,170 @@
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+
+_STATUS_FIELD = re.compile(r"^(VmHWM|VmRSS):\s+(\d+) kB", re.MULTILINE)
+
+
+def _memory_status():
+    # {"VmHWM": kB, "VmRSS": kB} from /proc, or None where it does not exist
+    try:
+        with open("/proc/self/status") as file_obj:
+            return {name: int(value) for name, value in _STATUS_FIELD.findall(file_obj.read())}
+    except OSError:
+        return None
+
+
+def _reset_peak_memory():
+    # Writing 5 to clear_refs resets the process's peak RSS (Linux >= 4.0)
+    try:
+        with open("/proc/self/clear_refs", "w") as file_obj:
+            file_obj.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class ResourceProbe:
+    '''
+    Measures a block of work in the current process: wall time, CPU time of
+    all its threads, CPU utilisation (CPU time / wall time, above 1 for
+    multi-threaded fits) and the peak memory on top of what was resident at
+    the start. Peak memory needs Linux's /proc and is None elsewhere.
+    '''
+
+    def __enter__(self):
+        self._memory = _memory_status() if _reset_peak_memory() else None
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        self.cpu_utilisation = self.cpu_s / self.wall_s if self.wall_s > 0 else None
+        self.peak_memory_mb = None
+        if self._memory is not None:
+            after = _memory_status()
+            self.peak_memory_mb = max(0, after["VmHWM"] - self._memory["VmRSS"]) / 1024
+        return None
+
+
+def _params_key(params):
+    return tuple(sorted((name, repr(value)) for name, value in params.items()))
+
+
+def summarize_profile(rows):
+    '''
+    "Cost vs. R2 gain" per model family, from the per-(model, params, fold)
+    profile rows of a search. For every candidate scored on the family's
+    largest training size (the last halving round, or all rows): mean CV
+    score and train score, total fit time and peak memory over its folds, its
+    cost relative to the family's cheapest candidate and its R2 gain over it,
+    and whether another candidate is at least as good for less fit time
+    (`dominated`, a grid point that can be dropped). Per hyperparameter value:
+    mean score and fit time across the candidates that use it, to see which
+    grid axes buy accuracy. Plus the fit cost of every refit.
+    '''
+    search_rows, refits = defaultdict(list), {}
+    for row in rows:
+        if row["phase"] == "search":
+            search_rows[row["model"]].append(row)
+        elif row["phase"] == "refit":
+            refits[row["model"]] = row
+
+    summary = {}
+    for model in dict.fromkeys([row["model"] for row in rows if row["phase"] != "screening"]):
+        entry = {"candidates": [], "parameters": {}}
+        refit = refits.get(model)
+        if refit is not None:
+            entry["refit"] = {key: refit[key] for key in ("params", "fit_s", "fit_cpu_utilisation", "peak_memory_mb")}
+        trials = search_rows.get(model)
+        if trials:
+            # Halving rounds on smaller subsets are not comparable with the final one
+            largest = max(t["n_resources"] for t in trials)
+            by_params = defaultdict(list)
+            for t in trials:
+                if t["n_resources"] == largest:
+                    by_params[_params_key(t["params"])].append(t)
+            entry["candidates"] = _summarize_candidates(by_params.values())
+            entry["parameters"] = _summarize_parameters(entry["candidates"])
+            entry["n_resources"] = largest
+            entry["search_fit_s"] = float(sum(t["fit_s"] for t in trials))
+            entry["dominated_candidates"] = sum(c["dominated"] for c in entry["candidates"])
+        summary[model] = entry
+    return summary
+
+
+def _summarize_candidates(groups):
+    candidates = []
+    for trials in groups:
+        memory = [t["peak_memory_mb"] for t in trials if t["peak_memory_mb"] is not None]
+        candidates.append({
+            "params": trials[0]["params"],
+            "mean_score": float(np.mean([t["score"] for t in trials])),
+            "mean_train_score": float(np.mean([t["train_score"] for t in trials])),
+            "fit_s": float(sum(t["fit_s"] for t in trials)),
+            "predict_s": float(sum(t["predict_s"] for t in trials)),
+            "peak_memory_mb": max(memory) if memory else None,
+            "folds": len(trials),
+        })
+    cheapest = min(candidates, key=lambda c: c["fit_s"])
+    for candidate in candidates:
+        candidate["cost_ratio"] = candidate["fit_s"] / cheapest["fit_s"] if cheapest["fit_s"] > 0 else None
+        candidate["r2_gain"] = candidate["mean_score"] - cheapest["mean_score"]
+        candidate["dominated"] = any(
+            other is not candidate and other["mean_score"] >= candidate["mean_score"]
+            and other["fit_s"] < candidate["fit_s"]
+            for other in candidates
+        )
+    candidates.sort(key=lambda c: c["fit_s"])
+    return candidates
+
+
+def _summarize_parameters(candidates):
+    by_value = defaultdict(list)
+    for candidate in candidates:
+        for name, value in candidate["params"].items():
+            by_value[(name, repr(value))].append(candidate)
+    parameters = defaultdict(list)
+    for (name, value), group in sorted(by_value.items()):
+        parameters[name].append({
+            "value": group[0]["params"][name],
+            "mean_score": float(np.mean([c["mean_score"] for c in group])),
+            "mean_fit_s": float(np.mean([c["fit_s"] for c in group])),
+            "candidates": len(group),
+        })
+    return dict(parameters)
+
+
+def measure_inference_latency(model, X, n_single=200, n_batch=5):
+    '''
+    Serving cost of a fitted model: single-row predict latency percentiles
+    (milliseconds) and whole-batch throughput (rows per second) on `X`.
+    '''
+    n_rows = X.shape[0]
+    rows = [X[i:i + 1] for i in range(min(n_rows, n_single))]
+    model.predict(rows[0])   # Warm-up: lazy initialisation, caches
+    latencies = []
+    for i in range(n_single):
+        start = time.perf_counter()
+        model.predict(rows[i % len(rows)])
+        latencies.append(time.perf_counter() - start)
+    batch = []
+    for _ in range(n_batch):
+        start = time.perf_counter()
+        model.predict(X)
+        batch.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "single_row_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "mean": float(latencies_ms.mean()),
+        },
+        "batch_rows": n_rows,
+        "batch_s": float(min(batch)),
+        "batch_rows_per_s": float(n_rows / min(batch)) if min(batch) > 0 else None,
+    }
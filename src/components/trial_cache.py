@@ -0,0 +1,128 @@
+# Standard library imports
+import hashlib
+import json
+import os
+import pickle
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+# Custom exception handling and logging
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Configuration class for the on-disk trial cache
+@dataclass
+class TrialCacheConfig:
+    cache_dir: str = os.path.join("artifacts", "trial_cache")
+    cache_estimators: bool = False   # Also keep refit estimators, not only fold scores
+
+
+def _update_with_array(digest, array):
+    array = np.ascontiguousarray(array)
+    digest.update(str((array.shape, array.dtype.str)).encode())
+    digest.update(array.tobytes())
+
+
+def data_fingerprint(*arrays):
+    '''
+    Content hash of the training arrays (dense or scipy sparse).
+    '''
+    digest = hashlib.sha256()
+    for array in arrays:
+        if hasattr(array, "indptr"):
+            for part in (array.data, array.indices, array.indptr):
+                _update_with_array(digest, part)
+            digest.update(str(array.shape).encode())
+        else:
+            _update_with_array(digest, np.asarray(array))
+    return digest.hexdigest()
+
+
+def estimator_spec(estimator):
+    '''
+    Class, library version and full parameter set of an (unfitted) estimator.
+    '''
+    cls = type(estimator)
+    library = sys.modules.get(cls.__module__.split(".")[0])
+    params = estimator.get_params(deep=False)
+    return {
+        "class": f"{cls.__module__}.{cls.__qualname__}",
+        "version": getattr(library, "__version__", None),
+        "params": json.dumps(params, sort_keys=True, default=repr),
+    }
+
+
+class TrialCache:
+    '''
+    Content-addressed cache of CV fold scores and, optionally, refit estimators.
+
+    Keys hash the training data, the estimator class and parameters and the CV
+    specification, so a cached entry is only reused when every input matches.
+    '''
+
+    def __init__(self, config: TrialCacheConfig = None):
+        self.cache_config = config or TrialCacheConfig()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(**parts):
+        payload = json.dumps(parts, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, kind, key, suffix):
+        return os.path.join(self.cache_config.cache_dir, kind, key[:2], key + suffix)
+
+    def _write(self, path, data):
+        # Write to a temp file and rename so concurrent runs never read a partial entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file_obj:
+            file_obj.write(data)
+        os.replace(tmp_path, path)
+
+    def get_score(self, key):
+        path = self._path("scores", key, ".json")
+        try:
+            with open(path) as file_obj:
+                score = json.load(file_obj)["score"]
+            self.hits += 1
+            return score
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+    def put_score(self, key, score):
+        try:
+            self._write(self._path("scores", key, ".json"), json.dumps({"score": score}).encode())
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_estimator(self, key):
+        if not self.cache_config.cache_estimators:
+            return None
+        path = self._path("estimators", key, ".pkl")
+        try:
+            with open(path, "rb") as file_obj:
+                estimator = pickle.load(file_obj)
+            self.hits += 1
+            return estimator
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+
+    def put_estimator(self, key, estimator):
+        if not self.cache_config.cache_estimators:
+            return
+        try:
+            self._write(self._path("estimators", key, ".pkl"), pickle.dumps(estimator))
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def log_summary(self):
+        logging.info(f"Trial cache: {self.hits} hits, {self.misses} misses ({self.cache_config.cache_dir})")
@@ -0,0 +1,205 @@
+import json
+import math
+import os
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.base import clone
+
+from src.logger import logging
+
+
+# Configuration class for continuing the selected model on refreshed data
+@dataclass
+class WarmStartConfig:
+    # Trees/boosting rounds added per refresh: the model's current count scaled by the
+    # fraction of new training rows, at least `min_new_estimators`
+    min_new_estimators: int = 1
+    max_new_fraction: float = 1.0   # Never more than this fraction of the current count
+
+
+def _sklearn_trees(model):
+    # Fitted decision trees of a sklearn tree model or tree ensemble, or None
+    if hasattr(model, "tree_"):
+        return [model]
+    estimators = getattr(model, "estimators_", None)
+    if estimators is None:
+        return None
+    trees = list(np.ravel(estimators))
+    return trees if all(hasattr(tree, "tree_") for tree in trees) else None
+
+
+def _column(X, j):
+    if hasattr(X, "tocsc"):
+        return X[:, [j]].toarray().ravel()
+    return np.asarray(X[:, j])
+
+
+def value_pairs(X_old, X_new, pairs=None):
+    '''
+    For every feature column, the distinct float32 values of `X_old` (sorted)
+    and the float32 value the same rows have in `X_new`. Merges into `pairs`
+    from earlier row blocks when given.
+    '''
+    result = []
+    for j in range(X_old.shape[1]):
+        old = _column(X_old, j).astype(np.float32)
+        new = _column(X_new, j).astype(np.float32)
+        if pairs is not None:
+            old = np.concatenate([pairs[j][0], old])
+            new = np.concatenate([pairs[j][1], new])
+        old, first = np.unique(old, return_index=True)
+        result.append((old, new[first]))
+    return result
+
+
+def _map_thresholds(thresholds, features, scale, shift, values, ties_left):
+    '''
+    Maps split thresholds into the new feature units. sklearn (`x <= t`) and
+    XGBoost (`x < t`) compare float32 inputs, and a threshold can sit within a
+    float32 step of a training value, where the affine image is ambiguous. So
+    when the training values of the feature are known, the new threshold is
+    placed halfway between the new values of the two old values it separated,
+    which keeps every training value on its side; the affine map is the
+    fallback outside the observed range.
+    '''
+    mapped = scale[features] * thresholds + shift[features]
+    if values is None:
+        return mapped
+    for j in np.unique(features):
+        at = np.flatnonzero(features == j)
+        old, new = values[j]
+        if ties_left:
+            k = np.searchsorted(old, thresholds[at], side="right")
+        else:
+            k = np.searchsorted(old, thresholds[at].astype(np.float32), side="left")
+        inside = (k > 0) & (k < len(old))
+        at, k = at[inside], k[inside]
+        low, high = new[k - 1].astype(np.float64), new[k].astype(np.float64)
+        middle = (low + high) / 2
+        if ties_left:
+            mapped[at] = np.where(middle < high, middle, low)
+        else:
+            middle = middle.astype(np.float32).astype(np.float64)
+            mapped[at] = np.where(middle > low, middle, high)
+    return mapped
+
+
+def _rescale_xgboost(model, scale, shift, values):
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw(raw_format="json"))
+    for tree in raw["learner"]["gradient_booster"]["model"]["trees"]:
+        features = np.asarray(tree["split_indices"], dtype=np.intp)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float64)
+        split = np.asarray(tree["left_children"]) != -1
+        conditions[split] = _map_thresholds(
+            conditions[split], features[split], scale, shift, values, ties_left=False
+        )
+        tree["split_conditions"] = conditions.tolist()
+    booster.load_model(bytearray(json.dumps(raw).encode()))
+
+
+def _rescale_catboost(model, scale, shift):
+    # Borders live in the JSON export; the trees only refer to them by index
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as file_obj:
+            exported = json.load(file_obj)
+        for feature in exported["features_info"].get("float_features", []):
+            j = feature["feature_index"]
+            feature["borders"] = [scale[j] * border + shift[j] for border in feature.get("borders", [])]
+        with open(path, "w") as file_obj:
+            json.dump(exported, file_obj)
+        model.load_model(path, format="json")
+
+
+def rescale_model_inputs(model, scale, shift, values=None):
+    '''
+    Re-expresses a fitted model in new feature units, where every feature is
+    `new = scale * old + shift` (scale > 0), as happens when the scalers of
+    the preprocessor are updated, so the model predicts on the new features
+    what it predicted on the old. Linear coefficients are divided by `scale`;
+    tree thresholds and borders are mapped through the same function, using
+    `values` (see value_pairs) for sklearn and XGBoost trees. Modifies `model`
+    in place and returns it.
+    '''
+    scale = np.asarray(scale, dtype=np.float64)
+    shift = np.asarray(shift, dtype=np.float64)
+    if np.array_equal(scale, np.ones_like(scale)) and not shift.any():
+        return model
+
+    module = type(model).__module__
+    trees = _sklearn_trees(model)
+    if trees is not None:
+        for tree in trees:
+            threshold, feature = tree.tree_.threshold, tree.tree_.feature
+            split = feature >= 0
+            # tree_.threshold is a writeable view on the node table
+            threshold[split] = _map_thresholds(threshold[split], feature[split], scale, shift, values, ties_left=True)
+    elif hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        model.intercept_ = model.intercept_ - coef @ (shift / scale)
+        model.coef_ = coef / scale
+    elif module.startswith("xgboost"):
+        _rescale_xgboost(model, scale, shift, values)
+    elif module.startswith("catboost"):
+        _rescale_catboost(model, scale, shift)
+    else:
+        raise TypeError(f"Cannot re-express a {type(model).__name__} in new feature units")
+    return model
+
+
+def _n_new_estimators(current, n_new_rows, n_rows, config):
+    fraction = min(n_new_rows / max(n_rows - n_new_rows, 1), config.max_new_fraction)
+    return max(config.min_new_estimators, math.ceil(current * fraction))
+
+
+def continue_training(model, template, X, y, n_new_rows, config: WarmStartConfig = None):
+    '''
+    Continues training a fitted model on the full refreshed training set
+    instead of searching the model zoo again. `template` is the unfitted
+    estimator with the hyperparameters the model was selected with (boosting
+    artifacts saved in their native format do not keep them). Returns
+    (model, info).
+
+    - Random forests and gradient boosting grow extra trees with `warm_start`
+    - XGBoost and CatBoost continue boosting from the existing trees
+    - Other models (linear regression, a single tree, AdaBoost) are refitted
+      with their selected hyperparameters, which for them is already cheap or
+      has no incremental form
+
+    The number of added trees/rounds is proportional to the share of new rows.
+    '''
+    config = config or WarmStartConfig()
+    n_rows = X.shape[0]
+    module = type(model).__module__
+
+    if module.startswith("xgboost"):
+        current = model.get_booster().num_boosted_rounds()
+        extra = _n_new_estimators(current, n_new_rows, n_rows, config)
+        continued = clone(template).set_params(n_estimators=extra)
+        continued.fit(X, y, xgb_model=model.get_booster())
+        continued.set_params(n_estimators=current + extra)
+        return continued, {"method": "continued_boosting", "previous": current, "added": extra}
+
+    if module.startswith("catboost"):
+        current = model.tree_count_
+        extra = _n_new_estimators(current, n_new_rows, n_rows, config)
+        continued = clone(template).set_params(iterations=extra)
+        continued.fit(X, y, init_model=model)
+        return continued, {"method": "continued_boosting", "previous": current, "added": extra}
+
+    params = model.get_params()
+    if "warm_start" in params and "n_estimators" in params:
+        current = len(model.estimators_)
+        extra = _n_new_estimators(current, n_new_rows, n_rows, config)
+        model.set_params(warm_start=True, n_estimators=current + extra)
+        model.fit(X, y)
+        # Later full fits of this object start from scratch again
+        model.set_params(warm_start=False)
+        return model, {"method": "warm_start", "previous": current, "added": extra}
+
+    logging.info(f"{type(model).__name__} has no incremental fit, refitting it with its selected parameters")
+    return clone(template).fit(X, y), {"method": "refit"}
@@ -1,9 +1,15 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
+import random
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 
-# Correct way to format timestamp
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+# Correct way to format timestamp; LOG_FILE overrides the per-start file name
+LOG_FILE = os.environ.get("LOG_FILE") or f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 
 # Define log directory path
 logs_dir = os.path.join(os.getcwd(), "logs")
@@ -12,11 +18,133 @@ os.makedirs(logs_dir, exist_ok=True)
 # Full log file path
 LOG_FILE_PATH = os.path.join(logs_dir, LOG_FILE)
 
-# Logging configuration
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+TEXT_FORMAT = "[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s"
 
+# Settings, all from the environment so serving processes can be tuned without code changes
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")              # "text" or "json"
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "1") != "0"            # Write from a background thread
+LOG_ROTATE = os.environ.get("LOG_ROTATE", "size")              # "size", "time" or "none"
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 50 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.environ.get("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 0.01))   # Share of DEBUG records kept
 
+# Attributes every LogRecord has; anything else was passed with `extra=` and goes into JSON output
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    '''
+    One JSON object per line, with the `extra=` fields of the call as keys.
+    '''
+
+    def format(self, record):
+        payload = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    '''
+    Keeps only a random `rate` share of DEBUG records, so per-request debug
+    output can stay on in production without logging every request.
+    '''
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class LazyQueueHandler(QueueHandler):
+    '''
+    Enqueues records without formatting them. The stdlib QueueHandler merges
+    the arguments and renders tracebacks in the calling thread; here that
+    happens on the listener thread instead. Arguments must therefore not be
+    mutated after the logging call.
+    '''
+
+    def prepare(self, record):
+        return copy.copy(record)
+
+
+def _file_handler():
+    if LOG_ROTATE == "size":
+        handler = RotatingFileHandler(LOG_FILE_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    elif LOG_ROTATE == "time":
+        handler = TimedRotatingFileHandler(LOG_FILE_PATH, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT)
+    else:
+        handler = logging.FileHandler(LOG_FILE_PATH)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+_listener = None
+
+
+def _start_listener(queue_handler, file_handler, new_queue=False):
+    global _listener
+    if new_queue:
+        queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    # Writes out everything still queued; also registered with atexit
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging():
+    '''
+    Sets up the root logger: records go through a queue to a background thread
+    that owns the (rotating) file handler, or straight to the file handler
+    when LOG_ASYNC=0.
+    '''
+    root = logging.getLogger()
+    if root.handlers:
+        # Same rule as logging.basicConfig: an already configured root logger is left alone
+        return
+    root.setLevel(LOG_LEVEL)
+    file_handler = _file_handler()
+    if not LOG_ASYNC:
+        file_handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+        root.addHandler(file_handler)
+        return
+
+    # Sampled out records are dropped before they are ever queued
+    queue_handler = LazyQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+    root.addHandler(queue_handler)
+    _start_listener(queue_handler, file_handler)
+    atexit.register(_stop_listener)
+    # The listener thread does not survive fork (e.g. gunicorn workers). It is drained and
+    # stopped before forking, so the child never inherits a half-written file buffer,
+    # and restarted on both sides afterwards; the child gets a fresh queue
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(
+            before=_stop_listener,
+            after_in_parent=lambda: _start_listener(queue_handler, file_handler),
+            after_in_child=lambda: _start_listener(queue_handler, file_handler, new_queue=True),
+        )
+
+
+configure_logging()
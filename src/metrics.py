@@ -0,0 +1,148 @@
+import bisect
+import os
+import threading
+import time
+
+# Upper bounds (seconds) shared by all timing histograms, from sub-millisecond
+# predict calls up to multi-minute training fits
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    '''
+    Prometheus-style histogram: per label set, a count per bucket plus the sum
+    and count of all observations. Observing is a bisect and three additions.
+    '''
+
+    def __init__(self, registry, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        '''
+        Context manager that observes the duration of its block in seconds.
+        '''
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def _items(self):
+        with self._lock:
+            return [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, counts, total, count in sorted(self._items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = ",".join(labels + ['le="%s"' % le])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+    def snapshot(self):
+        series = []
+        for key, counts, total, count in self._items():
+            series.append({
+                "labels": dict(zip(self.label_names, key)),
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "buckets": dict(zip([repr(b) for b in self.buckets] + ["+Inf"], counts)),
+            })
+        return {"help": self.help_text, "series": series}
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    '''
+    Process-wide set of histograms. Metrics are only aggregated in memory; the
+    text format is built when /metrics is scraped, so nothing is paid for it
+    otherwise. Setting METRICS_ENABLED=0 turns every timer into a no-op.
+    '''
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        # Idempotent, so modules can declare their metrics at import time
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(self, name, help_text, label_names, buckets)
+            return metric
+
+    def render_prometheus(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in sorted(metrics, key=lambda m: m.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, prefix=""):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.snapshot() for m in metrics if m.name.startswith(prefix)}
+
+
+METRICS = MetricsRegistry(enabled=os.environ.get("METRICS_ENABLED", "1") != "0")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,321 @@
+'''
+Offline bulk scoring:
+
+    python -m src.pipeline.batch_predict students.csv predictions.csv --workers 4
+    python -m src.pipeline.batch_predict students.parquet predictions.parquet --chunksize 200000
+
+The input is streamed in chunks, chunks are scored by a pool of worker
+processes that each load the artifacts once, and predictions are appended to
+the output in input order as they complete. At most `max_pending` chunks are in
+flight, so memory stays bounded whatever the input size.
+
+Rows are checked against the served InputSchema first, as on /predict. By
+default an invalid row gets an empty prediction and its errors in the `error`
+column, and the rest of the file is still scored; with --on-invalid fail the
+whole input is checked before anything is written, and the run stops with the
+offending row numbers.
+'''
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.input_schema import describe_errors
+from src.pipeline.model_registry import ModelRegistry, ModelRegistryConfig, artifact_version
+from src.pipeline.predict_pipeline import PredictPipeline
+
+
+# Configuration class for bulk scoring
+@dataclass
+class BatchPredictConfig:
+    input_path: str = os.path.join("artifacts", "test.csv")
+    output_path: str = os.path.join("artifacts", "predictions.csv")
+    chunksize: int = 100_000          # Rows per chunk read, scored and written at once
+    workers: int = os.cpu_count() or 1
+    max_pending: int = None           # Chunks in flight (None = 2 per worker)
+    prediction_column: str = "prediction"
+    keep_input_columns: bool = True   # Write the input columns next to the prediction
+    # "skip": score the valid rows, leave the prediction empty and fill `error_column` for the rest;
+    # "fail": validate the whole input before writing and raise with the invalid row numbers
+    on_invalid: str = "skip"
+    error_column: str = "error"
+    registry_config: ModelRegistryConfig = field(default_factory=ModelRegistryConfig)
+
+
+ON_INVALID = ("skip", "fail")
+
+_worker_pipeline = None
+
+
+def _load_pipeline(registry_config, version):
+    # Load the artifacts and pin the version the run started with
+    registry = ModelRegistry(registry_config)
+    loaded = registry.refresh(force=True).version
+    if loaded != version:
+        raise RuntimeError(f"Artifacts changed during scoring: expected version {version}, found {loaded}")
+    return PredictPipeline(registry=registry, version=version)
+
+
+def _init_worker(registry_config, version):
+    # Runs once per worker process
+    global _worker_pipeline
+    _worker_pipeline = _load_pipeline(registry_config, version)
+
+
+def _score_chunk(chunk):
+    '''
+    Validates a chunk like the online /predict path, then scores its valid
+    rows. Returns (predictions, errors): NaN for the invalid rows, and the
+    schema errors with `row` relative to the chunk.
+    '''
+    import numpy as np
+    import pandas as pd
+
+    records, errors = _worker_pipeline.validate_records(chunk.to_dict(orient="records"))
+    invalid = {error["row"] for error in errors}
+    valid_rows = [i for i in range(len(records)) if i not in invalid]
+    predictions = np.full(len(records), np.nan)
+    if valid_rows:
+        # The coerced records, as the online path scores them
+        features = pd.DataFrame.from_records([records[i] for i in valid_rows], columns=list(chunk.columns))
+        predictions[valid_rows] = np.ravel(_worker_pipeline.predict(features))
+    return predictions, errors
+
+
+def _describe_rows(errors, limit=5):
+    # "row 12: reading_score must be between 0 and 100 (got 120)" per invalid row, for logs and failures
+    by_row = {}
+    for error in errors:
+        by_row.setdefault(error["row"], []).append(error)
+    parts = [f"row {row}: {describe_errors(row_errors)}" for row, row_errors in list(by_row.items())[:limit]]
+    if len(by_row) > limit:
+        parts.append(f"and {len(by_row) - limit} more rows")
+    return "; ".join(parts)
+
+
+def _is_parquet(file_path):
+    return file_path.endswith((".parquet", ".pq"))
+
+
+def read_chunks(file_path, chunksize):
+    '''
+    Yields DataFrames of at most `chunksize` rows from a CSV or Parquet file.
+    '''
+    if _is_parquet(file_path):
+        # Optional dependency, only needed for Parquet input
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+
+        yield from pd.read_csv(file_path, chunksize=chunksize)
+
+
+class _ChunkWriter:
+    '''
+    Appends scored chunks to a CSV or Parquet file.
+    '''
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.parquet_writer = None
+        self.rows = 0
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+    def write(self, frame):
+        if _is_parquet(self.file_path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.file_path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+class BatchPredictor:
+    '''
+    Scores a whole file through PredictPipeline.predict, chunk by chunk, in a
+    process pool. Output rows are in input order and bit-for-bit equal to what
+    the online path returns for the same records, given the same registry
+    settings: the compiled preprocessor and engines score every row
+    independently of its batch, as do the library tree models. (A library
+    linear model's BLAS product can differ in the last bit between batch
+    sizes, online as well; serve it through the compiled model for exact
+    agreement.) CSV output keeps full float precision; read it back with
+    float_precision="round_trip" to compare exactly.
+    '''
+
+    def __init__(self, config: BatchPredictConfig = None):
+        self.batch_config = config or BatchPredictConfig()
+        self.invalid_rows = 0
+
+    def _output_frame(self, chunk, predictions, errors):
+        config = self.batch_config
+        columns = {config.prediction_column: predictions}
+        if config.on_invalid == "skip":
+            messages = [""] * len(chunk)
+            for row in {error["row"] for error in errors}:
+                messages[row] = describe_errors([error for error in errors if error["row"] == row])
+            columns[config.error_column] = messages
+        if config.keep_input_columns:
+            return chunk.assign(**columns)
+        import pandas as pd
+
+        return pd.DataFrame(columns)
+
+    def _check_input(self, version):
+        '''
+        Validates every row of the input before anything is written, for
+        on_invalid="fail". Raises ValueError naming the invalid rows.
+        '''
+        config = self.batch_config
+        pipeline = _load_pipeline(config.registry_config, version)
+        errors, offset = [], 0
+        for chunk in read_chunks(config.input_path, config.chunksize):
+            _, chunk_errors = pipeline.validate_records(chunk.to_dict(orient="records"))
+            errors.extend(dict(error, row=error["row"] + offset) for error in chunk_errors)
+            offset += len(chunk)
+        if errors:
+            n_rows = len({error["row"] for error in errors})
+            raise ValueError(f"{n_rows} invalid row(s) in {config.input_path}, nothing written: {_describe_rows(errors)}")
+
+    def _write_scored(self, writer, chunk, scored, start):
+        predictions, errors = scored
+        if errors:
+            # Row numbers in the input file (0-based, header excluded): the chunk starts at writer.rows
+            in_file = [dict(error, row=error["row"] + writer.rows) for error in errors]
+            self.invalid_rows += len({error["row"] for error in errors})
+            logging.info(f"Invalid rows left unscored: {_describe_rows(in_file)}")
+        writer.write(self._output_frame(chunk, predictions, errors))
+        self._log_progress(writer.rows, start)
+
+    def initiate_batch_prediction(self):
+        '''
+        Scores `input_path` into `output_path`. Returns the number of rows and
+        of invalid rows, the elapsed seconds and the throughput in rows per second.
+        '''
+        config = self.batch_config
+        registry_config = config.registry_config
+        writer = _ChunkWriter(config.output_path)
+        try:
+            if config.on_invalid not in ON_INVALID:
+                raise ValueError(f"Unknown on_invalid {config.on_invalid!r}, expected one of {ON_INVALID}")
+            version = artifact_version(registry_config.model_file_path, registry_config.preprocessor_file_path)
+            workers = max(1, config.workers)
+            max_pending = config.max_pending or 2 * workers
+            logging.info(f"Scoring {config.input_path} with artifacts version {version} on {workers} worker(s)")
+
+            start = time.perf_counter()
+            self.invalid_rows = 0
+            if config.on_invalid == "fail":
+                self._check_input(version)
+            chunks = read_chunks(config.input_path, config.chunksize)
+            if workers == 1:
+                _init_worker(registry_config, version)
+                for chunk in chunks:
+                    self._write_scored(writer, chunk, _score_chunk(chunk), start)
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(registry_config, version)) as pool:
+                    pending = deque()
+                    for chunk in chunks:
+                        pending.append((chunk, pool.submit(_score_chunk, chunk)))
+                        # Backpressure: stop reading until the oldest chunk is written
+                        while len(pending) >= max_pending:
+                            self._write_oldest(pending, writer, start)
+                    while pending:
+                        self._write_oldest(pending, writer, start)
+
+            elapsed = time.perf_counter() - start
+            summary = {
+                "rows": writer.rows,
+                "invalid_rows": self.invalid_rows,
+                "seconds": elapsed,
+                "rows_per_s": writer.rows / elapsed if elapsed > 0 else None,
+                "version": version,
+                "output_path": config.output_path,
+            }
+            logging.info(f"Batch scoring finished: {summary}")
+            return summary
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+        finally:
+            writer.close()
+
+    def _write_oldest(self, pending, writer, start):
+        chunk, future = pending.popleft()
+        self._write_scored(writer, chunk, future.result(), start)
+
+    @staticmethod
+    def _log_progress(rows, start):
+        elapsed = time.perf_counter() - start
+        logging.info(f"Scored {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = BatchPredictConfig()
+    parser.add_argument("input_path", help="CSV or Parquet file with the model's input columns")
+    parser.add_argument("output_path", help="CSV or Parquet file to write")
+    parser.add_argument("--chunksize", type=int, default=defaults.chunksize)
+    parser.add_argument("--workers", type=int, default=defaults.workers)
+    parser.add_argument("--model", default=defaults.registry_config.model_file_path)
+    parser.add_argument("--preprocessor", default=defaults.registry_config.preprocessor_file_path)
+    parser.add_argument("--prediction-column", default=defaults.prediction_column)
+    parser.add_argument("--predictions-only", action="store_true", help="Do not copy the input columns")
+    parser.add_argument("--on-invalid", choices=ON_INVALID, default=defaults.on_invalid,
+                        help="skip: write invalid rows with an empty prediction and their errors; "
+                             "fail: check the whole input first and write nothing if a row is invalid")
+    parser.add_argument("--error-column", default=defaults.error_column)
+    parser.add_argument("--compiled-model", action=argparse.BooleanOptionalAction,
+                        default=defaults.registry_config.use_compiled_model,
+                        help="Score through the compiled model, like a server run with PREDICT_COMPILED_MODEL=1 "
+                             "(the default follows that variable; --no-compiled-model uses the library model)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = BatchPredictConfig(
+        input_path=args.input_path,
+        output_path=args.output_path,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        prediction_column=args.prediction_column,
+        keep_input_columns=not args.predictions_only,
+        on_invalid=args.on_invalid,
+        error_column=args.error_column,
+        registry_config=ModelRegistryConfig(
+            model_file_path=args.model,
+            preprocessor_file_path=args.preprocessor,
+            use_compiled_model=args.compiled_model,
+        ),
+    )
+    summary = BatchPredictor(config).initiate_batch_prediction()
+    # No throughput for a run too short to time (an empty input)
+    throughput = f"{summary['rows_per_s']:.0f} rows/s" if summary["rows_per_s"] is not None else "n/a rows/s"
+    if summary["invalid_rows"]:
+        print(f"{summary['invalid_rows']} invalid rows were not scored, see the {config.error_column!r} column")
+    print(f"Scored {summary['rows']} rows in {summary['seconds']:.2f}s ({throughput}) -> {summary['output_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import os
+import sys
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Configuration class for server-side micro-batching
+@dataclass
+class MicroBatcherConfig:
+    max_batch_size: int = 64     # Upper bound on rows merged into one predict call
+    max_wait_ms: float = 2.0     # How long the first row of a batch waits for company
+
+
+class MicroBatcher:
+    '''
+    Merges concurrent single-row prediction requests into one vectorized call.
+
+    `predict_fn` receives a list of records and must return one prediction per
+    record. Callers block in `submit` until their row has been scored. The worker
+    thread is started lazily (and restarted after a fork) so the batcher is safe
+    to create at import time in a pre-forking server.
+    '''
+
+    def __init__(self, predict_fn, config: MicroBatcherConfig = None):
+        self.predict_fn = predict_fn
+        self.batcher_config = config or MicroBatcherConfig()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid() or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+
+    def submit_future(self, record):
+        '''
+        Queues one record and returns a Future for its prediction, for callers
+        that must not block (e.g. an asyncio event loop via asyncio.wrap_future).
+        '''
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def submit(self, record, timeout=None):
+        '''
+        Queues one record and waits for its prediction.
+        '''
+        try:
+            return self.submit_future(record).result(timeout=timeout)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _collect(self, work_queue):
+        # Block for the first row, then take whatever else arrives before the deadline
+        batch = [work_queue.get()]
+        deadline = time.monotonic() + self.batcher_config.max_wait_ms / 1000.0
+        while len(batch) < self.batcher_config.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(work_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _resolve(future, result=None, exception=None):
+        # A future that is already resolved must not take down the worker thread
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    @staticmethod
+    def _claim(future):
+        # False for futures cancelled or resolved by their caller before scoring started
+        try:
+            return future.set_running_or_notify_cancel()
+        except RuntimeError:
+            return False
+
+    def _run(self):
+        work_queue = self._queue
+        while True:
+            # Rows whose caller gave up (e.g. a disconnected asyncio client) are not scored;
+            # the others can no longer be cancelled from here on
+            batch = [(record, future) for record, future in self._collect(work_queue) if self._claim(future)]
+            if not batch:
+                continue
+            records = [record for record, _ in batch]
+            try:
+                preds = self._predict(records)
+            except Exception:
+                # One bad row must not fail its neighbours: retry row by row
+                logging.info(f"Batch of {len(batch)} failed, scoring rows individually")
+                for record, future in batch:
+                    try:
+                        self._resolve(future, result=self._predict([record])[0])
+                    except Exception as e:
+                        self._resolve(future, exception=e)
+                continue
+            for (_, future), pred in zip(batch, preds):
+                self._resolve(future, result=pred)
+
+    def _predict(self, records):
+        # A short result would hand predictions to the wrong callers, or none at all
+        preds = self.predict_fn(records)
+        if len(preds) != len(records):
+            raise ValueError(f"predict_fn returned {len(preds)} predictions for {len(records)} rows")
+        return preds
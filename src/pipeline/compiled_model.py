@@ -0,0 +1,387 @@
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+def _as_dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+class TreeEnsemble:
+    '''
+    Binary decision trees flattened into contiguous node arrays, evaluated for
+    all rows and all trees at once with one vectorized step per tree level.
+
+    Node `i` sends a row to `children[2 * i + 1]` when its feature value is
+    greater than `threshold[i]` (or equal, with `right_if_equal`), else to
+    `children[2 * i]`. Leaves are their own children, so rows that reached a
+    leaf stay there while deeper trees finish. Features are compared as float32,
+    which is what scikit-learn trees and XGBoost do.
+
+    `aggregation` combines the per-tree leaf values: "mean" (random forest,
+    single tree), "sum" (boosting: `base + scale * tree_1 + scale * tree_2 ...`,
+    accumulated in tree order like the libraries do) or "weighted_median"
+    (AdaBoost).
+    '''
+
+    def __init__(self, feature, threshold, children, value, missing_right, roots, max_depth,
+                 aggregation, base=0.0, scale=1.0, weights=None, right_if_equal=False,
+                 dtype=np.float64, n_features=None, source=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold)
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=dtype)
+        self.missing_right = np.ascontiguousarray(missing_right, dtype=bool)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation
+        self.base = base
+        self.scale = scale
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.right_if_equal = right_if_equal
+        self.dtype = np.dtype(dtype)
+        self.n_features = n_features
+        self.source = source                 # Class path of the exported model
+        self.source_digest = None            # Set when saved next to the model it was exported from
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaf_values(self, X):
+        '''
+        Returns a (n_trees, n_rows) array with the leaf value every row reaches in every tree.
+        '''
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_columns = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_columns)[None, :]
+        has_missing = bool(np.isnan(flat).any())
+
+        node = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x = flat.take(row_offsets + self.feature.take(node))
+            threshold = self.threshold.take(node)
+            go_right = x >= threshold if self.right_if_equal else x > threshold
+            if has_missing:
+                go_right = np.where(np.isnan(x), self.missing_right.take(node), go_right)
+            next_node = self.children.take(2 * node + go_right)
+            if np.array_equal(next_node, node):
+                # Every row sits on a leaf already
+                break
+            node = next_node
+        return self.value.take(node)
+
+    def predict(self, X):
+        try:
+            values = self.leaf_values(_as_dense(X))
+            if self.aggregation == "sum":
+                total = np.full(values.shape[1], self.base, dtype=self.dtype)
+                return _add_in_order(total, values if self.scale == 1.0 else self.scale * values)
+            if self.aggregation == "mean":
+                return _add_in_order(np.zeros(values.shape[1]), values) / values.shape[0]
+            if self.aggregation == "weighted_median":
+                return _weighted_median(values.T, self.weights)
+            raise ValueError(f"Unknown aggregation {self.aggregation}")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _add_in_order(total, values):
+    # One tree after another, like the libraries. values.sum(axis=0) is not used: for a
+    # single row it becomes a pairwise sum, whose last bit differs from the batch result
+    for tree_values in values.astype(total.dtype, copy=False):
+        total += tree_values
+    return total
+
+
+def _weighted_median(predictions, weights):
+    # Same steps as AdaBoostRegressor._get_median_predict
+    sorted_idx = np.argsort(predictions, axis=1)
+    weight_cdf = np.cumsum(weights[sorted_idx], axis=1, dtype=np.float64)
+    median_or_above = weight_cdf >= 0.5 * weight_cdf[:, -1][:, np.newaxis]
+    median_idx = median_or_above.argmax(axis=1)
+    rows = np.arange(predictions.shape[0])
+    return predictions[rows, sorted_idx[rows, median_idx]]
+
+
+class ObliviousEnsemble:
+    '''
+    CatBoost's symmetric trees: every level of a tree tests the same
+    (feature, border) pair, so the leaf index is just the bits of the D
+    comparisons. Trees shallower than the deepest one are padded with
+    comparisons that are always false.
+    '''
+
+    def __init__(self, feature, border, leaf_values, scale, bias, n_features=None, source=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)          # (n_trees, depth)
+        self.border = np.ascontiguousarray(border, dtype=np.float32)         # (n_trees, depth)
+        self.leaf_values = np.ascontiguousarray(leaf_values, dtype=np.float64)   # (n_trees, 2 ** depth)
+        self.scale = float(scale)
+        self.bias = float(bias)
+        self.n_features = n_features
+        self.source = source
+        self.source_digest = None
+        depth = self.feature.shape[1]
+        self._powers = (1 << np.arange(depth, dtype=np.intp))
+        self._tree_offsets = (np.arange(self.feature.shape[0], dtype=np.intp) * (1 << depth))[None, :]
+
+    @property
+    def n_trees(self):
+        return self.feature.shape[0]
+
+    def predict(self, X):
+        try:
+            X = np.ascontiguousarray(_as_dense(X), dtype=np.float32)
+            # (n_rows, n_trees, depth) comparisons -> (n_rows, n_trees) leaf indices
+            bits = X[:, self.feature] > self.border
+            index = bits.astype(np.intp) @ self._powers
+            values = self.leaf_values.ravel().take(self._tree_offsets + index)
+            return self.scale * values.sum(axis=1) + self.bias
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class LinearModel:
+    '''
+    `X @ coef + intercept`, for when the selected model is a linear one.
+
+    Accumulated column by column rather than with a BLAS product: BLAS may sum
+    a row's terms in a different order depending on the other rows of the
+    batch, while here a row's prediction never depends on what it is batched
+    with (as for the tree engines), so single-row and bulk scoring agree exactly.
+    '''
+
+    def __init__(self, coef, intercept, n_features=None, source=None):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = intercept
+        self.n_features = n_features
+        self.source = source
+        self.source_digest = None
+
+    def predict(self, X):
+        try:
+            X = _as_dense(X)
+            if X.shape[0] == 1:
+                # Same operations in the same order as below, on Python floats (IEEE doubles too)
+                total = 0.0
+                for value, coef in zip(X[0].tolist(), self.coef.tolist()):
+                    total += value * coef
+                return np.array([total + self.intercept])
+            out = np.zeros(X.shape[0], dtype=np.float64)
+            for j, coef in enumerate(self.coef):
+                out += X[:, j] * coef
+            return out + self.intercept
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _class_path(model):
+    cls = type(model)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _concat_trees(trees):
+    '''
+    Concatenates per-tree (feature, threshold, left, right, value, missing_right, depth)
+    tuples, with -1 children marking leaves, into one set of node arrays.
+    '''
+    feature, threshold, children, value, missing_right, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for tree_feature, tree_threshold, left, right, tree_value, tree_missing_right, depth in trees:
+        n_nodes = len(tree_feature)
+        index = np.arange(n_nodes)
+        leaf = left < 0
+        left = np.where(leaf, index, left) + offset
+        right = np.where(leaf, index, right) + offset
+        feature.append(np.where(leaf, 0, tree_feature))
+        threshold.append(tree_threshold)
+        children.append(np.column_stack([left, right]).ravel())
+        value.append(tree_value)
+        missing_right.append(tree_missing_right & ~leaf)
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, depth)
+    return (np.concatenate(feature), np.concatenate(threshold), np.concatenate(children),
+            np.concatenate(value), np.concatenate(missing_right), np.array(roots), max_depth)
+
+
+def _sklearn_tree(estimator):
+    tree = estimator.tree_
+    if tree.n_outputs != 1:
+        raise ValueError("Cannot compile multi-output trees")
+    missing_left = getattr(tree, "missing_go_to_left", None)
+    missing_right = (np.zeros(tree.node_count, dtype=bool) if missing_left is None
+                     else np.asarray(missing_left) == 0)
+    return (tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            tree.value[:, 0, 0], missing_right, tree.max_depth)
+
+
+def _sklearn_ensemble(estimators, aggregation, **kwargs):
+    arrays = _concat_trees([_sklearn_tree(estimator) for estimator in estimators])
+    return TreeEnsemble(*arrays, aggregation=aggregation, **kwargs)
+
+
+def _compile_gradient_boosting(model):
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Cannot compile multi-class gradient boosting")
+    if model.init_ == "zero":
+        base = 0.0
+    elif type(model.init_).__name__ == "DummyRegressor":
+        # The loss' initial raw prediction is a constant for a DummyRegressor init
+        base = float(np.ravel(model._raw_predict_init(np.zeros((1, model.n_features_in_))))[0])
+    else:
+        raise ValueError(f"Cannot compile gradient boosting with init {type(model.init_).__name__}")
+    return _sklearn_ensemble(model.estimators_[:, 0], "sum", base=base, scale=model.learning_rate,
+                             n_features=model.n_features_in_, source=_class_path(model))
+
+
+def _compile_adaboost(model):
+    estimators = model.estimators_
+    if not all(type(estimator).__name__ == "DecisionTreeRegressor" for estimator in estimators):
+        raise ValueError("Cannot compile AdaBoost with non-tree base estimators")
+    return _sklearn_ensemble(estimators, "weighted_median",
+                             weights=model.estimator_weights_[:len(estimators)],
+                             n_features=model.n_features_in_, source=_class_path(model))
+
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective not in ("reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror", "reg:quantileerror"):
+        raise ValueError(f"Cannot compile XGBoost objective {objective}")
+    # XGBoost >= 2 writes the base score as a one-element list
+    base = float(config["learner"]["learner_model_param"]["base_score"].strip("[]"))
+
+    dumped = json.loads(bytes(booster.save_raw(raw_format="json")))
+    trees = dumped["learner"]["gradient_booster"]["model"]["trees"]
+    if getattr(model, "best_iteration", None) is not None:
+        trees = trees[:(model.best_iteration + 1) * int(dumped["learner"]["gradient_booster"]["model"]
+                                                       ["gbtree_model_param"].get("num_parallel_tree", 1))]
+    flattened = []
+    for tree in trees:
+        if any(int(t) != 0 for t in tree.get("split_type", [])):
+            raise ValueError("Cannot compile XGBoost categorical splits")
+        left = np.asarray(tree["left_children"])
+        # Leaves keep their value in split_conditions
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        depth = _tree_depth(left, np.asarray(tree["right_children"]))
+        flattened.append((np.asarray(tree["split_indices"]), conditions, left,
+                          np.asarray(tree["right_children"]), conditions,
+                          np.asarray(tree["default_left"]) == 0, depth))
+    arrays = _concat_trees(flattened)
+    return TreeEnsemble(*arrays, aggregation="sum", base=np.float32(base), right_if_equal=True,
+                        dtype=np.float32, n_features=int(booster.num_features()), source=_class_path(model))
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.intp)
+    for node in range(len(left)):
+        # Parents come before their children in XGBoost's node order
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def _compile_catboost(model):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as file_obj:
+            dumped = json.load(file_obj)
+
+    features_info = dumped["features_info"]
+    if features_info.get("categorical_features") or features_info.get("text_features"):
+        raise ValueError("Cannot compile CatBoost models with categorical or text features")
+    float_features = features_info["float_features"]
+    if any(f.get("nan_value_treatment") == "AsTrue" and f.get("has_nans") for f in float_features):
+        raise ValueError("Cannot compile CatBoost models that send missing values right")
+
+    trees = dumped["oblivious_trees"]
+    depth = max(len(tree["splits"]) for tree in trees)
+    feature = np.zeros((len(trees), depth), dtype=np.intp)
+    border = np.full((len(trees), depth), np.inf, dtype=np.float32)
+    leaf_values = np.zeros((len(trees), 1 << depth), dtype=np.float64)
+    for t, tree in enumerate(trees):
+        if len(tree["leaf_values"]) != 1 << len(tree["splits"]):
+            raise ValueError("Cannot compile multi-dimensional CatBoost leaves")
+        for d, split in enumerate(tree["splits"]):
+            if split["split_type"] != "FloatFeature":
+                raise ValueError(f"Cannot compile CatBoost split type {split['split_type']}")
+            feature[t, d] = float_features[split["float_feature_index"]]["flat_feature_index"]
+            border[t, d] = split["border"]
+        leaf_values[t, :len(tree["leaf_values"])] = tree["leaf_values"]
+
+    scale, bias = dumped.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    return ObliviousEnsemble(feature, border, leaf_values, scale, bias,
+                             n_features=len(float_features), source=_class_path(model))
+
+
+def compile_model(model):
+    '''
+    Exports a fitted regressor into a NumPy inference engine. Supports scikit-learn
+    decision trees, random forests / extra trees, gradient boosting and AdaBoost,
+    XGBoost and CatBoost regressors, and plain linear models.
+    Raises ValueError for anything else.
+    '''
+    name = type(model).__name__
+    n_features = getattr(model, "n_features_in_", None)
+    if name in ("DecisionTreeRegressor", "ExtraTreeRegressor"):
+        return _sklearn_ensemble([model], "mean", n_features=n_features, source=_class_path(model))
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        return _sklearn_ensemble(model.estimators_, "mean", n_features=n_features, source=_class_path(model))
+    if name == "GradientBoostingRegressor":
+        return _compile_gradient_boosting(model)
+    if name == "AdaBoostRegressor":
+        return _compile_adaboost(model)
+    if name == "XGBRegressor":
+        return _compile_xgboost(model)
+    if name == "CatBoostRegressor":
+        return _compile_catboost(model)
+    if name in ("LinearRegression", "Ridge", "Lasso", "ElasticNet") and np.ndim(model.coef_) == 1:
+        return LinearModel(model.coef_, float(model.intercept_), n_features=n_features, source=_class_path(model))
+    raise ValueError(f"Cannot compile model {name}")
+
+
+def verify_compiled_model(compiled, model, X, rtol=1e-6, atol=1e-6):
+    '''
+    Returns the largest absolute difference between the compiled engine and the
+    original model on `X`, and whether every prediction is within tolerance.
+    '''
+    expected = np.ravel(model.predict(X))
+    actual = np.ravel(compiled.predict(X))
+    if expected.shape != actual.shape:
+        return float("inf"), False
+    max_error = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    return max_error, bool(np.allclose(actual, expected, rtol=rtol, atol=atol))
+
+
+def try_compile_model(model, X, rtol=1e-6, atol=1e-6):
+    '''
+    Returns a compiled engine validated against `model` on `X`, or None if the
+    model cannot be compiled or its predictions differ (callers then keep using
+    the library's predict).
+    '''
+    try:
+        compiled = compile_model(model)
+        max_error, ok = verify_compiled_model(compiled, model, X, rtol=rtol, atol=atol)
+        if not ok:
+            logging.info(f"Compiled {type(model).__name__} differs from the original by {max_error}, not using it")
+            return None
+        logging.info(f"Compiled {type(model).__name__}, max abs difference {max_error} on {X.shape[0]} rows")
+        return compiled
+
+    except Exception as e:
+        logging.info(f"Model cannot be compiled, using its own predict: {e}")
+        return None
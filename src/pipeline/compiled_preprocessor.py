@@ -0,0 +1,281 @@
+import sys
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+class NumericBlock:
+    '''
+    Imputer + StandardScaler on numerical columns, as fill/offset/scale vectors.
+    '''
+
+    def __init__(self, columns, fill, offset, scale):
+        self.columns = list(columns)
+        self.fill = fill        # None when the pipeline has no imputer
+        self.offset = offset    # None when the scaler does not center
+        self.scale = scale      # None when the scaler does not scale
+        self.width = len(self.columns)
+
+    def write(self, columns, out, start):
+        for j, name in enumerate(self.columns):
+            values = np.asarray(columns[name], dtype=np.float64)
+            if self.fill is not None:
+                values = np.where(np.isnan(values), self.fill[j], values)
+            if self.offset is not None:
+                values = values - self.offset[j]
+            if self.scale is not None:
+                values = values / self.scale[j]
+            out[:, start + j] = values
+
+    def write_record(self, record, row, start):
+        # Scalar fast path for one row; Python float ops are IEEE-identical to NumPy's
+        for j, name in enumerate(self.columns):
+            value = record.get(name)
+            value = float("nan") if value is None else float(value)
+            if self.fill is not None and value != value:
+                value = float(self.fill[j])
+            if self.offset is not None:
+                value = value - float(self.offset[j])
+            if self.scale is not None:
+                value = value / float(self.scale[j])
+            row[start + j] = value
+
+
+class CategoricalBlock:
+    '''
+    Imputer + OneHotEncoder (+ optional non-centering scaler) on categorical
+    columns, as one category -> output-column lookup table per input column and
+    the value written into the hot column.
+    '''
+
+    def __init__(self, columns, fill, categories, hot_values):
+        self.columns = list(columns)
+        self.fill = fill
+        self.lookups = []
+        self.offsets = []
+        offset = 0
+        for cats in categories:
+            self.lookups.append({cat: i for i, cat in enumerate(cats.tolist())})
+            self.offsets.append(offset)
+            offset += len(cats)
+        self.hot_values = hot_values
+        self.width = offset
+
+    def write(self, columns, out, start):
+        rows = np.arange(out.shape[0])
+        for j, name in enumerate(self.columns):
+            lookup = self.lookups[j]
+            fill = None if self.fill is None else self.fill[j]
+            index = np.empty(out.shape[0], dtype=np.intp)
+            unknown = []
+            for i, value in enumerate(columns[name]):
+                if fill is not None and _is_missing(value):
+                    value = fill
+                position = lookup.get(value)
+                if position is None:
+                    unknown.append(value)
+                    position = 0
+                index[i] = position
+            if unknown:
+                raise ValueError(f"Found unknown categories {unknown} in column {name} during transform")
+            positions = start + self.offsets[j] + index
+            out[rows, positions] = self.hot_values[self.offsets[j] + index]
+
+    def write_record(self, record, row, start):
+        for j, name in enumerate(self.columns):
+            value = record.get(name)
+            if self.fill is not None and _is_missing(value):
+                value = self.fill[j]
+            position = self.lookups[j].get(value)
+            if position is None:
+                raise ValueError(f"Found unknown categories [{value!r}] in column {name} during transform")
+            position += self.offsets[j]
+            row[start + position] = self.hot_values[position]
+
+
+def _is_missing(value):
+    # Same rule as SimpleImputer(missing_values=np.nan) on object columns: only NaN
+    return isinstance(value, float) and value != value
+
+
+def _unpack_steps(transformer):
+    # A bare transformer is treated as a one-step pipeline
+    steps = getattr(transformer, "steps", None)
+    if steps is None:
+        return [transformer]
+    return [step for _, step in steps]
+
+
+def _compile_numeric(columns, steps):
+    fill = offset = scale = None
+    for step in steps:
+        name = type(step).__name__
+        if name == "SimpleImputer" and fill is None and offset is None and scale is None:
+            fill = np.asarray(step.statistics_, dtype=np.float64)
+        elif name == "StandardScaler" and offset is None and scale is None:
+            if step.with_mean:
+                offset = np.asarray(step.mean_, dtype=np.float64)
+            if step.with_std and step.scale_ is not None:
+                scale = np.asarray(step.scale_, dtype=np.float64)
+        else:
+            raise ValueError(f"Cannot compile numerical step {name}")
+    return NumericBlock(columns, fill, offset, scale)
+
+
+def _compile_categorical(columns, steps):
+    fill = encoder = scaler = None
+    for step in steps:
+        name = type(step).__name__
+        if name == "SimpleImputer" and encoder is None:
+            fill = list(step.statistics_)
+        elif name == "OneHotEncoder" and encoder is None:
+            if step.drop is not None or step.handle_unknown != "error":
+                raise ValueError("Cannot compile OneHotEncoder with drop/handle_unknown set")
+            if getattr(step, "_infrequent_enabled", False):
+                raise ValueError("Cannot compile OneHotEncoder with infrequent categories")
+            encoder = step
+        elif name == "StandardScaler" and encoder is not None and scaler is None:
+            if step.with_mean:
+                raise ValueError("Cannot compile a centering scaler after one-hot encoding")
+            scaler = step
+        else:
+            raise ValueError(f"Cannot compile categorical step {name}")
+    if encoder is None:
+        raise ValueError("Categorical pipeline has no OneHotEncoder")
+
+    width = sum(len(cats) for cats in encoder.categories_)
+    hot_values = np.ones(width, dtype=np.float64)
+    if scaler is not None and scaler.with_std and scaler.scale_ is not None:
+        # sklearn multiplies sparse one-hot columns by 1 / scale_; 1.0 * (1 / s) == 1 / s
+        hot_values = 1 / np.asarray(scaler.scale_, dtype=np.float64)
+    return CategoricalBlock(columns, fill, encoder.categories_, hot_values)
+
+
+class CompiledPreprocessor:
+    '''
+    Pure NumPy replacement for the fitted ColumnTransformer built by
+    DataTransformation.get_data_transformer_object.
+
+    Accepts a single record (dict of scalars), a list of records, a dict of
+    columnar arrays or a DataFrame, and returns the dense feature matrix the
+    model was trained on.
+    '''
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.source_digest = None   # Set when saved next to the preprocessor it was exported from
+        self.columns = [name for block in blocks for name in block.columns]
+        self.n_features_out = sum(block.width for block in blocks)
+
+    def _as_columns(self, data):
+        if isinstance(data, dict):
+            columns = {name: data[name] for name in self.columns}
+        elif hasattr(data, "columns"):
+            columns = {name: data[name].to_numpy() for name in self.columns}
+        else:
+            columns = {name: [record.get(name) for record in data] for name in self.columns}
+        return columns, len(columns[self.columns[0]])
+
+    def _transform_record(self, record):
+        out = np.zeros((1, self.n_features_out), dtype=np.float64)
+        row = out[0]
+        start = 0
+        for block in self.blocks:
+            block.write_record(record, row, start)
+            start += block.width
+        return out
+
+    def transform(self, data):
+        try:
+            # Single rows skip the columnar path entirely
+            if isinstance(data, dict) and np.ndim(next(iter(data.values()), None)) == 0:
+                return self._transform_record(data)
+            if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+                return self._transform_record(data[0])
+            columns, n_rows = self._as_columns(data)
+            out = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+            start = 0
+            for block in self.blocks:
+                block.write(columns, out, start)
+                start += block.width
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def compile_preprocessor(preprocessor):
+    '''
+    Exports a fitted ColumnTransformer into a CompiledPreprocessor.
+    Raises ValueError if it contains steps that cannot be compiled.
+    '''
+    if getattr(preprocessor, "remainder", "drop") != "drop":
+        raise ValueError("Cannot compile a ColumnTransformer with a remainder")
+
+    blocks = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or name == "remainder":
+            continue
+        steps = _unpack_steps(transformer)
+        if any(type(step).__name__ == "OneHotEncoder" for step in steps):
+            blocks.append(_compile_categorical(columns, steps))
+        else:
+            blocks.append(_compile_numeric(columns, steps))
+    return CompiledPreprocessor(blocks)
+
+
+def _as_dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+def probe_columns(compiled, n_random=0, seed=0):
+    '''
+    Returns columnar probe data covering every known category, with numerical
+    columns spanning 0-100, plus `n_random` random combinations of the two.
+    '''
+    n_rows = max(len(lookup) for block in compiled.blocks
+                 if isinstance(block, CategoricalBlock) for lookup in block.lookups)
+    rng = np.random.RandomState(seed)
+    probe = {}
+    for block in compiled.blocks:
+        for j, name in enumerate(block.columns):
+            if isinstance(block, CategoricalBlock):
+                cats = list(block.lookups[j])
+                probe[name] = ([cats[i % len(cats)] for i in range(n_rows)]
+                               + [cats[i] for i in rng.randint(len(cats), size=n_random)])
+            else:
+                probe[name] = np.concatenate([np.linspace(0.0, 100.0, n_rows), rng.uniform(0.0, 100.0, n_random)])
+    return probe
+
+
+def verify_compiled_preprocessor(compiled, preprocessor):
+    '''
+    Checks that the compiled preprocessor reproduces the sklearn output bit for
+    bit on a probe frame that covers every known category.
+    '''
+    import pandas as pd
+
+    probe_df = pd.DataFrame(probe_columns(compiled))
+
+    expected = _as_dense(preprocessor.transform(probe_df))
+    actual = compiled.transform(probe_df)
+    return expected.shape == actual.shape and np.array_equal(expected, actual)
+
+
+def try_compile_preprocessor(preprocessor):
+    '''
+    Returns a verified CompiledPreprocessor, or None if the preprocessor cannot
+    be compiled exactly (callers then keep using the sklearn path).
+    '''
+    try:
+        compiled = compile_preprocessor(preprocessor)
+        if not verify_compiled_preprocessor(compiled, preprocessor):
+            logging.info("Compiled preprocessor output differs from sklearn, not using it")
+            return None
+        return compiled
+
+    except Exception as e:
+        logging.info(f"Preprocessor cannot be compiled, using sklearn transform: {e}")
+        return None
@@ -0,0 +1,220 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.pipeline.compiled_preprocessor import CategoricalBlock, compile_preprocessor
+
+
+# Configuration class for request validation
+@dataclass
+class InputSchemaConfig:
+    numeric_range: tuple = (0.0, 100.0)   # Inclusive bounds of every numerical column (exam scores)
+    numeric_ranges: dict = None           # Per-column overrides: {column: (low, high)}
+
+
+# Error codes, stable for API clients
+MISSING = "missing"
+NOT_A_NUMBER = "not_a_number"
+OUT_OF_RANGE = "out_of_range"
+UNKNOWN_CATEGORY = "unknown_category"
+
+
+def _error(row, field, code, value, **extra):
+    if isinstance(value, float) and not math.isfinite(value):
+        value = str(value)   # Keeps the error JSON-serializable
+    error = {"row": row, "field": field, "code": code, "value": value}
+    error.update(extra)
+    return error
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _is_known(value, allowed):
+    try:
+        return value in allowed
+    except TypeError:   # Unhashable, e.g. a list in a JSON payload
+        return False
+
+
+def _to_float(value):
+    # Numbers and numeric strings ("72", " 72.5 ") are accepted; booleans are not numbers here
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return float(value)
+
+
+class InputSchema:
+    '''
+    What the fitted preprocessor can encode: the known categories of every
+    categorical column, the numerical columns with their allowed range, and
+    which columns may be missing (those with an imputer).
+
+    Validation never raises and never touches the model: it returns the
+    records with numbers coerced to float, and a list of structured errors
+    ({"row", "field", "code", "value", ...}), empty when the input is valid.
+    '''
+
+    def __init__(self, categories, numeric_ranges, nullable):
+        self.categories = {name: frozenset(values) for name, values in categories.items()}
+        self.numeric_ranges = dict(numeric_ranges)
+        self.nullable = frozenset(nullable)
+        self.columns = list(self.categories) + list(self.numeric_ranges)
+        # Sorted once, for error messages
+        self._allowed = {name: sorted(values, key=str) for name, values in self.categories.items()}
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, config: InputSchemaConfig = None):
+        '''
+        Builds the schema from a CompiledPreprocessor, or from the fitted
+        ColumnTransformer it would be compiled from.
+        '''
+        config = config or InputSchemaConfig()
+        compiled = preprocessor if hasattr(preprocessor, "blocks") else compile_preprocessor(preprocessor)
+        overrides = config.numeric_ranges or {}
+        categories, numeric_ranges, nullable = {}, {}, []
+        for block in compiled.blocks:
+            for j, name in enumerate(block.columns):
+                if isinstance(block, CategoricalBlock):
+                    categories[name] = list(block.lookups[j])
+                else:
+                    low, high = overrides.get(name, config.numeric_range)
+                    numeric_ranges[name] = (float(low), float(high))
+                if block.fill is not None:
+                    nullable.append(name)
+        return cls(categories, numeric_ranges, nullable)
+
+    def validate_record(self, record, row=0):
+        '''
+        Scalar fast path for one record. Returns (coerced record, errors).
+        '''
+        errors = []
+        clean = dict(record)
+        for name, allowed in self.categories.items():
+            value = record.get(name)
+            if _is_missing(value):
+                if name not in self.nullable:
+                    errors.append(_error(row, name, MISSING, None))
+                # The imputer only recognises NaN as missing, not None
+                clean[name] = math.nan
+            elif not _is_known(value, allowed):
+                errors.append(_error(row, name, UNKNOWN_CATEGORY, value, allowed=self._allowed[name]))
+        for name, (low, high) in self.numeric_ranges.items():
+            value = record.get(name)
+            if isinstance(value, str) and not value.strip():
+                value = None
+            if _is_missing(value):
+                if name not in self.nullable:
+                    errors.append(_error(row, name, MISSING, None))
+                clean[name] = math.nan
+                continue
+            try:
+                number = _to_float(value)
+            except (TypeError, ValueError):
+                errors.append(_error(row, name, NOT_A_NUMBER, value))
+                continue
+            if number != number:
+                # "nan" counts as missing, as in the batch path
+                if name not in self.nullable:
+                    errors.append(_error(row, name, MISSING, None))
+            elif not low <= number <= high:
+                errors.append(_error(row, name, OUT_OF_RANGE, number, min=low, max=high))
+            clean[name] = number
+        return clean, errors
+
+    def _numeric_column(self, values):
+        # One C-level conversion for the common case; element by element only when it fails
+        try:
+            numbers = np.asarray(values, dtype=np.float64)
+            if not any(isinstance(value, bool) for value in values):
+                return numbers, np.zeros(len(values), dtype=bool)
+        except (TypeError, ValueError):
+            pass
+        numbers = np.empty(len(values), dtype=np.float64)
+        invalid = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            if isinstance(value, str) and not value.strip():
+                value = None
+            try:
+                numbers[i] = math.nan if _is_missing(value) else _to_float(value)
+            except (TypeError, ValueError):
+                numbers[i] = math.nan
+                invalid[i] = True
+        return numbers, invalid
+
+    def validate_records(self, records):
+        '''
+        Column-wise checks over a batch of records. Returns (coerced records, errors).
+        '''
+        if len(records) == 1:
+            clean, errors = self.validate_record(records[0])
+            return [clean], errors
+
+        n_rows = len(records)
+        failures = []   # (mask, field, code, values, extra)
+        coerced, missing_categories = {}, {}
+        for name, allowed in self.categories.items():
+            values = [record.get(name) for record in records]
+            missing = np.fromiter((_is_missing(v) for v in values), dtype=bool, count=n_rows)
+            known = np.fromiter((_is_known(v, allowed) for v in values), dtype=bool, count=n_rows)
+            if missing.any():
+                missing_categories[name] = missing
+            if name not in self.nullable:
+                failures.append((missing, name, MISSING, values, {}))
+            failures.append((~missing & ~known, name, UNKNOWN_CATEGORY, values, {"allowed": self._allowed[name]}))
+        for name, (low, high) in self.numeric_ranges.items():
+            values = [record.get(name) for record in records]
+            numbers, invalid = self._numeric_column(values)
+            missing = np.isnan(numbers) & ~invalid
+            with np.errstate(invalid="ignore"):
+                outside = ~missing & ~invalid & ~((numbers >= low) & (numbers <= high))
+            if name not in self.nullable:
+                failures.append((missing, name, MISSING, values, {}))
+            failures.append((invalid, name, NOT_A_NUMBER, values, {}))
+            failures.append((outside, name, OUT_OF_RANGE, numbers, {"min": low, "max": high}))
+            coerced[name] = numbers
+
+        errors = []
+        for mask, name, code, values, extra in failures:
+            for row in np.flatnonzero(mask).tolist():
+                value = None if code == MISSING else values[row]
+                errors.append(_error(row, name, code, float(value) if code == OUT_OF_RANGE else value, **extra))
+        errors.sort(key=lambda error: error["row"])
+
+        clean = []
+        for i, record in enumerate(records):
+            record = dict(record)
+            for name, numbers in coerced.items():
+                record[name] = float(numbers[i])
+            for name, missing in missing_categories.items():
+                if missing[i]:
+                    record[name] = math.nan
+            clean.append(record)
+        return clean, errors
+
+
+def _format_value(value):
+    # Non-finite numbers arrive as strings ("inf"), see _error
+    return f"{value:g}" if isinstance(value, (int, float)) and not isinstance(value, bool) else str(value)
+
+
+def describe_errors(errors, limit=5):
+    '''
+    One-line human readable summary of validation errors, for the HTML form and logs.
+    '''
+    parts = []
+    for error in errors[:limit]:
+        code, field = error["code"], error["field"]
+        if code == OUT_OF_RANGE:
+            parts.append(f"{field} must be between {error['min']:g} and {error['max']:g} (got {_format_value(error['value'])})")
+        elif code == UNKNOWN_CATEGORY:
+            parts.append(f"{field} has unknown value {error['value']!r}")
+        elif code == NOT_A_NUMBER:
+            parts.append(f"{field} must be a number (got {error['value']!r})")
+        else:
+            parts.append(f"{field} is required")
+    if len(errors) > limit:
+        parts.append(f"and {len(errors) - limit} more")
+    return "; ".join(parts)
@@ -0,0 +1,245 @@
+import os
+import sys
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import METRICS
+from src.utils import file_digest, load_object
+from src.pipeline.compiled_model import try_compile_model
+from src.pipeline.compiled_preprocessor import probe_columns, try_compile_preprocessor
+from src.pipeline.input_schema import InputSchema, InputSchemaConfig
+
+
+# Configuration class for the serving-side model registry
+@dataclass
+class ModelRegistryConfig:
+    model_file_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    max_versions: int = 3            # How many artifact versions to keep in memory
+    check_interval_s: float = 1.0    # Minimum seconds between stat() checks on the artifact files
+    # Serve through the NumPy export of the model (see compiled_model.py) instead of its own predict.
+    # When the trainer's export matches the model file, the model itself is never unpickled
+    compiled_model_file_path: str = os.path.join("artifacts", "model_compiled.pkl")
+    # Exported by DataTransformation; when it matches the preprocessor file, sklearn is never imported
+    compiled_preprocessor_file_path: str = os.path.join("artifacts", "preprocessor_compiled.pkl")
+    use_compiled_model: bool = os.environ.get("PREDICT_COMPILED_MODEL", "0") == "1"
+    # Bounds used by the request validation schema derived from the preprocessor
+    schema_config: InputSchemaConfig = field(default_factory=InputSchemaConfig)
+
+
+MODEL_LOAD_SECONDS = METRICS.histogram(
+    "model_load_seconds", "Time to load (and compile) a model/preprocessor pair"
+)
+
+
+@dataclass
+class ArtifactBundle:
+    '''
+    A loaded (model, preprocessor) pair together with the version it was loaded from.
+    `compiled_preprocessor` is the NumPy export of the preprocessor, or None if it
+    could not be compiled exactly. `compiled_model` is the validated NumPy engine
+    for the model when the registry is configured to use one. `model` and
+    `preprocessor` are the compiled objects themselves when the library ones
+    were never loaded. `input_schema` validates requests against what the
+    preprocessor was fitted on (None without a compiled preprocessor).
+    '''
+    version: str
+    model: object
+    preprocessor: object
+    model_path: str
+    preprocessor_path: str
+    loaded_at: float
+    compiled_preprocessor: object = None
+    compiled_model: object = None
+    input_schema: InputSchema = None
+
+
+def _file_signature(file_path):
+    # Cheap change detector: mtime and size, no file read
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def artifact_version(model_path, preprocessor_path):
+    '''
+    Returns a short content hash identifying a (model, preprocessor) pair.
+    '''
+    digest = hashlib.sha256()
+    digest.update(file_digest(model_path).encode())
+    digest.update(file_digest(preprocessor_path).encode())
+    return digest.hexdigest()[:16]
+
+
+class ModelRegistry:
+    '''
+    Loads the model and preprocessor once per process and serves them from memory.
+
+    The files are re-checked at most every `check_interval_s` seconds. When their
+    mtime/size changes the content hash is recomputed, and a new version is loaded
+    only if the hash is different. Up to `max_versions` versions stay resident so
+    callers can pin a specific one with `get(version)`.
+    '''
+
+    def __init__(self, config: ModelRegistryConfig = None):
+        self.registry_config = config or ModelRegistryConfig()
+        self._lock = threading.RLock()
+        self._versions = OrderedDict()
+        self._current_version = None
+        self._signatures = None
+        self._last_check = 0.0
+
+    def _load_bundle(self, model_path, preprocessor_path):
+        version = artifact_version(model_path, preprocessor_path)
+        if version in self._versions:
+            self._versions.move_to_end(version)
+            return self._versions[version]
+
+        logging.info(f"Loading artifacts version {version} from {model_path}, {preprocessor_path}")
+        with MODEL_LOAD_SECONDS.time():
+            compiled_preprocessor = self._load_export(
+                self.registry_config.compiled_preprocessor_file_path, preprocessor_path
+            )
+            preprocessor = compiled_preprocessor
+            if preprocessor is None:
+                preprocessor = load_object(file_path=preprocessor_path)
+                compiled_preprocessor = try_compile_preprocessor(preprocessor)
+            model = compiled_model = None
+            if self.registry_config.use_compiled_model:
+                compiled_model = self._load_export(self.registry_config.compiled_model_file_path, model_path)
+                model = compiled_model
+            if model is None:
+                model = load_object(file_path=model_path)
+            if self.registry_config.use_compiled_model and compiled_model is None:
+                compiled_model = self._compile_model(model, compiled_preprocessor)
+            input_schema = None
+            if compiled_preprocessor is not None:
+                input_schema = InputSchema.from_preprocessor(compiled_preprocessor, self.registry_config.schema_config)
+            bundle = ArtifactBundle(
+                version=version,
+                model=model,
+                preprocessor=preprocessor,
+                model_path=model_path,
+                preprocessor_path=preprocessor_path,
+                loaded_at=time.time(),
+                compiled_preprocessor=compiled_preprocessor,
+                compiled_model=compiled_model,
+                input_schema=input_schema,
+            )
+        self._versions[version] = bundle
+        self._evict(keep=version)
+        return bundle
+
+    def _load_export(self, compiled_path, source_path):
+        # A compiled export written at training time, if it was made from exactly this source file
+        if not os.path.exists(compiled_path):
+            return None
+        compiled = load_object(file_path=compiled_path)
+        if getattr(compiled, "source_digest", None) != file_digest(source_path):
+            logging.info(f"{compiled_path} was exported from a different {source_path}, ignoring it")
+            return None
+        logging.info(f"Using the compiled export {compiled_path} for {source_path}")
+        return compiled
+
+    def _compile_model(self, model, compiled_preprocessor):
+        # No usable export on disk: compile in process, validated on probe rows
+        if compiled_preprocessor is None:
+            logging.info("No compiled preprocessor to build validation rows from, not compiling the model")
+            return None
+        X = compiled_preprocessor.transform(probe_columns(compiled_preprocessor, n_random=1000))
+        return try_compile_model(model, X)
+
+    def _evict(self, keep):
+        # Drop the least recently loaded versions, never the current or the newly loaded one
+        while len(self._versions) > self.registry_config.max_versions:
+            for version in self._versions:
+                if version not in (self._current_version, keep):
+                    logging.info(f"Evicting artifacts version {version}")
+                    del self._versions[version]
+                    break
+            else:
+                break
+
+    def refresh(self, force=False):
+        '''
+        Reloads the default artifacts if the files on disk have changed.
+        Returns the current bundle.
+        '''
+        try:
+            now = time.monotonic()
+            if (not force and self._current_version is not None
+                    and now - self._last_check < self.registry_config.check_interval_s):
+                return self._versions[self._current_version]
+
+            with self._lock:
+                model_path = self.registry_config.model_file_path
+                preprocessor_path = self.registry_config.preprocessor_file_path
+                signatures = (_file_signature(model_path), _file_signature(preprocessor_path))
+                self._last_check = now
+
+                if force or signatures != self._signatures or self._current_version is None:
+                    bundle = self._load_bundle(model_path, preprocessor_path)
+                    if bundle.version != self._current_version:
+                        logging.info(f"Serving artifacts version {bundle.version}")
+                    self._current_version = bundle.version
+                    self._signatures = signatures
+
+                return self._versions[self._current_version]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def register(self, model_path, preprocessor_path):
+        '''
+        Loads an additional artifact pair side by side with the default one and
+        returns its version. The default (current) version is not changed.
+        '''
+        try:
+            with self._lock:
+                return self._load_bundle(model_path, preprocessor_path).version
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get(self, version=None):
+        '''
+        Returns the bundle for `version`, or the current default bundle.
+        '''
+        if version is None:
+            return self.refresh()
+        try:
+            with self._lock:
+                if version not in self._versions:
+                    raise KeyError(f"Unknown artifacts version {version}")
+                return self._versions[version]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def current_version(self):
+        return self._current_version
+
+    def versions(self):
+        with self._lock:
+            return list(self._versions.keys())
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry():
+    '''
+    Returns the process-wide registry, creating it on first use.
+    '''
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
@@ -1,29 +1,145 @@
 import sys
 import os
-import pandas as pd
+import numpy as np
 from src.exception import CustomException
-from src.utils import load_object
+from src.metrics import METRICS
+from src.pipeline.model_registry import get_default_registry
+from src.pipeline.prediction_cache import normalize_record
+
+
+PREPROCESS_SECONDS = METRICS.histogram(
+    "predict_preprocess_seconds", "Time to transform a prediction request's rows", ("path",)
+)
+PREDICT_SECONDS = METRICS.histogram("predict_model_seconds", "Time spent in model.predict per call", ("path",))
+
+
+def _input_columns(bundle):
+    # Raw feature names the preprocessor was fitted on, in order
+    if bundle.compiled_preprocessor is not None:
+        return bundle.compiled_preprocessor.columns
+    return list(bundle.preprocessor.feature_names_in_)
 
 
 class PredictPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, registry=None, version=None, cache=None, table=None):
+        # Artifacts are loaded once per process by the registry, not per call
+        self.registry = registry or get_default_registry()
+        self.version = version
+        # Optional PredictionCache; results are keyed on the artifact version
+        self.cache = cache
+        # Optional PredictionTableStore; answers on-grid records without running the model
+        self.table = table
 
     def predict(self,features):
         try:
-            model_path=os.path.join("artifacts","model.pkl")
-            preprocessor_path=os.path.join('artifacts','preprocessor.pkl')
-            print("Before Loading")
-            model=load_object(file_path=model_path)
-            preprocessor=load_object(file_path=preprocessor_path)
-            print("After Loading")
-            data_scaled=preprocessor.transform(features)
-            preds=model.predict(data_scaled)
+            bundle=self.registry.get(self.version)
+            # The compiled NumPy encoder is bit-for-bit equal to the sklearn path
+            preprocessor=bundle.compiled_preprocessor or bundle.preprocessor
+            with PREPROCESS_SECONDS.time(path="sklearn" if bundle.compiled_preprocessor is None else "compiled"):
+                data_scaled=preprocessor.transform(features)
+            # The compiled engine is only set when the registry opted in, and was validated on load
+            model=bundle.compiled_model or bundle.model
+            with PREDICT_SECONDS.time(path="library" if bundle.compiled_model is None else "compiled"):
+                preds=model.predict(data_scaled)
             return preds
         
         except Exception as e:
             raise CustomException(e,sys)
 
+    def validate_records(self, records):
+        '''
+        Checks and coerces input records against the served preprocessor's
+        schema, before any model work. Returns (records, errors); `errors` is a
+        list of structured dicts and is empty when every record is valid.
+        '''
+        try:
+            schema=self.registry.get(self.version).input_schema
+            if schema is None:
+                # No schema without a compiled preprocessor: the transform reports problems instead
+                return records, []
+            return schema.validate_records(records)
+
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def _predict_uncached(self, records):
+        if self.registry.get(self.version).compiled_preprocessor is not None:
+            return self.predict(records)
+        # pandas is only needed by the sklearn transform fallback
+        import pandas as pd
+        features=pd.DataFrame.from_records(records)
+        return self.predict(features)
+
+    def _cache_key(self, bundle, record):
+        try:
+            key = normalize_record(record, _input_columns(bundle))
+            hash(key)
+            return key
+        except TypeError:
+            # Unhashable input values are simply not cached
+            return None
+
+    def _precomputed(self, bundle, table, record):
+        # Prediction table first (no lock, no model), then the result cache
+        if table is not None:
+            value=table.lookup(record)
+            if value is not None:
+                return value, None
+        if self.cache is None:
+            return None, None
+        key=self._cache_key(bundle, record)
+        return (None if key is None else self.cache.get(bundle.version, key)), key
+
+    def lookup(self, record):
+        '''
+        Returns the precomputed or cached prediction for a single record, or
+        None if it has to go through the model.
+        '''
+        try:
+            if self.cache is None and self.table is None:
+                return None
+            bundle=self.registry.get(self.version)
+            table=self.table.get(bundle.version) if self.table is not None else None
+            return self._precomputed(bundle, table, record)[0]
+
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def predict_records(self, records):
+        '''
+        Scores a list of input records (dicts keyed by feature name) in one call.
+        With a prediction table or cache, only the records they cannot answer
+        reach the model.
+        '''
+        try:
+            if self.cache is None and self.table is None:
+                return self._predict_uncached(records)
+
+            bundle=self.registry.get(self.version)
+            table=self.table.get(bundle.version) if self.table is not None else None
+            preds=np.empty(len(records), dtype=np.float64)
+            keys, missing = [], []
+            for i, record in enumerate(records):
+                value, key=self._precomputed(bundle, table, record)
+                keys.append(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    preds[i]=value
+
+            if missing:
+                # Pin the version the keys were built for, even if a new model lands meanwhile
+                pinned=PredictPipeline(registry=self.registry, version=bundle.version)
+                fresh=pinned._predict_uncached([records[i] for i in missing])
+                for i, value in zip(missing, np.ravel(fresh)):
+                    preds[i]=value
+                    if keys[i] is not None:
+                        self.cache.put(bundle.version, keys[i], value)
+            return preds
+
+        except Exception as e:
+            raise CustomException(e,sys)
+
 
 
 class CustomData:
@@ -52,6 +168,8 @@ class CustomData:
 
     def get_data_as_data_frame(self):
         try:
+            import pandas as pd
+
             custom_data_input_dict = {
                 "gender": [self.gender],
                 "race_ethnicity": [self.race_ethnicity],
@@ -65,4 +183,18 @@ class CustomData:
             return pd.DataFrame(custom_data_input_dict)
 
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    def get_data_as_dict(self):
+        '''
+        Returns the input as a single record, for the pandas-free predict path.
+        '''
+        return {
+            "gender": self.gender,
+            "race_ethnicity": self.race_ethnicity,
+            "parental_level_of_education": self.parental_level_of_education,
+            "lunch": self.lunch,
+            "test_preparation_course": self.test_preparation_course,
+            "reading_score": self.reading_score,
+            "writing_score": self.writing_score,
+        }
\ No newline at end of file
@@ -0,0 +1,208 @@
+import os
+import sys
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Configuration class for the prediction result cache
+@dataclass
+class PredictionCacheConfig:
+    max_entries: int = 10_000     # Bound on cached rows per process (and in the shared store)
+    ttl_s: float = None           # Seconds an entry stays valid (None = until the model changes)
+    shared_path: str = None       # SQLite file shared by all workers on the host (None = in-process only)
+    # Shared rows of a version other than the one in use are dropped once they are this old,
+    # so workers that reload at different times (or pin a version) do not evict each other
+    stale_version_grace_s: float = 600.0
+
+
+# Marker for a missing numeric value; NaN cannot be used directly since NaN != NaN
+_NAN = ("nan",)
+
+
+def normalize_record(record, columns):
+    '''
+    Returns the cache key of an input record: its values in `columns` order, with
+    every number as float so 50, 50.0 and np.int64(50) hit the same entry.
+    '''
+    key = []
+    for name in columns:
+        value = record.get(name)
+        if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+            value = float(value)
+            if value != value:
+                value = _NAN
+        key.append(value)
+    return tuple(key)
+
+
+class PredictionCache:
+    '''
+    Bounded cache of model outputs keyed on (artifact version, normalized row).
+
+    The in-process tier is an LRU dict. With `shared_path` set, a SQLite file
+    backs it so workers on the same host share their results; that tier evicts
+    the oldest entries once it grows past `max_entries`. The version is part of
+    every key, so replacing model.pkl invalidates the cache automatically while
+    several versions can be served side by side (pinned versions, workers that
+    reload at different times). Entries of versions no longer in use age out:
+    through the LRU in process, and after `stale_version_grace_s` in the shared
+    tier. The lock only guards the in-process tier: SQLite is queried and
+    written outside it, so a busy shared file never blocks the other threads.
+    '''
+
+    def __init__(self, config: PredictionCacheConfig = None):
+        self.cache_config = config or PredictionCacheConfig()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ---------------------------------------------------------------------
+    # Shared SQLite tier
+    # ---------------------------------------------------------------------
+    def _connection(self):
+        # One connection per thread and per process; never reuse one across a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        path = self.cache_config.shared_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "version TEXT, key TEXT, value REAL, created REAL, PRIMARY KEY (version, key))"
+        )
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _shared_get(self, version, key):
+        row = self._connection().execute(
+            "SELECT value, created FROM predictions WHERE version = ? AND key = ?", (version, repr(key))
+        ).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        return row
+
+    def _shared_put(self, version, key, value, created, trim=False):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", (version, repr(key), value, created)
+        )
+        if trim:
+            # Amortised trim of the shared table: stale versions past their grace period,
+            # then the oldest rows beyond max_entries
+            conn.execute(
+                "DELETE FROM predictions WHERE version != ? AND created < ?",
+                (version, time.time() - self.cache_config.stale_version_grace_s),
+            )
+            conn.execute(
+                "DELETE FROM predictions WHERE rowid IN (SELECT rowid FROM predictions "
+                "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.cache_config.max_entries,)
+            )
+
+    # ---------------------------------------------------------------------
+    # Cache API
+    # ---------------------------------------------------------------------
+    def _expired(self, created):
+        ttl_s = self.cache_config.ttl_s
+        return ttl_s is not None and time.time() - created > ttl_s
+
+    def _check_version(self, version):
+        # Called with the lock held; entries of the previous version are left to age out
+        if version != self._version and self._version is not None:
+            logging.info(f"Model version {version} in use, previous version {self._version}")
+        self._version = version
+
+    def get(self, version, key):
+        '''
+        Returns the cached prediction for `key` under `version`, or None.
+        '''
+        try:
+            with self._lock:
+                self._check_version(version)
+                entry = self._local_get(version, key)
+                if entry is not None or not self.cache_config.shared_path:
+                    return self._count(version, key, entry)
+
+            # SQLite (up to its busy timeout) without holding up the other threads
+            entry = self._shared_get(version, key)
+            with self._lock:
+                if entry is not None:
+                    # A put that landed meanwhile is newer than the shared row
+                    entry = self._entries.setdefault((version, key), entry)
+                    self._trim()
+                return self._count(version, key, entry)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _local_get(self, version, key):
+        # Called with the lock held
+        entry = self._entries.get((version, key))
+        if entry is not None and self._expired(entry[1]):
+            del self._entries[(version, key)]
+            entry = None
+        return entry
+
+    def _count(self, version, key, entry):
+        # Called with the lock held: records the hit or miss and refreshes the LRU position
+        if entry is None:
+            self.misses += 1
+            return None
+        if (version, key) in self._entries:
+            self._entries.move_to_end((version, key))
+        self.hits += 1
+        return entry[0]
+
+    def put(self, version, key, value):
+        try:
+            with self._lock:
+                self._check_version(version)
+                entry = (float(value), time.time())
+                self._entries[(version, key)] = entry
+                self._entries.move_to_end((version, key))
+                self._trim()
+                self._puts += 1
+                trim_shared = self._puts % 256 == 0
+            if self.cache_config.shared_path:
+                self._shared_put(version, key, *entry, trim=trim_shared)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _trim(self):
+        while len(self._entries) > self.cache_config.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            if self.cache_config.shared_path:
+                self._connection().execute("DELETE FROM predictions")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.cache_config.max_entries,
+                "version": self._version,
+                "shared": bool(self.cache_config.shared_path),
+            }
@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import time
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+
+
+# Configuration class for the precomputed full-domain prediction table
+@dataclass
+class PredictionTableConfig:
+    meta_file_path: str = os.path.join("artifacts", "prediction_table.json")
+    model_file_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    numeric_range: tuple = (0, 100)   # Inclusive integer range enumerated for every numerical column
+    batch_size: int = 1 << 16         # Grid points scored per predict call while materializing
+    dtype: str = "float64"            # float64 keeps the model output exactly
+    check_interval_s: float = 1.0     # Minimum seconds between checks for a re-materialized table
+
+
+class PredictionTable:
+    '''
+    Model output for every point of the input domain, as one memory-mapped
+    array with a dimension per input column. A lookup is a handful of dict/int
+    operations and a single array read; records outside the grid (unknown
+    categories, missing or non-integer scores) return None.
+    '''
+
+    def __init__(self, meta, values):
+        self.meta = meta
+        self.version = meta["version"]
+        self._values = values.reshape(-1)
+        self._dims = []
+        stride = 1
+        for name, size in reversed(list(zip(meta["columns"], meta["shape"]))):
+            if name in meta["categorical"]:
+                index = {category: i for i, category in enumerate(meta["categorical"][name])}
+            else:
+                index = tuple(meta["numeric"][name])
+            self._dims.append((name, stride, index))
+            stride *= size
+        self._dims.reverse()
+
+    @classmethod
+    def open(cls, meta_file_path):
+        with open(meta_file_path) as file_obj:
+            meta = json.load(file_obj)
+        table_path = os.path.join(os.path.dirname(meta_file_path), meta["table_file"])
+        return cls(meta, np.load(table_path, mmap_mode="r"))
+
+    def lookup(self, record):
+        flat = 0
+        for name, stride, index in self._dims:
+            value = record.get(name)
+            if isinstance(index, dict):
+                try:
+                    position = index.get(value)
+                except TypeError:
+                    return None
+                if position is None:
+                    return None
+            else:
+                if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+                    return None
+                value = float(value)
+                low, high = index
+                if not value.is_integer() or value < low or value > high:
+                    return None
+                position = int(value) - low
+            flat += position * stride
+        return float(self._values[flat])
+
+
+class PredictionTableStore:
+    '''
+    Serves the prediction table that matches a given artifact version, re-reading
+    the metadata file when it changes on disk.
+    '''
+
+    def __init__(self, config: PredictionTableConfig = None):
+        self.table_config = config or PredictionTableConfig()
+        self._lock = threading.Lock()
+        self._table = None
+        self._signature = None
+        self._last_check = 0.0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._last_check < self.table_config.check_interval_s:
+            return
+        with self._lock:
+            self._last_check = now
+            try:
+                stat = os.stat(self.table_config.meta_file_path)
+            except OSError:
+                self._table, self._signature = None, None
+                return
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+            try:
+                self._table = PredictionTable.open(self.table_config.meta_file_path)
+                logging.info(f"Loaded prediction table for version {self._table.version}")
+            except (OSError, ValueError, KeyError) as e:
+                logging.info(f"Prediction table not usable: {e}")
+                self._table = None
+            self._signature = signature
+
+    def get(self, version):
+        '''
+        Returns the table built for artifact `version`, or None.
+        '''
+        self._refresh()
+        table = self._table
+        return table if table is not None and table.version == version else None
+
+
+class PredictionTableBuilder:
+    '''
+    Offline step that scores the trained model on the full input grid: every
+    category of every categorical column times every integer in
+    `numeric_range` for every numerical column.
+    '''
+
+    def __init__(self, config: PredictionTableConfig = None):
+        self.table_config = config or PredictionTableConfig()
+
+    def output_paths(self):
+        # The table file name carries the version, so it is only known from the metadata
+        config = self.table_config
+        with open(config.meta_file_path) as file_obj:
+            table_file = json.load(file_obj)["table_file"]
+        return [config.meta_file_path, os.path.join(os.path.dirname(config.meta_file_path), table_file)]
+
+    def initiate_materialization(self):
+        '''
+        Writes the table and its metadata and returns the metadata path.
+        '''
+        try:
+            from numpy.lib.format import open_memmap
+            from src.pipeline.compiled_preprocessor import compile_preprocessor
+            from src.pipeline.model_registry import artifact_version
+
+            config = self.table_config
+            version = artifact_version(config.model_file_path, config.preprocessor_file_path)
+            model = load_object(file_path=config.model_file_path)
+            # The compiled encoder exposes the categories and transforms whole columns at once
+            preprocessor = compile_preprocessor(load_object(file_path=config.preprocessor_file_path))
+
+            low, high = config.numeric_range
+            columns, categorical, numeric, shape = [], {}, {}, []
+            for block in preprocessor.blocks:
+                for j, name in enumerate(block.columns):
+                    columns.append(name)
+                    if hasattr(block, "lookups"):
+                        categorical[name] = list(block.lookups[j])
+                        shape.append(len(categorical[name]))
+                    else:
+                        numeric[name] = [low, high]
+                        shape.append(high - low + 1)
+            n_points = int(np.prod(shape))
+            logging.info(f"Materializing {n_points} predictions over {dict(zip(columns, shape))}")
+
+            directory = os.path.dirname(config.meta_file_path) or "."
+            table_file = f"prediction_table-{version}.npy"
+            table_path = os.path.join(directory, table_file)
+            os.makedirs(directory, exist_ok=True)
+            values = open_memmap(table_path + ".tmp", mode="w+", dtype=config.dtype, shape=(n_points,))
+
+            category_arrays = {name: np.asarray(cats, dtype=object) for name, cats in categorical.items()}
+            for start in range(0, n_points, config.batch_size):
+                stop = min(n_points, start + config.batch_size)
+                positions = np.unravel_index(np.arange(start, stop), shape)
+                batch = {
+                    name: category_arrays[name][position] if name in categorical
+                    else (position + low).astype(np.float64)
+                    for name, position in zip(columns, positions)
+                }
+                values[start:stop] = np.ravel(model.predict(preprocessor.transform(batch)))
+            values.flush()
+            del values
+            os.replace(table_path + ".tmp", table_path)
+
+            meta = {
+                "version": version,
+                "table_file": table_file,
+                "columns": columns,
+                "shape": shape,
+                "categorical": categorical,
+                "numeric": numeric,
+                "dtype": config.dtype,
+            }
+            tmp_path = config.meta_file_path + ".tmp"
+            with open(tmp_path, "w") as file_obj:
+                json.dump(meta, file_obj)
+            os.replace(tmp_path, config.meta_file_path)
+
+            # Tables of earlier versions are no longer referenced
+            for name in os.listdir(directory):
+                if name.startswith("prediction_table-") and name.endswith(".npy") and name != table_file:
+                    os.remove(os.path.join(directory, name))
+
+            logging.info(f"Prediction table for version {version} saved to {table_path}")
+            return config.meta_file_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    print(PredictionTableBuilder().initiate_materialization())
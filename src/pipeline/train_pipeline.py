@@ -0,0 +1,331 @@
+import os
+import sys
+import hashlib
+import inspect
+import json
+import time
+from dataclasses import dataclass, field, is_dataclass
+from typing import Callable, List
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import METRICS
+from src.artifact_store import ArtifactStore
+from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+from src.components.data_transformation import DataTransformation, DataTransformationConfig
+from src.pipeline.prediction_table import PredictionTableBuilder, PredictionTableConfig
+
+
+STAGE_SECONDS = METRICS.histogram("pipeline_stage_seconds", "Duration of a training pipeline stage", ("stage",))
+
+
+# Configuration class for the stage-cached training pipeline
+@dataclass
+class TrainPipelineConfig:
+    state_file_path: str = os.path.join("artifacts", "pipeline_state.json")
+    force: bool = False    # Re-run every stage even if its fingerprint is unchanged
+    streaming: bool = False    # Out-of-core ingestion/transformation for sources larger than RAM
+    ingestion_config: DataIngestionConfig = field(default_factory=DataIngestionConfig)
+    transformation_config: DataTransformationConfig = field(default_factory=DataTransformationConfig)
+    trainer_config: object = None   # ModelTrainerConfig; None = defaults
+    materialize_table: bool = False    # Also precompute the model over the full input domain for serving
+    table_config: PredictionTableConfig = field(default_factory=PredictionTableConfig)
+
+
+@dataclass
+class Stage:
+    '''
+    One step of the training DAG. A stage is skipped when the fingerprint of its
+    code, parameters and input files matches the last successful run and its
+    output files are still intact.
+    '''
+    name: str
+    code: List[object]             # Classes/modules whose source is part of the fingerprint
+    params: object                 # Config for the stage, hashed as JSON
+    inputs: Callable[[], List[str]]
+    outputs: Callable[[], List[str]]
+    run: Callable[[], object]      # Returns a JSON-serialisable result kept in the state file
+
+
+def _config_as_dict(config):
+    # Includes un-annotated class attributes such as DataTransformationConfig.preprocessor_obj_file_path
+    if isinstance(config, (tuple, list)):
+        return [_config_as_dict(item) for item in config]
+    if not is_dataclass(config):
+        return config
+    return {name: getattr(config, name) for name in dir(config) if not name.startswith("_")}
+
+
+class TrainPipeline:
+    '''
+    Runs DataIngestion -> DataTransformation -> ModelTrainer as fingerprinted
+    stages. Only stages whose inputs or code changed, and the stages downstream
+    of them, are recomputed; the rest reuse their artifacts from the last run.
+    '''
+
+    def __init__(self, config: TrainPipelineConfig = None):
+        self.pipeline_config = config or TrainPipelineConfig()
+        self._state = {"stages": {}, "files": {}}
+
+    # ---------------------------------------------------------------------
+    # Fingerprinting
+    # ---------------------------------------------------------------------
+    def _file_hash(self, file_path):
+        # Reuse the recorded hash while size and mtime are unchanged
+        stat = os.stat(file_path)
+        known = self._state["files"].get(file_path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(1 << 20), b""):
+                digest.update(chunk)
+        self._state["files"][file_path] = {
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()
+        }
+        return digest.hexdigest()
+
+    def _path_hash(self, path):
+        # Columnar frames and shard sets are directories: hash their files in a stable order
+        if not os.path.isdir(path):
+            return self._file_hash(path)
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(path)):
+            digest.update(name.encode())
+            digest.update(self._path_hash(os.path.join(path, name)).encode())
+        return digest.hexdigest()
+
+    def _fingerprint(self, stage):
+        digest = hashlib.sha256()
+        for obj in stage.code:
+            digest.update(self._file_hash(inspect.getsourcefile(obj)).encode())
+        digest.update(json.dumps(_config_as_dict(stage.params), sort_keys=True, default=repr).encode())
+        for file_path in stage.inputs():
+            digest.update(file_path.encode())
+            digest.update(self._path_hash(file_path).encode())
+        return digest.hexdigest()
+
+    def _outputs_intact(self, stage, record):
+        try:
+            return all(
+                self._path_hash(file_path) == record["outputs"].get(file_path)
+                for file_path in stage.outputs()
+            )
+        except (OSError, ValueError):
+            return False
+
+    # ---------------------------------------------------------------------
+    # State file
+    # ---------------------------------------------------------------------
+    def _load_state(self):
+        try:
+            with open(self.pipeline_config.state_file_path) as file_obj:
+                self._state = json.load(file_obj)
+        except (OSError, ValueError):
+            self._state = {"stages": {}, "files": {}}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.pipeline_config.state_file_path), exist_ok=True)
+        tmp_path = self.pipeline_config.state_file_path + ".tmp"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(self._state, file_obj, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.pipeline_config.state_file_path)
+
+    # ---------------------------------------------------------------------
+    # Stages
+    # ---------------------------------------------------------------------
+    def _stages(self, delta_path=None):
+        # Imported here so that building the pipeline does not pull in the model zoo
+        from src.components import model_search, model_selection, profiling, warm_start
+        from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+        from src import utils
+        from src.pipeline import compiled_model, compiled_preprocessor
+
+        config = self.pipeline_config
+        ingestion_config = config.ingestion_config
+        transformation_config = config.transformation_config
+        trainer_config = config.trainer_config or ModelTrainerConfig()
+        data_ingestion = DataIngestion(ingestion_config)
+        raw_path, train_path, test_path = data_ingestion.output_paths()
+        artifact_store = ArtifactStore()
+
+        if config.streaming:
+            # Shard directories replace the single split files
+            raw_path = None
+            train_path, test_path = ingestion_config.train_shard_dir, ingestion_config.test_shard_dir
+
+        # Handed from one incremental stage to the next; not JSON, so kept out of the results
+        refresh = {}
+
+        def run_ingestion():
+            if delta_path is not None:
+                _, _, train_delta, test_delta = data_ingestion.initiate_incremental_ingestion(
+                    delta_path, streaming=config.streaming
+                )
+                refresh["train_delta"] = train_delta
+                return {"train_data_path": train_path, "test_data_path": test_path, "mode": "incremental",
+                        "new_train_rows": len(train_delta), "new_test_rows": len(test_delta)}
+            if config.streaming:
+                train_data_path, test_data_path = data_ingestion.initiate_streaming_ingestion()
+            else:
+                train_data_path, test_data_path = data_ingestion.initiate_data_ingestion()
+            return {"train_data_path": train_data_path, "test_data_path": test_data_path}
+
+        def run_transformation():
+            data_transformation = DataTransformation(transformation_config)
+            if delta_path is not None:
+                _, _, preprocessor_path, refresh["feature_map"] = data_transformation.initiate_incremental_transformation(
+                    train_path, test_path, refresh["train_delta"], streaming=config.streaming
+                )
+                return {"preprocessor_path": preprocessor_path, "mode": "incremental"}
+            if config.streaming:
+                _, _, preprocessor_path = data_transformation.initiate_streaming_transformation(train_path, test_path)
+            else:
+                _, _, preprocessor_path = data_transformation.initiate_data_transformation(train_path, test_path)
+            return {"preprocessor_path": preprocessor_path}
+
+        def run_training():
+            # Memory-mapped, no parsing or copying at the stage boundary
+            train_set = (
+                artifact_store.load_matrix(transformation_config.train_features_file_path),
+                artifact_store.load_array(transformation_config.train_target_file_path),
+            )
+            test_set = (
+                artifact_store.load_matrix(transformation_config.test_features_file_path),
+                artifact_store.load_array(transformation_config.test_target_file_path),
+            )
+            if delta_path is not None:
+                r2_square = ModelTrainer(trainer_config).initiate_incremental_training(
+                    train_set, test_set, refresh["feature_map"], n_new_rows=len(refresh["train_delta"])
+                )
+                return {"r2_score": float(r2_square), "mode": "incremental"}
+            r2_square = ModelTrainer(trainer_config).initiate_model_trainer(train_set, test_set)
+            return {"r2_score": float(r2_square)}
+
+        stages = [
+            Stage(
+                name="data_ingestion",
+                code=[DataIngestion, ArtifactStore],
+                params=(ingestion_config, config.streaming),
+                inputs=lambda: [ingestion_config.source_data_path] + data_ingestion.accepted_deltas(),
+                outputs=lambda: [path for path in (raw_path, train_path, test_path) if path],
+                run=run_ingestion,
+            ),
+            Stage(
+                name="data_transformation",
+                code=[DataTransformation, ArtifactStore, utils, compiled_preprocessor, warm_start],
+                params=(transformation_config, config.streaming),
+                inputs=lambda: [train_path, test_path],
+                outputs=lambda: [
+                    transformation_config.preprocessor_obj_file_path,
+                    artifact_store.matrix_path(transformation_config.train_features_file_path),
+                    transformation_config.train_target_file_path,
+                    artifact_store.matrix_path(transformation_config.test_features_file_path),
+                    transformation_config.test_target_file_path,
+                ] + [path for path in [transformation_config.compiled_preprocessor_file_path] if os.path.exists(path)],
+                run=run_transformation,
+            ),
+            Stage(
+                name="model_trainer",
+                code=[ModelTrainer, model_search, model_selection, profiling, warm_start, utils, compiled_model],
+                params=trainer_config,
+                inputs=lambda: [
+                    artifact_store.matrix_path(transformation_config.train_features_file_path),
+                    transformation_config.train_target_file_path,
+                    artifact_store.matrix_path(transformation_config.test_features_file_path),
+                    transformation_config.test_target_file_path,
+                ],
+                # The compiled export only exists for models that could be compiled
+                outputs=lambda: [trainer_config.trained_model_file_path, trainer_config.training_report_file_path] + [
+                    path for path in [trainer_config.compiled_model_file_path, trainer_config.training_profile_file_path]
+                    if os.path.exists(path)
+                ],
+                run=run_training,
+            ),
+        ]
+
+        if config.materialize_table:
+            table_builder = PredictionTableBuilder(config.table_config)
+            stages.append(Stage(
+                name="prediction_table",
+                code=[PredictionTableBuilder],
+                params=config.table_config,
+                inputs=lambda: [
+                    config.table_config.model_file_path,
+                    config.table_config.preprocessor_file_path,
+                ],
+                outputs=table_builder.output_paths,
+                run=lambda: {"meta_file_path": table_builder.initiate_materialization()},
+            ))
+        return stages
+
+    def run(self):
+        '''
+        Runs the pipeline and returns the R2 score of the trained model.
+        '''
+        return self._execute()
+
+    def refresh(self, delta_path):
+        '''
+        Incremental refresh with the new rows in `delta_path` (a CSV with the
+        source columns): they are appended to the existing splits, folded into
+        the preprocessor's statistics, and the previously selected model keeps
+        training from its saved state instead of the whole model zoo being
+        searched again. Needs the artifacts of a previous run. Returns the R2
+        score of the refreshed model; a later `run` reuses the refreshed
+        artifacts, `force=True` retrains from scratch.
+        '''
+        return self._execute(delta_path)
+
+    def _execute(self, delta_path=None):
+        try:
+            self._load_state()
+            results = {}
+            incremental = {"data_ingestion", "data_transformation", "model_trainer"} if delta_path else set()
+            if incremental and not all(name in self._state["stages"] for name in incremental):
+                raise FileNotFoundError("An incremental refresh needs the artifacts of a previous full run")
+            if incremental and DataIngestion(self.pipeline_config.ingestion_config).is_accepted(delta_path):
+                logging.info(f"{delta_path} was already applied, nothing to refresh")
+                return self._state["stages"]["model_trainer"]["result"]["r2_score"]
+
+            for stage in self._stages(delta_path):
+                fingerprint = self._fingerprint(stage)
+                record = self._state["stages"].get(stage.name)
+
+                if (not self.pipeline_config.force and stage.name not in incremental and record
+                        and record["fingerprint"] == fingerprint and self._outputs_intact(stage, record)):
+                    logging.info(f"Stage {stage.name} is up to date, reusing its artifacts")
+                    results[stage.name] = record["result"]
+                    continue
+
+                logging.info(f"Running stage {stage.name}")
+                start = time.perf_counter()
+                result = stage.run()
+                duration_s = time.perf_counter() - start
+                STAGE_SECONDS.observe(duration_s, stage=stage.name)
+                logging.info(f"Stage {stage.name} finished in {duration_s:.3f}s")
+                if stage.name in incremental:
+                    # The refresh changed the stage's own inputs (the delta log, maybe the source)
+                    fingerprint = self._fingerprint(stage)
+                self._state["stages"][stage.name] = {
+                    "fingerprint": fingerprint,
+                    "duration_s": duration_s,
+                    "outputs": {file_path: self._path_hash(file_path) for file_path in stage.outputs()},
+                    "result": result,
+                }
+                # Persist after every stage so an interrupted run keeps finished work
+                self._save_state()
+                results[stage.name] = result
+
+            return results["model_trainer"]["r2_score"]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+if __name__ == "__main__":
+    # python -m src.pipeline.train_pipeline [new_rows.csv]: full run, or incremental refresh with new rows
+    if len(sys.argv) > 1:
+        print(TrainPipeline().refresh(sys.argv[1]))
+    else:
+        print(TrainPipeline().run())
@@ -0,0 +1,181 @@
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+
+from src.exception import CustomException
+from src.logger import logging
+
+# File layout: MAGIC | uint64 header length | JSON header | blobs, each starting on
+# an ALIGNMENT boundary so arrays mapped straight from the file are SIMD/cache aligned
+MAGIC = b"MLART\x00v1"
+ALIGNMENT = 64
+# Smaller buffers stay inside the pickle stream; a separate blob only pays off for large arrays
+MIN_OUT_OF_BAND_BYTES = 64 * 1024
+_HEADER_LENGTH = struct.Struct("<Q")
+
+# What a pickled artifact may reference. Loading an arbitrary pickle runs arbitrary code; an
+# artifact from this project only needs the model libraries, NumPy/SciPy and its own classes
+SAFE_MODULE_PREFIXES = ("numpy", "scipy", "sklearn", "xgboost", "catboost", "joblib", "src.")
+SAFE_GLOBALS = {
+    ("builtins", name) for name in (
+        "bool", "bytearray", "bytes", "complex", "dict", "float", "frozenset", "int", "list",
+        "object", "range", "set", "slice", "str", "tuple",
+    )
+} | {("collections", "OrderedDict"), ("collections", "defaultdict"), ("copyreg", "_reconstructor")}
+# sklearn's Cython loss classes pickle under their bare extension module name
+SAFE_MODULES = {"_loss"}
+
+
+def _padding(offset):
+    return (-offset) % ALIGNMENT
+
+
+def _native_blob(obj):
+    '''
+    Returns (kind, bytes) for models with their own binary format, else None.
+    '''
+    module = type(obj).__module__
+    if module.startswith("catboost"):
+        # CatBoost only saves to a path; a private file in the system temp dir, not the CWD
+        handle, path = tempfile.mkstemp(suffix=".cbm")
+        os.close(handle)
+        try:
+            obj.save_model(path, format="cbm")
+            with open(path, "rb") as file_obj:
+                return "catboost", file_obj.read()
+        finally:
+            os.remove(path)
+    if module.startswith("xgboost"):
+        # UBJSON, XGBoost's binary model format
+        return "xgboost", bytes(obj.get_booster().save_raw(raw_format="ubj"))
+    return None
+
+
+def _load_native(kind, class_path, blob):
+    module_name, _, class_name = class_path.rpartition(".")
+    if kind not in ("catboost", "xgboost") or not module_name.startswith(kind):
+        raise ValueError(f"Unexpected native artifact {kind} of class {class_path}")
+    __import__(module_name)
+    model = getattr(sys.modules[module_name], class_name)()
+    if kind == "catboost":
+        model.load_model(blob=bytes(blob))
+    else:
+        model.load_model(bytearray(blob))
+    return model
+
+
+class RestrictedUnpickler(pickle.Unpickler):
+    '''
+    Unpickler that only resolves the globals an artifact of this project
+    refers to (SAFE_MODULE_PREFIXES, SAFE_MODULES, SAFE_GLOBALS) and rejects everything
+    else, e.g. os.system. This narrows what a tampered file can do but is no
+    sandbox: the allowed libraries are large, so artifacts must still come
+    from a trusted source.
+    '''
+
+    def find_class(self, module, name):
+        if (module, name) in SAFE_GLOBALS or module in SAFE_MODULES or module.startswith(SAFE_MODULE_PREFIXES):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Artifact refers to {module}.{name}, which is not allowed")
+
+
+def restricted_loads(data, buffers=None):
+    return RestrictedUnpickler(io.BytesIO(data), buffers=buffers).load()
+
+
+def dump(obj, file_path, native=True):
+    '''
+    Writes `obj` in the memory-mappable artifact format.
+
+    CatBoost and XGBoost models are stored in their native binary format when
+    `native` is set. Everything else is pickled with protocol 5, with every
+    large contiguous array buffer (tree node tables, coefficients, training
+    data of neighbour models) kept out of band as a separate aligned blob.
+    '''
+    try:
+        kind, blobs = "pickle5", []
+        native_blob = _native_blob(obj) if native else None
+        if native_blob is not None:
+            kind, payload = native_blob
+            blobs.append(payload)
+        else:
+            buffers = []
+
+            def out_of_band(buffer):
+                # A true return value keeps the buffer in band
+                if buffer.raw().nbytes < MIN_OUT_OF_BAND_BYTES:
+                    return True
+                buffers.append(buffer)
+                return False
+
+            blobs.append(pickle.dumps(obj, protocol=5, buffer_callback=out_of_band))
+            blobs.extend(buffer.raw() for buffer in buffers)
+
+        cls = type(obj)
+        header = {"kind": kind, "class": f"{cls.__module__}.{cls.__qualname__}", "blobs": []}
+        # Offsets depend on the header length, which depends on the offsets: size it once with
+        # placeholder offsets wide enough for any file, then fill in the real ones
+        placeholder = dict(header, blobs=[[10 ** 15, 10 ** 15]] * len(blobs))
+        start = len(MAGIC) + _HEADER_LENGTH.size + len(json.dumps(placeholder).encode())
+        offset = start + _padding(start)
+        for blob in blobs:
+            length = memoryview(blob).nbytes
+            header["blobs"].append([offset, length])
+            offset += length + _padding(length)
+        header_bytes = json.dumps(header).encode()
+        header_bytes += b" " * (start - len(MAGIC) - _HEADER_LENGTH.size - len(header_bytes))
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file_obj:
+            file_obj.write(MAGIC)
+            file_obj.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            file_obj.write(header_bytes)
+            for blob, (blob_offset, length) in zip(blobs, header["blobs"]):
+                file_obj.write(b"\0" * (blob_offset - file_obj.tell()))
+                file_obj.write(blob)
+        # Replace, never overwrite in place: processes that mapped the old file keep a valid view
+        os.replace(tmp_path, file_path)
+        logging.info(f"Saved {header['class']} ({kind}, {len(blobs)} blobs) to {file_path}")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def is_artifact(file_path):
+    with open(file_path, "rb") as file_obj:
+        return file_obj.read(len(MAGIC)) == MAGIC
+
+
+def load(file_path, use_mmap=True):
+    '''
+    Loads an artifact written by `dump`. With `use_mmap` the file is mapped
+    copy-on-write and out-of-band arrays are views on the mapping, so worker
+    processes loading the same file share its pages until one writes to them.
+    Pickled artifacts are read with RestrictedUnpickler; only load artifacts
+    from a trusted source all the same.
+    '''
+    try:
+        with open(file_path, "rb") as file_obj:
+            if use_mmap:
+                data = memoryview(mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_COPY))
+            else:
+                data = memoryview(bytearray(file_obj.read()))
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{file_path} is not a model artifact")
+        (header_length,) = _HEADER_LENGTH.unpack_from(data, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(bytes(data[header_start:header_start + header_length]))
+        blobs = [data[offset:offset + length] for offset, length in header["blobs"]]
+
+        if header["kind"] == "pickle5":
+            return restricted_loads(blobs[0], buffers=blobs[1:])
+        return _load_native(header["kind"], header["class"], blobs[0])
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -1,17 +1,22 @@
+import hashlib
 import os
 import sys
+import time
 
-import numpy as np 
-import pandas as pd
-import dill
 import pickle
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
 
 from src.exception import CustomException
+from src import serialization
 
-def save_object(file_path, obj):
+def save_object(file_path, obj, artifact_format="mmap"):
+    '''
+    Saves `obj` in the memory-mappable artifact format (see src/serialization.py),
+    or as a plain pickle with artifact_format="pickle".
+    '''
     try:
+        if artifact_format == "mmap":
+            return serialization.dump(obj, file_path)
+
         dir_path = os.path.dirname(file_path)
 
         os.makedirs(dir_path, exist_ok=True)
@@ -22,31 +27,59 @@ def save_object(file_path, obj):
     except Exception as e:
         raise CustomException(e, sys)
     
-def evaluate_models(X_train, y_train,X_test,y_test,models,param):
+def evaluate_models(X_train, y_train,X_test,y_test,models,param,search_config=None,details=None,profile_rows=None):
+    '''
+    Tunes every model in `models` over its grid in `param` and returns
+    {model_name: test R2}. Each entry of `models` is replaced in place by the
+    estimator refit with its best parameters, so callers can use it directly.
+    If a `details` dict is given it is filled with each model's search results
+    and fit/score timings, for the training report. Models cut by a screening
+    pass (see ModelSearchConfig.screening) are left out of the returned scores.
+    With ModelSearchConfig.profile set, a `profile_rows` list is extended with
+    one resource measurement per fit (see ModelSearch.profile_rows).
+    '''
     try:
-        report = {}
-
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=param[list(models.keys())[i]]
-
-            gs = GridSearchCV(model,para,cv=3)
-            gs.fit(X_train,y_train)
-
-            model.set_params(**gs.best_params_)
-            model.fit(X_train,y_train)
+        # Imported lazily: the search engine pulls in joblib and the sklearn model selection stack,
+        # which serving processes (they only need load_object) should not pay for at startup
+        from sklearn.metrics import r2_score
+        from src.components.model_search import ModelSearch, as_model_input
 
-            #model.fit(X_train, y_train)  # Train model
+        report = {}
 
-            y_train_pred = model.predict(X_train)
+        search = ModelSearch(search_config)
+        search_results = search.run(models, param, X_train, y_train)
+        if profile_rows is not None:
+            profile_rows.extend(search.profile_rows)
 
-            y_test_pred = model.predict(X_test)
+        for model_name, result in search_results.items():
+            # Reuse the refit from the search instead of training a second time
+            model = result.best_estimator
+            models[model_name] = model
 
-            train_model_score = r2_score(y_train, y_train_pred)
+            start = time.perf_counter()
+            y_test_pred = model.predict(as_model_input(model, X_test))
+            predict_time_s = time.perf_counter() - start
 
             test_model_score = r2_score(y_test, y_test_pred)
 
-            report[list(models.keys())[i]] = test_model_score
+            report[model_name] = test_model_score
+
+            if details is not None:
+                details[model_name] = {
+                    "best_params": result.best_params,
+                    "cv_score": result.best_score,
+                    "test_score": test_model_score,
+                    "refit_time_s": result.refit_time_s,
+                    "test_predict_time_s": predict_time_s,
+                    "cv_results": result.cv_results,
+                    "screening": result.screening,
+                }
+
+        if details is not None:
+            # Families cut by the screening pass were never tuned; record why
+            for model_name, screening in search.screening_results.items():
+                if model_name not in search_results:
+                    details[model_name] = {"screening": screening}
 
         return report
 
@@ -55,8 +88,22 @@ def evaluate_models(X_train, y_train,X_test,y_test,models,param):
     
 def load_object(file_path):
     try:
+        # Both formats are accepted, so existing .pkl artifacts keep loading
+        if serialization.is_artifact(file_path):
+            return serialization.load(file_path)
         with open(file_path, "rb") as file_obj:
-            return pickle.load(file_obj)
+            return serialization.RestrictedUnpickler(file_obj).load()
 
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    '''
+    SHA-256 of a file's content, read in chunks.
+    '''
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
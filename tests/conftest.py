@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sklearn.linear_model import LinearRegression
+
+from src.components.data_transformation import DataTransformation
+from src.pipeline.model_registry import ModelRegistryConfig
+from src.utils import save_object
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DATA_PATH = os.path.join(REPO_ROOT, "notebook", "data", "stud.csv")
+
+
+@pytest.fixture(scope="session")
+def student_frame():
+    return pd.read_csv(SOURCE_DATA_PATH)
+
+
+@pytest.fixture(scope="session")
+def fitted_preprocessor(student_frame):
+    # The ColumnTransformer the training pipeline fits, on the committed dataset
+    transformation = DataTransformation()
+    target = transformation.data_transformation_config.target_column_name
+    return transformation.get_data_transformer_object().fit(student_frame.drop(columns=[target]))
+
+
+@pytest.fixture(scope="session")
+def training_data(student_frame, fitted_preprocessor):
+    # (dense features, target) as the models are trained on
+    target = DataTransformation().data_transformation_config.target_column_name
+    X = fitted_preprocessor.transform(student_frame.drop(columns=[target]))
+    X = X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+    return X, student_frame[target].to_numpy(dtype=np.float64)
+
+
+@pytest.fixture
+def served_registry_config(fitted_preprocessor, training_data, tmp_path):
+    # Artifacts of a trained model in a temporary directory, not the checkout's
+    X, y = training_data
+    config = ModelRegistryConfig(
+        model_file_path=str(tmp_path / "model.pkl"),
+        preprocessor_file_path=str(tmp_path / "preprocessor.pkl"),
+        compiled_model_file_path=str(tmp_path / "model_compiled.pkl"),
+        compiled_preprocessor_file_path=str(tmp_path / "preprocessor_compiled.pkl"),
+        use_compiled_model=False,
+    )
+    save_object(config.model_file_path, LinearRegression().fit(X, y))
+    save_object(config.preprocessor_file_path, fitted_preprocessor)
+    return config
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.exception import CustomException
+from src.pipeline.batch_predict import BatchPredictConfig, BatchPredictor
+from src.pipeline.model_registry import ModelRegistry
+from src.pipeline.predict_pipeline import PredictPipeline
+
+BAD_ROW = 23
+
+
+@pytest.fixture
+def batch_input(student_frame, tmp_path):
+    # 60 rows read in chunks of 10, with one out-of-range score in the third chunk
+    frame = student_frame.drop(columns=["math_score"]).head(60).copy()
+    frame.loc[BAD_ROW, "reading_score"] = 120
+    path = tmp_path / "input.csv"
+    frame.to_csv(path, index=False)
+    return frame, str(path)
+
+
+def _config(served_registry_config, input_path, tmp_path, **kwargs):
+    return BatchPredictConfig(
+        input_path=input_path,
+        output_path=str(tmp_path / "out" / "predictions.csv"),
+        chunksize=10,
+        workers=1,
+        registry_config=served_registry_config,
+        **kwargs,
+    )
+
+
+def test_invalid_row_is_reported_and_the_rest_scored(served_registry_config, batch_input, tmp_path):
+    frame, input_path = batch_input
+    config = _config(served_registry_config, input_path, tmp_path)
+    summary = BatchPredictor(config).initiate_batch_prediction()
+    assert summary["rows"] == len(frame)
+    assert summary["invalid_rows"] == 1
+
+    output = pd.read_csv(config.output_path, float_precision="round_trip", keep_default_na=False)
+    assert len(output) == len(frame)
+    assert "reading_score must be between" in output.loc[BAD_ROW, "error"]
+    assert output.loc[BAD_ROW, "prediction"] == ""
+    assert (output.drop(index=BAD_ROW)["error"] == "").all()
+
+    # Every other row scores as the online path scores it
+    online = PredictPipeline(registry=ModelRegistry(served_registry_config))
+    records = frame.drop(index=BAD_ROW).to_dict(orient="records")
+    expected = online.predict_records(online.validate_records(records)[0])
+    np.testing.assert_allclose(output.drop(index=BAD_ROW)["prediction"].astype(float), expected, rtol=1e-12)
+
+
+def test_fail_mode_names_the_row_and_writes_nothing(served_registry_config, batch_input, tmp_path):
+    _, input_path = batch_input
+    config = _config(served_registry_config, input_path, tmp_path, on_invalid="fail")
+    with pytest.raises(CustomException, match=f"row {BAD_ROW}: reading_score"):
+        BatchPredictor(config).initiate_batch_prediction()
+    assert not (tmp_path / "out" / "predictions.csv").exists()
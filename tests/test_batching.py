@@ -0,0 +1,51 @@
+import time
+
+from src.pipeline.batching import MicroBatcher, MicroBatcherConfig
+
+
+def _predict(records):
+    time.sleep(0.02)
+    if "bad" in records:
+        raise ValueError("bad row")
+    return [len(record) for record in records]
+
+
+def test_bad_row_fails_alone():
+    batcher = MicroBatcher(_predict, MicroBatcherConfig(max_wait_ms=20))
+    good, bad = batcher.submit_future("aa"), batcher.submit_future("bad")
+    assert good.result(timeout=2) == 2
+    assert isinstance(bad.exception(timeout=2), ValueError)
+
+
+def test_worker_survives_futures_resolved_by_their_callers():
+    batcher = MicroBatcher(_predict, MicroBatcherConfig(max_wait_ms=20))
+    cancelled = batcher.submit_future("aa")
+    cancelled.cancel()
+    resolved = batcher.submit_future("bad")
+    resolved.set_result(-1)
+    neighbour = batcher.submit_future("ccc")
+
+    assert neighbour.result(timeout=2) == 3
+    assert cancelled.cancelled() and resolved.result() == -1
+    # Later requests are still served
+    assert batcher.submit("dddd", timeout=2) == 4
+
+
+def test_short_batch_result_is_retried_row_by_row():
+    calls = []
+
+    def drop_last(records):
+        calls.append(len(records))
+        time.sleep(0.02)
+        return [len(record) for record in records][:max(1, len(records) - 1)]
+
+    batcher = MicroBatcher(drop_last, MicroBatcherConfig(max_wait_ms=50))
+    futures = [batcher.submit_future(record) for record in ("a", "bb", "ccc")]
+    assert [future.result(timeout=2) for future in futures] == [1, 2, 3]
+    assert max(calls) > 1
+
+
+def test_empty_row_result_fails_the_row():
+    batcher = MicroBatcher(lambda records: [], MicroBatcherConfig(max_wait_ms=5))
+    future = batcher.submit_future("aa")
+    assert isinstance(future.exception(timeout=2), ValueError)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from catboost import CatBoostRegressor
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
+
+from src.pipeline.compiled_model import compile_model, try_compile_model, verify_compiled_model
+
+# Small versions of the model zoo, fast enough for every test run
+MODELS = {
+    "decision_tree": lambda: DecisionTreeRegressor(random_state=0),
+    "random_forest": lambda: RandomForestRegressor(n_estimators=16, random_state=0),
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=32, subsample=0.8, random_state=0),
+    "adaboost": lambda: AdaBoostRegressor(n_estimators=16, random_state=0),
+    "xgboost": lambda: XGBRegressor(n_estimators=32, random_state=0),
+    "catboost": lambda: CatBoostRegressor(iterations=30, depth=6, random_seed=0, verbose=False,
+                                          allow_writing_files=False),
+    "linear_regression": lambda: LinearRegression(),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_compiled_model_matches_library_predict(name, training_data):
+    X, y = training_data
+    model = MODELS[name]().fit(X[:800], y[:800])
+    compiled = compile_model(model)
+
+    max_error, ok = verify_compiled_model(compiled, model, X[800:])
+    assert ok, f"{name} differs by {max_error}"
+    # Rows are scored independently of their batch
+    single = np.concatenate([np.ravel(compiled.predict(X[i:i + 1])) for i in range(800, 820)])
+    assert np.array_equal(single, np.ravel(compiled.predict(X[800:820])))
+
+
+def test_unsupported_model_is_not_compiled(training_data):
+    from sklearn.neighbors import KNeighborsRegressor
+
+    X, y = training_data
+    model = KNeighborsRegressor().fit(X, y)
+    with pytest.raises(ValueError):
+        compile_model(model)
+    assert try_compile_model(model, X) is None
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from src.pipeline.compiled_preprocessor import compile_preprocessor, probe_columns, verify_compiled_preprocessor
+
+
+def _dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+def test_probe_matches_sklearn_bit_for_bit(fitted_preprocessor):
+    compiled = compile_preprocessor(fitted_preprocessor)
+    assert verify_compiled_preprocessor(compiled, fitted_preprocessor)
+
+    probe = pd.DataFrame(probe_columns(compiled, n_random=500, seed=1))
+    assert np.array_equal(compiled.transform(probe), _dense(fitted_preprocessor.transform(probe)))
+
+
+def test_dataset_rows_match_sklearn(student_frame, fitted_preprocessor):
+    compiled = compile_preprocessor(fitted_preprocessor)
+    features = student_frame.drop(columns=["math_score"])
+    assert np.array_equal(compiled.transform(features), _dense(fitted_preprocessor.transform(features)))
+
+
+def test_every_input_form_gives_the_same_rows(student_frame, fitted_preprocessor):
+    compiled = compile_preprocessor(fitted_preprocessor)
+    features = student_frame.drop(columns=["math_score"]).head(20)
+    records = features.to_dict(orient="records")
+    expected = compiled.transform(features)
+
+    assert np.array_equal(compiled.transform(records), expected)
+    assert np.array_equal(compiled.transform({name: features[name].to_numpy() for name in features}), expected)
+    # Single records take the scalar path
+    for i, record in enumerate(records):
+        assert np.array_equal(compiled.transform(record), expected[i:i + 1])
+        assert np.array_equal(compiled.transform([record]), expected[i:i + 1])
+
+
+def test_missing_values_are_imputed_like_sklearn(student_frame, fitted_preprocessor):
+    compiled = compile_preprocessor(fitted_preprocessor)
+    features = student_frame.drop(columns=["math_score"]).head(10).copy()
+    features.loc[[0, 3], "reading_score"] = np.nan
+    features.loc[[1, 3], "lunch"] = np.nan
+    expected = _dense(fitted_preprocessor.transform(features))
+
+    assert np.array_equal(compiled.transform(features), expected)
+    record = features.iloc[3].to_dict()
+    assert np.array_equal(compiled.transform(record), expected[3:4])
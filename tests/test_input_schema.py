@@ -0,0 +1,128 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from src.pipeline.input_schema import (
+    MISSING, NOT_A_NUMBER, OUT_OF_RANGE, UNKNOWN_CATEGORY, InputSchema, describe_errors,
+)
+from src.pipeline.model_registry import ModelRegistry
+from src.pipeline.predict_pipeline import PredictPipeline
+
+VALID = {
+    "gender": "female",
+    "race_ethnicity": "group B",
+    "parental_level_of_education": "some college",
+    "lunch": "standard",
+    "test_preparation_course": "none",
+    "reading_score": 72,
+    "writing_score": 74,
+}
+
+
+@pytest.fixture(scope="module")
+def schema(fitted_preprocessor):
+    return InputSchema.from_preprocessor(fitted_preprocessor)
+
+
+@pytest.fixture
+def served_pipeline(served_registry_config):
+    return PredictPipeline(registry=ModelRegistry(served_registry_config))
+
+
+def _codes(errors):
+    return [(error["row"], error["field"], error["code"]) for error in errors]
+
+
+@pytest.mark.parametrize("field, value, code", [
+    ("reading_score", 120, OUT_OF_RANGE),
+    ("reading_score", math.inf, OUT_OF_RANGE),
+    ("reading_score", "-inf", OUT_OF_RANGE),
+    ("reading_score", "seventy", NOT_A_NUMBER),
+    ("reading_score", True, NOT_A_NUMBER),
+    ("gender", "unknown", UNKNOWN_CATEGORY),
+    ("gender", ["female"], UNKNOWN_CATEGORY),
+])
+def test_invalid_values_are_reported(schema, field, value, code):
+    record = dict(VALID, **{field: value})
+    _, errors = schema.validate_record(record)
+    assert _codes(errors) == [(0, field, code)]
+    # Errors stay JSON-serializable, inf included
+    json.dumps(errors, allow_nan=False)
+
+
+@pytest.mark.parametrize("value", [None, math.nan, "nan", " "])
+def test_missing_numbers_are_allowed_where_the_preprocessor_imputes(schema, value):
+    clean, errors = schema.validate_record(dict(VALID, reading_score=value))
+    assert errors == []
+    assert math.isnan(clean["reading_score"])
+
+
+def test_missing_category_becomes_nan(schema):
+    clean, errors = schema.validate_record(dict(VALID, lunch=None))
+    assert errors == [] and math.isnan(clean["lunch"])
+    record = dict(VALID)
+    del record["lunch"]
+    assert schema.validate_record(record)[1] == []
+
+
+def test_numbers_are_coerced(schema):
+    clean, errors = schema.validate_record(dict(VALID, reading_score=" 72.5 ", writing_score=np.int64(60)))
+    assert errors == []
+    assert clean["reading_score"] == 72.5 and clean["writing_score"] == 60.0
+
+
+def test_batch_path_reports_the_same_errors_as_the_scalar_path(schema):
+    records = [
+        VALID,
+        dict(VALID, reading_score=math.inf, gender="x"),
+        dict(VALID, writing_score="abc"),
+        dict(VALID, reading_score=-1, lunch=None),
+        dict(VALID, writing_score="nan"),
+    ]
+    clean, errors = schema.validate_records(records)
+    expected = [error for row, record in enumerate(records) for error in schema.validate_record(record, row)[1]]
+
+    assert sorted(_codes(errors)) == sorted(_codes(expected))
+    assert len(clean) == len(records)
+    assert clean[0]["reading_score"] == 72.0
+
+
+def test_describe_errors_renders_every_code(schema):
+    records = [dict(VALID, reading_score=math.inf, writing_score="abc", gender="x")]
+    _, errors = schema.validate_records(records)
+    message = describe_errors(errors)
+    assert "reading_score must be between 0 and 100 (got inf)" in message
+    assert "writing_score must be a number (got 'abc')" in message
+    assert "gender has unknown value 'x'" in message
+    assert describe_errors([{"code": MISSING, "field": "gender"}]) == "gender is required"
+    assert describe_errors(errors, limit=1).endswith("and 2 more")
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "1e309", "101"])
+def test_form_renders_range_errors(served_pipeline, monkeypatch, value):
+    import app
+
+    monkeypatch.setattr(app, "predict_pipeline", served_pipeline)
+    form = {
+        "gender": "female", "ethnicity": "group B", "parental_level_of_education": "some college",
+        "lunch": "standard", "test_preparation_course": "none", "reading_score": value, "writing_score": "70",
+    }
+    page = app.app.test_client().post("/predictdata", data=form).get_data(as_text=True)
+    assert "reading_score must be between 0 and 100" in page
+    assert "Unknown format code" not in page
+
+
+@pytest.mark.parametrize("value", [math.inf, -math.inf, "inf"])
+def test_json_api_rejects_infinite_scores(served_pipeline, monkeypatch, value):
+    import app
+
+    monkeypatch.setattr(app, "predict_pipeline", served_pipeline)
+    # json.dumps writes Infinity, which the API's JSON parser accepts
+    payload = json.dumps(dict(VALID, reading_score=value))
+    response = app.app.test_client().post("/predict", data=payload, content_type="application/json")
+
+    assert response.status_code == 400
+    errors = json.loads(response.get_data(as_text=True))["errors"]
+    assert [(error["field"], error["code"]) for error in errors] == [("reading_score", OUT_OF_RANGE)]
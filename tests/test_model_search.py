@@ -0,0 +1,78 @@
+import types
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeRegressor
+
+from src.components import model_search
+from src.components.model_search import ModelSearch, ModelSearchConfig
+
+GRID = {
+    "max_depth": [2, 4, 6, 8, 10, 12, 14, 16, None],
+    "min_samples_leaf": [1, 2, 4],
+    "min_samples_split": [2, 4, 8],
+}   # 81 candidates: 4 halving rounds of 81, 27, 9 and 3
+
+
+class _CountingTree(DecisionTreeRegressor):
+    fits = 0
+
+    def fit(self, X, y, sample_weight=None, check_input=True):
+        type(self).fits += 1
+        return super().fit(X, y, sample_weight=sample_weight, check_input=check_input)
+
+
+@pytest.fixture
+def regression_data():
+    rng = np.random.RandomState(0)
+    X = rng.rand(3000, 8)
+    return X, X @ rng.rand(8) + 0.1 * rng.rand(3000)
+
+
+@pytest.fixture
+def fit_clock(monkeypatch):
+    # The search's clock advances by one "second" per fit, so budgets cut at exact trial counts
+    _CountingTree.fits = 0
+    monkeypatch.setattr(model_search, "time", types.SimpleNamespace(
+        monotonic=lambda: float(_CountingTree.fits),
+        perf_counter=model_search.time.perf_counter,
+        process_time=model_search.time.process_time,
+    ))
+
+
+def _search(X, y, **config):
+    search = ModelSearch(ModelSearchConfig(n_jobs=1, cache=None, **config))
+    return search.run({"tree": _CountingTree()}, {"tree": GRID}, X, y)["tree"]
+
+
+def test_halving_keeps_the_last_leader_when_the_budget_cuts_a_round(regression_data, fit_clock):
+    X, y = regression_data
+    # The first round (81 candidates x 3 folds) completes; the second starts, but no candidate
+    # gets through all of its folds before the budget is spent
+    result = _search(X, y, strategy="halving", time_budget_s=81 * 3 + 0.5)
+
+    first_round = [r for r in result.cv_results if r["n_resources"] == min(r["n_resources"] for r in result.cv_results)]
+    leader = max(first_round, key=lambda r: r["mean_score"])
+    assert len(first_round) == 81
+    assert result.best_params == leader["params"]
+    assert result.best_score == leader["mean_score"]
+    assert result.best_estimator.get_params()["max_depth"] == leader["params"]["max_depth"]
+
+
+def test_halving_within_budget_ranks_every_round(regression_data, fit_clock):
+    X, y = regression_data
+    result = _search(X, y, strategy="halving")
+
+    rounds = sorted({r["n_resources"] for r in result.cv_results})
+    assert [sum(r["n_resources"] == n for r in result.cv_results) for n in rounds] == [81, 27, 9, 3]
+    final = max((r for r in result.cv_results if r["n_resources"] == rounds[-1]), key=lambda r: r["mean_score"])
+    assert result.best_params == final["params"]
+
+
+def test_defaults_only_when_no_round_finished(regression_data, fit_clock):
+    X, y = regression_data
+    result = _search(X, y, strategy="halving", time_budget_s=0.5)
+
+    assert result.best_params == {}
+    assert result.best_score is None
+    assert result.cv_results == []
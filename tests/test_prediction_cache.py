@@ -0,0 +1,62 @@
+import sqlite3
+
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+
+
+def _versions(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT version, COUNT(*) FROM predictions GROUP BY version").fetchall())
+
+
+def test_workers_on_different_versions_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    old_worker = PredictionCache(PredictionCacheConfig(shared_path=path))
+    new_worker = PredictionCache(PredictionCacheConfig(shared_path=path))
+    old_worker.put("v1", ("row",), 1.0)
+    new_worker.put("v2", ("row",), 2.0)
+
+    assert old_worker.get("v1", ("row",)) == 1.0
+    assert new_worker.get("v2", ("row",)) == 2.0
+    # Through the shared tier
+    assert old_worker.get("v2", ("row",)) == 2.0
+    assert _versions(path) == {"v1": 1, "v2": 1}
+
+
+def test_pinned_versions_share_one_process_cache():
+    cache = PredictionCache(PredictionCacheConfig())
+    cache.put("v1", ("row",), 1.0)
+    cache.put("v2", ("row",), 2.0)
+    assert cache.get("v1", ("row",)) == 1.0 and cache.get("v2", ("row",)) == 2.0
+
+
+def test_stale_versions_age_out_of_the_shared_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    PredictionCache(PredictionCacheConfig(shared_path=path)).put("v1", ("row",), 1.0)
+    cache = PredictionCache(PredictionCacheConfig(shared_path=path, stale_version_grace_s=0))
+    for i in range(256):   # One amortised trim
+        cache.put("v2", (i,), float(i))
+    assert _versions(path) == {"v2": 256}
+
+
+def test_shared_tier_is_used_outside_the_lock(tmp_path, monkeypatch):
+    cache = PredictionCache(PredictionCacheConfig(shared_path=str(tmp_path / "cache.sqlite")))
+    shared_get, shared_put = cache._shared_get, cache._shared_put
+    held = []
+
+    def checked_get(*args):
+        held.append(cache._lock.locked())
+        return shared_get(*args)
+
+    def checked_put(*args, **kwargs):
+        held.append(cache._lock.locked())
+        return shared_put(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "_shared_get", checked_get)
+    monkeypatch.setattr(cache, "_shared_put", checked_put)
+    assert cache.get("v1", ("row",)) is None
+    cache.put("v1", ("row",), 1.0)
+    # Drop the in-process copy so the next get reads SQLite
+    cache._entries.clear()
+    assert cache.get("v1", ("row",)) == 1.0
+    assert held == [False, False, False]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
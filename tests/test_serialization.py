@@ -0,0 +1,98 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+from catboost import CatBoostRegressor
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from xgboost import XGBRegressor
+
+from src import serialization
+from src.exception import CustomException
+from src.pipeline.compiled_model import compile_model
+from src.pipeline.compiled_preprocessor import compile_preprocessor
+from src.utils import load_object, save_object
+
+MODELS = {
+    "random_forest": lambda: RandomForestRegressor(n_estimators=8, random_state=0),
+    "xgboost": lambda: XGBRegressor(n_estimators=16, random_state=0),
+    "catboost": lambda: CatBoostRegressor(iterations=20, random_seed=0, verbose=False, allow_writing_files=False),
+    "linear_regression": lambda: LinearRegression(),
+}
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (os.system, ("echo unsafe",))
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_model_round_trip(name, use_mmap, training_data, tmp_path):
+    X, y = training_data
+    model = MODELS[name]().fit(X, y)
+    path = str(tmp_path / "model.pkl")
+    serialization.dump(model, path)
+
+    assert serialization.is_artifact(path)
+    loaded = serialization.load(path, use_mmap=use_mmap)
+    assert type(loaded) is type(model)
+    assert np.array_equal(loaded.predict(X), model.predict(X))
+
+
+def test_compiled_exports_round_trip(fitted_preprocessor, training_data, student_frame, tmp_path):
+    X, y = training_data
+    engine = compile_model(RandomForestRegressor(n_estimators=8, random_state=0).fit(X, y))
+    preprocessor = compile_preprocessor(fitted_preprocessor)
+    save_object(str(tmp_path / "model_compiled.pkl"), engine)
+    save_object(str(tmp_path / "preprocessor_compiled.pkl"), preprocessor)
+
+    loaded_engine = load_object(str(tmp_path / "model_compiled.pkl"))
+    loaded_preprocessor = load_object(str(tmp_path / "preprocessor_compiled.pkl"))
+    assert np.array_equal(loaded_engine.predict(X), engine.predict(X))
+    assert np.array_equal(loaded_preprocessor.transform(student_frame), preprocessor.transform(student_frame))
+
+
+def test_large_arrays_are_mapped_out_of_band(tmp_path):
+    array = np.arange(200_000, dtype=np.float64)
+    path = str(tmp_path / "array.pkl")
+    serialization.dump({"weights": array}, path)
+
+    loaded = serialization.load(path)["weights"]
+    assert np.array_equal(loaded, array)
+    # A view on the copy-on-write mapping, aligned for SIMD loads
+    assert not loaded.flags.owndata
+    assert loaded.ctypes.data % serialization.ALIGNMENT == 0
+
+
+def test_legacy_pickles_still_load(tmp_path):
+    model = LinearRegression().fit(np.eye(3), np.arange(3.0))
+    path = str(tmp_path / "legacy.pkl")
+    save_object(path, model, artifact_format="pickle")
+
+    assert not serialization.is_artifact(path)
+    assert np.array_equal(load_object(path).coef_, model.coef_)
+
+
+@pytest.mark.parametrize("artifact_format", ["mmap", "pickle"])
+def test_arbitrary_globals_are_rejected(artifact_format, tmp_path):
+    path = str(tmp_path / "exploit.pkl")
+    if artifact_format == "mmap":
+        serialization.dump(_Exploit(), path)
+    else:
+        with open(path, "wb") as file_obj:
+            pickle.dump(_Exploit(), file_obj)
+
+    with pytest.raises(CustomException, match="not allowed"):
+        load_object(path)
+
+
+def test_catboost_export_leaves_the_working_directory_alone(training_data, tmp_path, monkeypatch):
+    X, y = training_data
+    model = MODELS["catboost"]().fit(X, y)
+    monkeypatch.chdir(tmp_path)
+    serialization.dump(model, str(tmp_path / "out" / "model.pkl"))
+
+    assert os.listdir(tmp_path) == ["out"]
+    assert os.listdir(tmp_path / "out") == ["model.pkl"]
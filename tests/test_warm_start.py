@@ -0,0 +1,116 @@
+import copy
+
+import numpy as np
+import pytest
+from catboost import CatBoostRegressor
+from sklearn.base import clone
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
+
+from src import serialization
+from src.components.data_transformation import DataTransformation
+from src.components.model_search import as_model_input
+from src.components.warm_start import WarmStartConfig, continue_training, rescale_model_inputs, value_pairs
+
+MODELS = {
+    "decision_tree": (lambda: DecisionTreeRegressor(random_state=0), True),
+    "random_forest": (lambda: RandomForestRegressor(n_estimators=16, random_state=0), True),
+    "gradient_boosting": (lambda: GradientBoostingRegressor(n_estimators=32, subsample=0.8, random_state=0), True),
+    "adaboost": (lambda: AdaBoostRegressor(n_estimators=16, random_state=0), True),
+    "xgboost": (lambda: XGBRegressor(n_estimators=32, learning_rate=0.1, random_state=0), True),
+    # Borders and coefficients go through the affine map, exact up to rounding
+    "catboost": (lambda: CatBoostRegressor(iterations=30, random_seed=0, verbose=False, allow_writing_files=False),
+                 False),
+    "linear_regression": (lambda: LinearRegression(), False),
+}
+
+
+@pytest.fixture(scope="module")
+def refreshed(student_frame):
+    # A preprocessor fitted on the first 800 rows, then updated with the other 200
+    transformation = DataTransformation()
+    features = student_frame.drop(columns=["math_score"])
+    old = transformation.get_data_transformer_object().fit(features.iloc[:800])
+    new = copy.deepcopy(old)
+    scale, shift = transformation.update_preprocessor(new, features.iloc[800:])
+    return old, new, scale, shift
+
+
+def _dense(matrix):
+    return matrix.toarray() if hasattr(matrix, "toarray") else np.asarray(matrix)
+
+
+def test_updated_scalers_match_a_full_fit(student_frame, refreshed):
+    old, new, scale, shift = refreshed
+    features = student_frame.drop(columns=["math_score"])
+    numeric = new.named_transformers_["num_pipeline"]
+    full = StandardScaler().fit(numeric[:-1].transform(features[["writing_score", "reading_score"]]))
+
+    np.testing.assert_allclose(numeric[-1].mean_, full.mean_, rtol=1e-12)
+    np.testing.assert_allclose(numeric[-1].scale_, full.scale_, rtol=1e-12)
+    # (scale, shift) maps the old features onto the new ones
+    np.testing.assert_allclose(_dense(old.transform(features)) * scale + shift, _dense(new.transform(features)),
+                               atol=1e-12)
+
+
+def test_new_categories_need_a_full_run(student_frame, refreshed):
+    _, new, _, _ = refreshed
+    rows = student_frame.drop(columns=["math_score"]).head(3).assign(lunch="none")
+    with pytest.raises(ValueError, match="New categories"):
+        DataTransformation().update_preprocessor(copy.deepcopy(new), rows)
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_rescaled_model_predicts_the_same_on_new_features(name, student_frame, refreshed, tmp_path):
+    old, new, scale, shift = refreshed
+    make, exact = MODELS[name]
+    features = student_frame.drop(columns=["math_score"])
+    X_old, X_new = _dense(old.transform(features)), _dense(new.transform(features))
+    model = make()
+    model.fit(as_model_input(model, X_old[:800]), student_frame["math_score"].to_numpy()[:800])
+    # As the refresh does it: starting from the saved artifact
+    serialization.dump(model, str(tmp_path / "model.pkl"))
+    model = serialization.load(str(tmp_path / "model.pkl"))
+    before = model.predict(as_model_input(model, X_old))
+
+    rescale_model_inputs(model, scale, shift, value_pairs(X_old, X_new))
+    after = model.predict(as_model_input(model, X_new))
+    if exact:
+        assert np.array_equal(before, after)
+    else:
+        np.testing.assert_allclose(after, before, rtol=0, atol=1e-9)
+
+
+def test_identity_map_leaves_the_model_alone(training_data):
+    X, y = training_data
+    model = DecisionTreeRegressor(random_state=0).fit(X, y)
+    threshold = model.tree_.threshold.copy()
+    rescale_model_inputs(model, np.ones(X.shape[1]), np.zeros(X.shape[1]))
+    assert np.array_equal(model.tree_.threshold, threshold)
+
+
+@pytest.mark.parametrize("name, method, count", [
+    ("random_forest", "warm_start", lambda m: len(m.estimators_)),
+    ("gradient_boosting", "warm_start", lambda m: len(m.estimators_)),
+    ("xgboost", "continued_boosting", lambda m: m.get_booster().num_boosted_rounds()),
+    ("catboost", "continued_boosting", lambda m: m.tree_count_),
+    ("linear_regression", "refit", None),
+])
+def test_continue_training_grows_with_the_new_rows(name, method, count, training_data):
+    X, y = training_data
+    make, _ = MODELS[name]
+    model = make()
+    model.fit(as_model_input(model, X[:800]), y[:800])
+    previous = count(model) if count else None
+
+    # 200 new rows on top of 800: a quarter more trees/rounds
+    continued, info = continue_training(model, clone(make()), as_model_input(model, X), y, n_new_rows=200,
+                                        config=WarmStartConfig())
+    assert info["method"] == method
+    if count:
+        assert info["added"] == int(np.ceil(previous * 0.25))
+        assert count(continued) == previous + info["added"]
+    assert np.isfinite(continued.predict(as_model_input(continued, X))).all()